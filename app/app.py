@@ -1,32 +1,54 @@
-from flask import Flask, request, jsonify, render_template, session, redirect, url_for
+from flask import Flask, Response, request, jsonify, render_template, session, redirect, url_for, stream_with_context
 from flask_cors import CORS
-import traceback
 import hashlib
 import json
+import logging
 from datetime import datetime
 
+# Registro estructurado antes de importar los recomendadores (ver request_log)
+from request_log import configure_logging, current_request_log, install_request_logging
+configure_logging()
+logger = logging.getLogger(__name__)
+
 # Importar el sistema de recomendaciones
 try:
-    from recommender_minimal import get_recommendations
+    from recommender_minimal import get_recommendations, iter_recommendations, reload_catalog, get_facet_counts, get_readiness
     RECOMMENDER_AVAILABLE = True
     print("✅ Usando recommender_minimal.py")
 except ImportError as e:
     try:
-        from recommender import get_recommendations
+        from recommender import get_recommendations, iter_recommendations, reload_catalog, get_facet_counts, get_readiness
         RECOMMENDER_AVAILABLE = True
         print("✅ Usando recommender.py")
     except ImportError as e2:
         print(f"❌ Warning: No se pudo importar sistema de recomendaciones: {e2}")
         RECOMMENDER_AVAILABLE = False
 
+from catalog_snapshot import catalog_store
+from metrics import FALLBACKS, PROMETHEUS_CONTENT_TYPE, REGISTRY, register_callback
+from pagination import (NDJSON_MIMETYPE, SECTIONS, PageRequest, PaginationError, StaleCursorError,
+                        ndjson_line, page, paginate, split_sections)
+from preferences import normalize_preferences, preference_key
+from response_cache import ResponseCache
+from user_store import UnknownCarError, create_user_store
+
 app = Flask(__name__)
 CORS(app)
+install_request_logging(app)
 app.secret_key = 'tu_clave_secreta_aqui_cambiala_por_una_segura'
 
-# Simulación de base de datos de usuarios (en producción usar Neo4j)
-USERS_DB = {}
-USER_PROFILES = {}
-USER_FAVORITES = {}
+# Usuarios, perfiles y favoritos persistentes y compartidos entre workers (USER_STORE)
+USER_STORE = create_user_store()
+
+# Respuestas de /api/recommendations por combinación de preferencias y versión del catálogo
+RECOMMENDATION_CACHE = ResponseCache(max_entries=512, ttl_seconds=300)
+register_callback(
+    'recommendation_cache_requests_total',
+    'Consultas al caché de /api/recommendations por resultado',
+    'counter',
+    lambda: {('hit',): RECOMMENDATION_CACHE.hits, ('miss',): RECOMMENDATION_CACHE.misses},
+    ('result',),
+)
 
 @app.route("/")
 def index():
@@ -46,19 +68,10 @@ def register():
         if len(password) < 6:
             return jsonify({"success": False, "message": "La contraseña debe tener al menos 6 caracteres"})
         
-        if email in USERS_DB:
-            return jsonify({"success": False, "message": "El usuario ya existe"})
-        
-        # Crear usuario
+        # Crear usuario con perfil y favoritos vacíos
         password_hash = hashlib.sha256(password.encode()).hexdigest()
-        USERS_DB[email] = {
-            "password": password_hash,
-            "created_at": datetime.now().isoformat()
-        }
-        
-        # Inicializar perfil y favoritos
-        USER_PROFILES[email] = {}
-        USER_FAVORITES[email] = []
+        if not USER_STORE.create_user(email, password_hash):
+            return jsonify({"success": False, "message": "El usuario ya existe"})
         
         session['logged_in'] = True
         session['user_email'] = email
@@ -78,15 +91,16 @@ def login():
         # Para demo, aceptar cualquier usuario/contraseña
         if email and password:
             # Verificar si existe en BD
-            if email in USERS_DB:
+            user = USER_STORE.get_user(email)
+            if user:
                 password_hash = hashlib.sha256(password.encode()).hexdigest()
-                if USERS_DB[email]["password"] == password_hash:
+                if user["password"] == password_hash:
                     session['logged_in'] = True
                     session['user_email'] = email
                     print(f"✅ Usuario logueado: {email}")
                     
                     # Verificar si tiene perfil configurado
-                    if email in USER_PROFILES and USER_PROFILES[email].get('displayName'):
+                    if USER_STORE.get_profile(email).get('displayName'):
                         return jsonify({"success": True, "redirect": url_for("brands")})
                     else:
                         return jsonify({"success": True, "redirect": url_for("profile_setup")})
@@ -96,12 +110,7 @@ def login():
                 # Para demo, crear usuario automáticamente
                 if len(password) >= 6:
                     password_hash = hashlib.sha256(password.encode()).hexdigest()
-                    USERS_DB[email] = {
-                        "password": password_hash,
-                        "created_at": datetime.now().isoformat()
-                    }
-                    USER_PROFILES[email] = {}
-                    USER_FAVORITES[email] = []
+                    USER_STORE.create_user(email, password_hash)
                     
                     session['logged_in'] = True
                     session['user_email'] = email
@@ -184,7 +193,7 @@ def save_profile():
             'updated_at': datetime.now().isoformat()
         }
         
-        USER_PROFILES[user_email] = profile_data
+        USER_STORE.save_profile(user_email, profile_data)
         session['user_profile'] = profile_data
         
         print(f"👤 Perfil guardado para {user_email}: {profile_data}")
@@ -199,7 +208,7 @@ def user_info():
         return jsonify({"error": "No autenticado"}), 401
     
     user_email = session.get('user_email')
-    profile = USER_PROFILES.get(user_email, {})
+    profile = USER_STORE.get_profile(user_email)
     
     return jsonify({
         "email": user_email,
@@ -215,8 +224,8 @@ def user_profile():
         return jsonify({"error": "No autenticado"}), 401
     
     user_email = session.get('user_email')
-    profile = USER_PROFILES.get(user_email, {})
-    user_data = USERS_DB.get(user_email, {})
+    profile = USER_STORE.get_profile(user_email)
+    user_data = USER_STORE.get_user(user_email) or {}
     
     return jsonify({
         "email": user_email,
@@ -232,7 +241,7 @@ def user_favorites():
         return jsonify({"error": "No autenticado"}), 401
     
     user_email = session.get('user_email')
-    favorites = USER_FAVORITES.get(user_email, [])
+    favorites = USER_STORE.list_favorites(user_email)
     
     return jsonify({"favorites": favorites})
 
@@ -245,16 +254,18 @@ def add_favorite():
         data = request.get_json()
         user_email = session.get('user_email')
         car_data = data.get('car')
+        if not isinstance(car_data, dict) or car_data.get('id') is None:
+            return jsonify({"success": False, "error": "Falta el auto o su id"}), 400
         
-        if user_email not in USER_FAVORITES:
-            USER_FAVORITES[user_email] = []
-        
-        # Verificar si ya está en favoritos
-        existing = next((f for f in USER_FAVORITES[user_email] if f.get('id') == car_data.get('id')), None)
-        if existing:
+        # Índice (usuario, car_id): si ya estaba no se agrega de nuevo
+        try:
+            added = USER_STORE.add_favorite(user_email, car_data)
+        except UnknownCarError:
+            # p. ej. autos de respaldo o de ejemplo con el backend neo4j
+            return jsonify({"success": False, "error": "El auto no existe en el catálogo"}), 404
+        if not added:
             return jsonify({"success": False, "message": "Ya está en favoritos"})
         
-        USER_FAVORITES[user_email].append(car_data)
         print(f"❤️ Favorito agregado para {user_email}: {car_data.get('name')}")
         
         return jsonify({"success": True})
@@ -272,8 +283,7 @@ def remove_favorite():
         user_email = session.get('user_email')
         car_id = data.get('carId')
         
-        if user_email in USER_FAVORITES:
-            USER_FAVORITES[user_email] = [f for f in USER_FAVORITES[user_email] if f.get('id') != car_id]
+        if USER_STORE.remove_favorite(user_email, car_id):
             print(f"💔 Favorito eliminado para {user_email}: {car_id}")
         
         return jsonify({"success": True})
@@ -291,10 +301,7 @@ def save_theme():
         theme = data.get('theme')
         user_email = session.get('user_email')
         
-        if user_email not in USER_PROFILES:
-            USER_PROFILES[user_email] = {}
-        
-        USER_PROFILES[user_email]['theme'] = theme
+        USER_STORE.update_profile(user_email, theme=theme)
         print(f"🎨 Tema guardado para {user_email}: {theme}")
         
         return jsonify({"success": True})
@@ -307,7 +314,7 @@ def user_theme():
         return jsonify({"theme": "light"})
     
     user_email = session.get('user_email')
-    profile = USER_PROFILES.get(user_email, {})
+    profile = USER_STORE.get_profile(user_email)
     
     return jsonify({"theme": profile.get('theme', 'light')})
 
@@ -373,14 +380,30 @@ def save_transmission():
         print(f"❌ Error guardando transmission: {e}")
         return jsonify({"success": False, "error": str(e)}), 500
 
+# ===== CONTEOS POR FACETA PARA LAS PÁGINAS DE SELECCIÓN =====
+@app.route("/api/catalog/facets", methods=["GET"])
+def catalog_facets():
+    """Cuántos autos hay por marca, tipo, combustible y transmisión con la selección actual"""
+    if not RECOMMENDER_AVAILABLE:
+        return jsonify({"error": "Recommender no disponible"}), 503
+    
+    counts = get_facet_counts(
+        brands=session.get('selected_brands'),
+        budget=session.get('selected_budget'),
+        fuel=session.get('selected_fuel'),
+        types=session.get('selected_types'),
+        transmission=session.get('selected_transmission')
+    )
+    if counts is None:
+        return jsonify({"error": "Catálogo en memoria no disponible"}), 503
+    
+    return jsonify(counts)
+
 # ===== ENDPOINT DE RECOMENDACIONES (ÚNICO) =====
 @app.route("/api/recommendations", methods=["GET"])
 def api_recommendations():
+    request_log = current_request_log()
     try:
-        print("\n" + "="*60)
-        print("🎯 API RECOMMENDATIONS - INICIANDO (FILTRADOS + RECOMENDACIONES)")
-        print("="*60)
-        
         # Obtener datos de la sesión
         brands = session.get('selected_brands')
         budget = session.get('selected_budget')
@@ -389,15 +412,6 @@ def api_recommendations():
         transmission = session.get('selected_transmission')
         user_email = session.get('user_email')
         
-        # Debug detallado
-        print("📊 DATOS DE SESIÓN:")
-        print(f"  🏷️  Brands: {brands} (tipo: {type(brands)})")
-        print(f"  💰 Budget: {budget} (tipo: {type(budget)})")
-        print(f"  ⛽ Fuel: {fuel} (tipo: {type(fuel)})")
-        print(f"  🚗 Types: {types} (tipo: {type(types)})")
-        print(f"  ⚙️  Transmission: {transmission} (tipo: {type(transmission)})")
-        print(f"  👤 Usuario: {user_email}")
-        
         # Verificar que todos los datos estén presentes
         missing_data = []
         if not brands: missing_data.append("brands")
@@ -407,7 +421,7 @@ def api_recommendations():
         if not transmission: missing_data.append("transmission")
         
         if missing_data:
-            print(f"❌ FALTAN DATOS: {', '.join(missing_data)}")
+            request_log.set(missing=missing_data)
             return jsonify({
                 "error": f"Faltan datos de selección: {', '.join(missing_data)}",
                 "session_data": {
@@ -420,72 +434,146 @@ def api_recommendations():
                 "missing": missing_data
             }), 400
         
-        print("✅ TODOS LOS DATOS PRESENTES")
-        
         # Obtener perfil del usuario para personalización
-        user_profile = USER_PROFILES.get(user_email, {})
+        with request_log.stage('profile'):
+            user_profile = USER_STORE.get_profile(user_email)
         gender = user_profile.get('gender')
         age_range = user_profile.get('ageRange')
         
-        print(f"👤 PERFIL DE USUARIO:")
-        print(f"  Género: {gender}")
-        print(f"  Edad: {age_range}")
-        
-        # Obtener recomendaciones completas
-        if not RECOMMENDER_AVAILABLE:
-            print("⚠️ RECOMMENDER NO DISPONIBLE - Usando datos de ejemplo")
-            all_recommendations = get_sample_recommendations()
-        else:
-            print("🔍 Llamando a get_recommendations...")
-            all_recommendations = get_recommendations(brands, budget, fuel, types, transmission, gender, age_range)
-            
-            print(f"📋 Resultado recibido:")
-            print(f"  Tipo: {type(all_recommendations)}")
-            print(f"  Cantidad: {len(all_recommendations) if isinstance(all_recommendations, list) else 'N/A'}")
-            
-            if not isinstance(all_recommendations, list):
-                print(f"⚠️ get_recommendations devolvió {type(all_recommendations)}, esperaba lista")
-                all_recommendations = get_sample_recommendations()
-        
-        # Aplicar personalización demográfica adicional si no se hizo en recommender
-        if gender and age_range and not any('demographic_bonus' in car for car in all_recommendations):
-            all_recommendations = apply_demographic_scoring(all_recommendations, gender, age_range)
-            print(f"🎯 Personalización adicional aplicada por género: {gender}, edad: {age_range}")
-        
-        # Los resultados ya vienen separados del recommender_minimal.py
-        # Solo necesitamos verificar que tengan el campo match_type
-        for car in all_recommendations:
-            if 'match_type' not in car:
-                # Si no tiene match_type, asignar basado en score
-                if car.get('similarity_score', 0) >= 85:
-                    car['match_type'] = 'filtered'
-                else:
-                    car['match_type'] = 'recommended'
+        # Normalizar la selección: la misma forma sirve al recomendador y al caché
+        preferences = normalize_preferences(brands, budget, fuel, types, transmission, gender, age_range)
+        cache_key = preference_key(preferences)
+        cache_version = catalog_store.version
+        request_log.set(catalog_version=cache_version)
+        logger.debug("🎯 Preferencias normalizadas: %s (género %s, edad %s)", preferences, gender, age_range)
         
-        # Contar por tipo
-        filtered_count = len([car for car in all_recommendations if car.get('match_type') == 'filtered'])
-        recommended_count = len([car for car in all_recommendations if car.get('match_type') == 'recommended'])
-        
-        print(f"📊 RESULTADOS PROCESADOS:")
-        print(f"  🔍 Filtrados exactos: {filtered_count}")
-        print(f"  🎯 Recomendaciones inteligentes: {recommended_count}")
-        
-        print(f"🎉 ÉXITO: Devolviendo {len(all_recommendations)} resultados totales")
-        print("="*60)
-        
-        return jsonify(all_recommendations)
+        # Paginación por sección (limit, cursor, section) y modo NDJSON (stream=1)
+        try:
+            page_request = PageRequest.from_args(request.args, cache_key, cache_version)
+        except StaleCursorError as e:
+            return jsonify({"error": str(e), "restart": True}), 410
+        except PaginationError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        if request.args.get('stream') in ('1', 'true'):
+            request_log.set(mode='stream')
+            return stream_recommendations(preferences, gender, age_range, cache_key, cache_version,
+                                          page_request or PageRequest())
+        request_log.set(mode='list' if page_request is None else 'page')
+        
+        all_recommendations = None
+        if RECOMMENDER_AVAILABLE:
+            with request_log.stage('cache'):
+                all_recommendations = RECOMMENDATION_CACHE.get(cache_key, cache_version)
+        request_log.set(cache_hit=all_recommendations is not None)
+        
+        if all_recommendations is None:
+            with request_log.stage('recommend'):
+                all_recommendations = collect_sections(
+                    iter_response_sections(preferences, gender, age_range), gender, age_range
+                )
+            if RECOMMENDER_AVAILABLE:
+                RECOMMENDATION_CACHE.set(cache_key, all_recommendations, cache_version)
+        request_log.set(results=len(all_recommendations))
+        
+        with request_log.stage('serialize'):
+            if page_request is not None:
+                return jsonify(paginate(split_sections(all_recommendations), page_request, cache_key, cache_version))
+            return jsonify(all_recommendations)
         
     except Exception as e:
-        # Log completo del error
-        error_traceback = traceback.format_exc()
-        print(f"💥 ERROR en api_recommendations:")
-        print(error_traceback)
+        logger.exception("💥 ERROR en api_recommendations: %s", e)
+        request_log.set(error=str(e))
         
         return jsonify({
             "error": f"Error interno del servidor: {str(e)}",
             "details": "Revisa la consola del servidor para más información"
         }), 500
 
+def iter_response_sections(preferences, gender, age_range):
+    """
+    Secciones listas para responder, en el orden en que las entrega el
+    recomendador: con la personalización demográfica y match_type en cada auto
+    """
+    if not RECOMMENDER_AVAILABLE:
+        logger.warning("⚠️ RECOMMENDER NO DISPONIBLE - Usando datos de ejemplo")
+        FALLBACKS.inc(reason='sample_data')
+        sections = split_sections(get_sample_recommendations()).items()
+    else:
+        sections = iter_recommendations(**preferences)
+    
+    request_log = current_request_log()
+    for section, cars in sections:
+        # Aplicar personalización demográfica adicional si no se hizo en recommender
+        if gender and age_range and not any('demographic_bonus' in car for car in cars):
+            cars = apply_demographic_scoring(cars, gender, age_range)
+        
+        for car in cars:
+            car.setdefault('match_type', section)
+        
+        request_log.set(**{section: len(cars)})
+        yield section, cars
+
+def collect_sections(sections, gender, age_range):
+    """
+    Lista completa (la respuesta sin paginar y la que se guarda en caché), con
+    las secciones en el orden de SECTIONS aunque hayan llegado en otro
+    """
+    by_section = dict(sections)
+    all_recommendations = [car for section in SECTIONS for car in by_section.get(section, [])]
+    if gender and age_range:
+        # Mismo orden que la puntuación demográfica sobre la lista completa
+        all_recommendations.sort(key=lambda x: x.get('similarity_score', 0), reverse=True)
+    return all_recommendations
+
+def stream_recommendations(preferences, gender, age_range, cache_key, cache_version, page_request):
+    """
+    Respuesta NDJSON: una línea por sección en cuanto está lista (los filtrados
+    antes de calcular las recomendaciones) con su primera página y cursor, y una
+    línea final 'done'. La lista completa queda en caché para las páginas siguientes
+    """
+    cached = RECOMMENDATION_CACHE.get(cache_key, cache_version) if RECOMMENDER_AVAILABLE else None
+    current_request_log().set(cache_hit=cached is not None)
+    
+    def generate():
+        request_log = current_request_log()
+        sent = set()
+        computed = []
+        try:
+            if cached is not None:
+                sections = split_sections(cached).items()
+            else:
+                sections = iter_response_sections(preferences, gender, age_range)
+            
+            for section, cars in sections:
+                if cached is None:
+                    computed.append((section, cars))
+                if section in page_request.sections:
+                    sent.add(section)
+                    request_log.mark('first_section')
+                    yield ndjson_line({'section': section, **page(
+                        cars, section, page_request.offset, page_request.limit, cache_key, cache_version
+                    )})
+            
+            # Secciones sin resultados, para que el cliente sepa que no vendrá nada más
+            for section in page_request.sections:
+                if section not in sent:
+                    yield ndjson_line({'section': section, **page(
+                        [], section, page_request.offset, page_request.limit, cache_key, cache_version
+                    )})
+            
+            if cached is None and RECOMMENDER_AVAILABLE:
+                RECOMMENDATION_CACHE.set(cache_key, collect_sections(computed, gender, age_range), cache_version)
+            yield ndjson_line({'done': True, 'catalog_version': cache_version})
+        except Exception as e:
+            # Los encabezados ya se enviaron: el error viaja como una línea más
+            logger.exception("💥 ERROR en stream de recomendaciones: %s", e)
+            request_log.set(error=str(e))
+            yield ndjson_line({'error': f"Error interno del servidor: {str(e)}"})
+    
+    return Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE,
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 def get_sample_recommendations():
     """Obtener recomendaciones de ejemplo con separación de tipos"""
     sample_data = [
@@ -690,12 +778,13 @@ def get_age_group(age_range):
 @app.route("/api/debug/session", methods=["GET"])
 def debug_session():
     session_data = dict(session)
+    user_counts = USER_STORE.counts()
     debug_info = {
         "session_data": session_data,
         "session_keys": list(session_data.keys()),
         "recommender_available": RECOMMENDER_AVAILABLE,
-        "users_count": len(USERS_DB),
-        "profiles_count": len(USER_PROFILES),
+        "users_count": user_counts['users'],
+        "profiles_count": user_counts['profiles'],
         "all_present": all([
             session.get('selected_brands'),
             session.get('selected_budget'),
@@ -715,15 +804,19 @@ def clear_session():
 
 @app.route("/api/debug/system-status", methods=["GET"])
 def system_status():
+    user_counts = USER_STORE.counts()
     status = {
         "flask": "✅ Funcionando",
         "recommender": "✅ Disponible" if RECOMMENDER_AVAILABLE else "❌ No disponible",
         "session_active": "✅ Activa" if session.get('logged_in') else "❌ No logueado",
-        "users_count": len(USERS_DB),
-        "profiles_count": len(USER_PROFILES),
-        "favorites_count": sum(len(favs) for favs in USER_FAVORITES.values()),
+        "users_count": user_counts['users'],
+        "profiles_count": user_counts['profiles'],
+        "favorites_count": user_counts['favorites'],
         "demographic_features": "✅ Activas",
-        "filtered_and_recommended_separation": "✅ Implementado"
+        "filtered_and_recommended_separation": "✅ Implementado",
+        "recommendation_cache": RECOMMENDATION_CACHE.stats(),
+        "metrics": REGISTRY.snapshot(),
+        "neo4j": get_readiness() if RECOMMENDER_AVAILABLE else None
     }
     
     if RECOMMENDER_AVAILABLE:
@@ -744,6 +837,35 @@ def system_status():
     
     return jsonify(status)
 
+@app.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    """Latencia por etapa y contadores en formato de texto de Prometheus"""
+    return Response(REGISTRY.expose(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+@app.route("/api/ready", methods=["GET"])
+def readiness():
+    """Readiness: 200 cuando el recomendador ya está conectado a Neo4j, 503 mientras conecta"""
+    if not RECOMMENDER_AVAILABLE:
+        return jsonify({"ready": False, "state": "unavailable"}), 503
+    
+    status = get_readiness()
+    return jsonify(status), 200 if status["ready"] else 503
+
+@app.route("/api/debug/reload-catalog", methods=["POST"])
+def reload_catalog_endpoint():
+    """Recargar el catálogo en memoria después de modificar la base de datos"""
+    if not RECOMMENDER_AVAILABLE:
+        return jsonify({"success": False, "error": "Recommender no disponible"}), 503
+    
+    try:
+        snapshot = reload_catalog()
+        RECOMMENDATION_CACHE.clear()
+        print(f"📦 Catálogo recargado: versión {snapshot.version}, {len(snapshot)} autos")
+        return jsonify({"success": True, "version": snapshot.version, "cars": len(snapshot)})
+    except Exception as e:
+        print(f"❌ Error recargando catálogo: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
 @app.route("/logout")
 def logout():
     user_email = session.get('user_email', 'Usuario')
@@ -779,8 +901,7 @@ def clear_favorites():
         return jsonify({"success": False, "error": "No autenticado"}), 401
     
     user_email = session.get('user_email')
-    if user_email in USER_FAVORITES:
-        USER_FAVORITES[user_email] = []
+    USER_STORE.clear_favorites(user_email)
     
     return jsonify({"success": True})
 
@@ -804,6 +925,7 @@ if __name__ == "__main__":
     print("  ❤️  POST /api/add-favorite -> agregar favorito")
     print("  🎨 POST /api/save-theme -> guardar tema preferido")
     print("  🔍 GET  /api/debug/system-status -> estado del sistema")
+    print("  🔍 GET  /api/ready -> readiness (conexión con Neo4j)")
     print("\n🎯 FUNCIONALIDADES AVANZADAS:")
     print("  🔍 Resultados Filtrados: Coincidencias exactas con criterios (Score 85-100)")
     print("  🎯 Recomendaciones IA: Sugerencias inteligentes personalizadas (Score 50-84)")
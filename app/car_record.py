@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Registro compacto e inmutable de un auto
+Reemplaza los diccionarios por auto del catálogo y de los candidatos: usa
+__slots__ (sin __dict__ por instancia), guarda las facetas como textos
+internados (un solo 'Toyota' en memoria para todo el catálogo) y las
+características como tupla. Se puede leer como el diccionario de antes
+(car['marca'], car.get('precio')), también con las claves en inglés de la API
+(car['brand']). Los diccionarios bilingües de respuesta se arman solo al
+serializar, con bilingual().
+"""
+
+import sys
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+FIELDS: Tuple[str, ...] = ('id', 'modelo', 'marca', 'año', 'precio', 'tipo', 'combustible',
+                           'transmision', 'caracteristicas', 'segmento', 'trim_level')
+
+# Campos con pocos valores distintos repetidos en miles de autos
+INTERNED_FIELDS = ('marca', 'tipo', 'combustible', 'transmision', 'segmento', 'trim_level')
+
+# Clave de la API en inglés -> campo
+ENGLISH_KEYS: Dict[str, str] = {
+    'model': 'modelo',
+    'brand': 'marca',
+    'year': 'año',
+    'price': 'precio',
+    'type': 'tipo',
+    'fuel': 'combustible',
+    'transmission': 'transmision',
+    'features': 'caracteristicas',
+    'segment': 'segmento',
+}
+
+def intern_value(value: Any) -> Any:
+    return sys.intern(value) if type(value) is str else value
+
+def _restore(cls, values: Tuple[Any, ...]) -> 'CarRecord':
+    record = object.__new__(cls)
+    for field, value in zip(FIELDS, values):
+        object.__setattr__(record, field, value)
+    return record
+
+class CarRecord:
+    __slots__ = FIELDS
+
+    def __init__(self, id: Any, modelo: Optional[str] = None, marca: Optional[str] = None,
+                 año: Optional[int] = None, precio: Optional[float] = None,
+                 tipo: Optional[str] = None, combustible: Optional[str] = None,
+                 transmision: Optional[str] = None,
+                 caracteristicas: Optional[Iterable[str]] = None,
+                 segmento: Optional[str] = None, trim_level: Optional[str] = None):
+        assign = object.__setattr__
+        assign(self, 'id', id)
+        assign(self, 'modelo', modelo)
+        assign(self, 'año', año)
+        assign(self, 'precio', precio)
+        assign(self, 'caracteristicas', tuple(caracteristicas) if caracteristicas is not None else None)
+        assign(self, 'marca', intern_value(marca))
+        assign(self, 'tipo', intern_value(tipo))
+        assign(self, 'combustible', intern_value(combustible))
+        assign(self, 'transmision', intern_value(transmision))
+        assign(self, 'segmento', intern_value(segmento))
+        assign(self, 'trim_level', intern_value(trim_level))
+
+    @classmethod
+    def from_row(cls, row: Any) -> 'CarRecord':
+        """Registro desde un diccionario del catálogo o un Record de Neo4j (los registros se reutilizan)"""
+        if isinstance(row, CarRecord):
+            return row
+        return cls(*(row.get(field) for field in FIELDS))
+
+    def __setattr__(self, name: str, value: Any):
+        raise AttributeError(f"{type(self).__name__} es inmutable")
+
+    def __delattr__(self, name: str):
+        raise AttributeError(f"{type(self).__name__} es inmutable")
+
+    def __reduce__(self):
+        return (_restore, (type(self), self.values()))
+
+    @property
+    def name(self) -> str:
+        return f"{self.marca} {self.modelo} {self.año}"
+
+    # Lectura con la interfaz de los diccionarios que reemplaza
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, ENGLISH_KEYS.get(key, key))
+        except (AttributeError, TypeError):
+            raise KeyError(key) from None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key: str) -> bool:
+        return key in FIELDS or key in ENGLISH_KEYS or key == 'name'
+
+    def values(self) -> Tuple[Any, ...]:
+        return tuple(getattr(self, field) for field in FIELDS)
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, CarRecord):
+            return NotImplemented
+        return self.values() == other.values()
+
+    def __hash__(self) -> int:
+        return hash(self.values())
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(id={self.id!r}, {self.name!r}, precio={self.precio!r})"
+
+    # Vistas para serializar
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Diccionario con las claves en español del catálogo"""
+        data = {field: getattr(self, field) for field in FIELDS}
+        if self.caracteristicas is not None:
+            data['caracteristicas'] = list(self.caracteristicas)
+        return data
+
+    def bilingual(self, **extra: Any) -> Dict[str, Any]:
+        """Diccionario de respuesta con claves en inglés y sus alias en español, más extra"""
+        features = list(self.caracteristicas or ())
+        data = {
+            'id': self.id,
+            'name': self.name,
+            'modelo': self.modelo,
+            'brand': self.marca,
+            'marca': self.marca,
+            'year': self.año,
+            'año': self.año,
+            'price': self.precio,
+            'precio': self.precio,
+            'type': self.tipo,
+            'tipo': self.tipo,
+            'fuel': self.combustible,
+            'combustible': self.combustible,
+            'transmission': self.transmision,
+            'transmision': self.transmision,
+            'features': features,
+            'caracteristicas': features,
+            'segmento': self.segmento,
+            'trim_level': self.trim_level,
+            'image': None
+        }
+        data.update(extra)
+        return data
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Representación columnar del catálogo para puntuación vectorizada
+Cada faceta se guarda como un arreglo de enteros codificados y el precio como
+arreglo de flotantes, de modo que la puntuación se calcula con máscaras
+booleanas sobre todos los autos a la vez
+"""
+
+import logging
+from typing import List, Dict, Any, Iterable, Optional
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Valores por defecto que usa el recomendador cuando una faceta no existe
+FACET_DEFAULTS = {
+    'marca': None,
+    'tipo': 'No especificado',
+    'combustible': 'No especificado',
+    'transmision': 'No especificada',
+    'segmento': None,
+}
+
+class ColumnarCatalog:
+    """Columnas NumPy construidas desde una CatalogSnapshot (mismo orden de autos)"""
+
+    def __init__(self, cars: List[Dict[str, Any]]):
+        if not NUMPY_AVAILABLE:
+            raise ImportError("numpy no está instalado")
+
+        self.size = len(cars)
+        self.price = np.fromiter((float(car.get('precio') or 0) for car in cars),
+                                 dtype=np.float64, count=self.size)
+        self.has_price = np.fromiter((car.get('precio') is not None for car in cars),
+                                     dtype=bool, count=self.size)
+        self.has_features = np.fromiter((bool(car.get('caracteristicas')) for car in cars),
+                                        dtype=bool, count=self.size)
+
+        # Facetas codificadas como enteros con su vocabulario
+        self.codes: Dict[str, Any] = {}
+        self.vocabularies: Dict[str, List[Any]] = {}
+        self.lookup: Dict[str, Dict[Any, int]] = {}
+        for facet, default in FACET_DEFAULTS.items():
+            vocabulary: List[Any] = []
+            lookup: Dict[Any, int] = {}
+            codes = np.empty(self.size, dtype=np.int32)
+            for position, car in enumerate(cars):
+                value = car.get(facet) or default
+                code = lookup.get(value)
+                if code is None:
+                    code = len(vocabulary)
+                    lookup[value] = code
+                    vocabulary.append(value)
+                codes[position] = code
+            self.codes[facet] = codes
+            self.vocabularies[facet] = vocabulary
+            self.lookup[facet] = lookup
+
+        # Texto de características en minúsculas, para máscaras de palabras clave
+        self._features_text = [" ".join(car.get('caracteristicas') or []).lower() for car in cars]
+        self._keyword_masks: Dict[tuple, Any] = {}
+
+    @classmethod
+    def from_snapshot(cls, snapshot) -> 'ColumnarCatalog':
+        return cls(snapshot.cars)
+
+    def isin(self, facet: str, values: Optional[Iterable[Any]]):
+        """Máscara booleana de autos cuya faceta está en values"""
+        lookup = self.lookup[facet]
+        codes = [lookup[value] for value in (values or []) if value in lookup]
+        if not codes:
+            return np.zeros(self.size, dtype=bool)
+        return np.isin(self.codes[facet], codes)
+
+    def equals(self, facet: str, value: Any):
+        """Máscara booleana de autos cuya faceta es exactamente value"""
+        code = self.lookup[facet].get(value)
+        if code is None:
+            return np.zeros(self.size, dtype=bool)
+        return self.codes[facet] == code
+
+    def map_values(self, facet: str, mapping: Dict[Any, float], default: float = 0.0):
+        """Arreglo de valores por auto según un diccionario valor -> número"""
+        table = np.full(len(self.vocabularies[facet]), default, dtype=np.float64)
+        lookup = self.lookup[facet]
+        for value, number in mapping.items():
+            code = lookup.get(value)
+            if code is not None:
+                table[code] = number
+        return table[self.codes[facet]]
+
+    def keyword_mask(self, keywords: Iterable[str]):
+        """Autos con alguna palabra clave en sus características (calculado una vez)"""
+        key = tuple(keywords)
+        mask = self._keyword_masks.get(key)
+        if mask is None:
+            mask = np.fromiter((any(keyword in text for keyword in key) for text in self._features_text),
+                               dtype=bool, count=self.size)
+            mask &= self.has_features
+            self._keyword_masks[key] = mask
+        return mask
+
+def get_columns(snapshot) -> Optional[ColumnarCatalog]:
+    """Columnas de la instantánea, o None si numpy no está disponible"""
+    if not NUMPY_AVAILABLE or snapshot is None:
+        return None
+    return snapshot.derived('columns', ColumnarCatalog.from_snapshot)
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Archivo binario del catálogo para arrancar sin Neo4j
+Guarda autos, facetas, similitudes SIMILAR_A y perfiles demográficos en
+columnas (arreglos de enteros y flotantes) más una tabla de textos sin
+repetidos. Al cargarlo se lee entero de una vez y cada columna es un
+memoryview sobre esos bytes, sin parsear texto; después se decodifica a los
+diccionarios de CatalogSnapshot. Se sirve desde los CarRecords de la
+instantánea, no desde el archivo, así que no se mapea con mmap.
+
+Formato (little-endian, secciones alineadas a 8 bytes):
+    cabecera   MAGIC, versión, número de secciones
+    directorio por sección: nombre, tipo de arreglo, offset, cantidad
+    secciones  arreglos con los códigos de tipo de `array` ('I', 'i', 'd', 'B')
+"""
+
+import array
+import logging
+import math
+import os
+import struct
+import sys
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"CATG"
+FORMAT_VERSION = 1
+
+HEADER = struct.Struct("<4sII")
+SECTION_ENTRY = struct.Struct("<16scxxxQQ")
+ALIGNMENT = 8
+
+NULL_INDEX = 0xFFFFFFFF
+NULL_YEAR = -2 ** 31
+
+# Columnas de texto de cada auto (índices en la tabla de textos)
+STRING_COLUMNS = ('id', 'modelo', 'marca', 'tipo', 'combustible', 'transmision',
+                  'segmento', 'trim_level')
+
+# Ruta por defecto; se puede cambiar con la variable de entorno CATALOG_FILE
+DEFAULT_CATALOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "catalog.bin")
+
+def catalog_file_path() -> str:
+    return os.environ.get("CATALOG_FILE", DEFAULT_CATALOG_PATH)
+
+class CatalogFileError(Exception):
+    """El archivo no es un catálogo válido o es de otra versión del formato"""
+    pass
+
+class StringTable:
+    """Textos sin repetidos; cada valor se guarda una vez y se referencia por índice"""
+
+    def __init__(self):
+        self.index: Dict[str, int] = {}
+        self.values: List[str] = []
+
+    def add(self, value: Any) -> int:
+        if value is None:
+            return NULL_INDEX
+        value = str(value)
+        position = self.index.get(value)
+        if position is None:
+            position = len(self.values)
+            self.index[value] = position
+            self.values.append(value)
+        return position
+
+    def add_list(self, values: Iterable[Any], offsets: array.array, items: array.array):
+        """Agregar una lista de textos como rango [offsets[i], offsets[i+1]) en items"""
+        for value in values or []:
+            items.append(self.add(value))
+        offsets.append(len(items))
+
+def _little_endian(data: array.array) -> bytes:
+    if sys.byteorder == 'big' and data.itemsize > 1:
+        data = array.array(data.typecode, data)
+        data.byteswap()
+    return data.tobytes()
+
+def _uint32() -> array.array:
+    return array.array('I')
+
+def write_catalog_file(snapshot, path: str) -> int:
+    """
+    Escribir una CatalogSnapshot en formato binario; devuelve los bytes escritos.
+    La escritura es atómica (archivo temporal + os.replace).
+    """
+    strings = StringTable()
+    cars = snapshot.cars
+
+    sections: List[Tuple[str, array.array]] = []
+    for column in STRING_COLUMNS:
+        codes = _uint32()
+        codes.extend(strings.add(car.get(column)) for car in cars)
+        sections.append((f"car.{column}", codes))
+
+    years = array.array('i', (NULL_YEAR if car.get('año') is None else int(car['año']) for car in cars))
+    prices = array.array('d', (math.nan if car.get('precio') is None else float(car['precio']) for car in cars))
+    # Neo4j distingue enteros de flotantes; se conserva el tipo original del precio
+    integer_prices = array.array('B', (isinstance(car.get('precio'), int) for car in cars))
+    feature_offsets, feature_items = _uint32(), _uint32()
+    feature_offsets.append(0)
+    for car in cars:
+        strings.add_list(car.get('caracteristicas'), feature_offsets, feature_items)
+    sections += [("car.año", years), ("car.precio", prices), ("car.precio_int", integer_prices),
+                 ("car.feat_off", feature_offsets), ("car.feat", feature_items)]
+
+    origins, targets = _uint32(), _uint32()
+    weights = array.array('d')
+    for origin, similar in snapshot.brand_similarities.items():
+        for target, weight in similar:
+            origins.append(strings.add(origin))
+            targets.append(strings.add(target))
+            weights.append(float(weight or 0.0))
+    sections += [("sim.origen", origins), ("sim.destino", targets), ("sim.peso", weights)]
+
+    profile_ids = _uint32()
+    brand_offsets, brand_items = _uint32(), _uint32()
+    type_offsets, type_items = _uint32(), _uint32()
+    brand_offsets.append(0)
+    type_offsets.append(0)
+    for profile_id, profile in snapshot.demographic_profiles.items():
+        profile_ids.append(strings.add(profile_id))
+        strings.add_list(profile.get('brands'), brand_offsets, brand_items)
+        strings.add_list(profile.get('types'), type_offsets, type_items)
+    sections += [("perfil.id", profile_ids),
+                 ("perfil.m_off", brand_offsets), ("perfil.marcas", brand_items),
+                 ("perfil.t_off", type_offsets), ("perfil.tipos", type_items)]
+
+    # Tabla de textos: offsets en bytes y el UTF-8 concatenado
+    encoded = [value.encode('utf-8') for value in strings.values]
+    string_offsets = _uint32()
+    string_offsets.append(0)
+    total = 0
+    for data in encoded:
+        total += len(data)
+        string_offsets.append(total)
+    sections = [("str.off", string_offsets), ("str.data", array.array('B', b"".join(encoded)))] + sections
+
+    directory_size = HEADER.size + SECTION_ENTRY.size * len(sections)
+    offset = _align(directory_size)
+    entries, payloads = [], []
+    for name, data in sections:
+        entries.append(SECTION_ENTRY.pack(name.encode('utf-8'), data.typecode.encode('ascii'),
+                                          offset, len(data)))
+        payload = _little_endian(data)
+        payloads.append((offset, payload))
+        offset = _align(offset + len(payload))
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(sections)))
+        f.write(b"".join(entries))
+        for payload_offset, payload in payloads:
+            f.write(b"\0" * (payload_offset - f.tell()))
+            f.write(payload)
+        size = f.tell()
+    os.replace(temp_path, path)
+
+    logger.info(f"💾 Catálogo escrito en {path}: {len(cars)} autos, "
+                f"{len(strings.values)} textos, {size} bytes")
+    return size
+
+def _align(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+class CatalogColumns:
+    """
+    Columnas del catálogo binario como memoryviews sobre los bytes leídos del
+    archivo; to_components decodifica a los diccionarios que usa CatalogSnapshot
+    """
+
+    def __init__(self, data: bytes, path: str = '<bytes>'):
+        self.path = path
+        self.data = data
+        self.columns: Dict[str, Any] = self._read_sections()
+
+    @classmethod
+    def read(cls, path: str) -> 'CatalogColumns':
+        with open(path, 'rb') as f:
+            return cls(f.read(), path)
+
+    def _read_sections(self) -> Dict[str, Any]:
+        if len(self.data) < HEADER.size:
+            raise CatalogFileError(f"Archivo de catálogo vacío o truncado: {self.path}")
+        magic, version, count = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC:
+            raise CatalogFileError(f"No es un archivo de catálogo: {self.path}")
+        if version != FORMAT_VERSION:
+            raise CatalogFileError(f"Versión de formato {version} no soportada (se esperaba {FORMAT_VERSION})")
+        if len(self.data) < HEADER.size + count * SECTION_ENTRY.size:
+            raise CatalogFileError(f"Archivo de catálogo truncado: {self.path}")
+
+        base = memoryview(self.data)
+        columns = {}
+        for position in range(count):
+            name, typecode, offset, length = SECTION_ENTRY.unpack_from(
+                self.data, HEADER.size + position * SECTION_ENTRY.size
+            )
+            name = name.rstrip(b"\0").decode('utf-8')
+            typecode = typecode.decode('ascii')
+            itemsize = array.array(typecode).itemsize
+            end = offset + length * itemsize
+            if end > len(self.data):
+                raise CatalogFileError(f"Sección {name} fuera del archivo: {self.path}")
+
+            view = base[offset:end]
+            if sys.byteorder == 'big' and itemsize > 1:
+                # En máquinas big-endian no hay vista directa: copia con byteswap
+                data = array.array(typecode, view.tobytes())
+                data.byteswap()
+                columns[name] = data
+            else:
+                columns[name] = view.cast(typecode)
+        return columns
+
+    def __len__(self):
+        return len(self.columns['car.id'])
+
+    def strings(self) -> List[str]:
+        """Decodificar la tabla de textos (cada texto una sola vez)"""
+        offsets = self.columns['str.off']
+        data = self.columns['str.data']
+        return [bytes(data[offsets[i]:offsets[i + 1]]).decode('utf-8') for i in range(len(offsets) - 1)]
+
+    def to_components(self) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Autos, similitudes y perfiles con la misma forma que devuelve CATALOG_QUERY"""
+        strings = self.strings()
+        text = lambda index: None if index == NULL_INDEX else strings[index]
+        columns = self.columns
+
+        def ranges(offsets_name: str, items_name: str, position: int) -> List[str]:
+            offsets, items = columns[offsets_name], columns[items_name]
+            return [strings[index] for index in items[offsets[position]:offsets[position + 1]]]
+
+        string_columns = [(column, columns[f"car.{column}"]) for column in STRING_COLUMNS]
+        years, prices = columns['car.año'], columns['car.precio']
+        integer_prices = columns['car.precio_int']
+        cars = []
+        for position in range(len(self)):
+            car = {column: text(codes[position]) for column, codes in string_columns}
+            year = years[position]
+            price = prices[position]
+            car['año'] = None if year == NULL_YEAR else year
+            car['precio'] = None if math.isnan(price) else (int(price) if integer_prices[position] else price)
+            car['caracteristicas'] = ranges('car.feat_off', 'car.feat', position)
+            cars.append(car)
+
+        similarities = [
+            {'origen': strings[origin], 'destino': strings[target], 'peso': weight}
+            for origin, target, weight in zip(columns['sim.origen'], columns['sim.destino'], columns['sim.peso'])
+        ]
+        profiles = [
+            {'id': strings[profile_id],
+             'marcas': ranges('perfil.m_off', 'perfil.marcas', position),
+             'tipos': ranges('perfil.t_off', 'perfil.tipos', position)}
+            for position, profile_id in enumerate(columns['perfil.id'])
+        ]
+        return cars, similarities, profiles
+
+def read_catalog_file(path: str) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Leer el archivo y decodificarlo a autos, similitudes y perfiles"""
+    return CatalogColumns.read(path).to_components()
@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+"""
+Catálogo de autos sintético
+Datos de marcas, perfiles demográficos, similitudes y modelos con los que
+enhanced_database_setup.py puebla Neo4j, y la lógica de versiones,
+combustibles, transmisiones y características con la que arma cada auto.
+generate_cars() usa esa misma lógica para catálogos de cualquier tamaño
+(1k, 10k, 100k autos) y generate_snapshot() los publica como una instantánea
+en memoria, sin Neo4j (benchmarks y pruebas de carga). Con la misma semilla se
+obtiene siempre el mismo catálogo.
+"""
+
+import random
+from itertools import count
+from typing import Any, Dict, List, Optional
+
+from catalog_snapshot import CatalogSnapshot
+
+# Marcas con información contextual (origen, características, confiabilidad)
+BRAND_DATA = {
+    # Marcas japonesas - Confiabilidad, eficiencia
+    "Toyota": {"origen": "Japón", "caracteristicas": ["Confiable", "Eficiente", "Familiar"], "target_age": "25-55", "price_range": "medio", "reliability": 9},
+    "Honda": {"origen": "Japón", "caracteristicas": ["Confiable", "Deportivo", "Eficiente"], "target_age": "20-50", "price_range": "medio", "reliability": 9},
+    "Nissan": {"origen": "Japón", "caracteristicas": ["Innovador", "Confiable", "Tecnológico"], "target_age": "25-50", "price_range": "medio", "reliability": 8},
+    "Mazda": {"origen": "Japón", "caracteristicas": ["Deportivo", "Elegante", "Eficiente"], "target_age": "22-45", "price_range": "medio", "reliability": 8},
+    "Subaru": {"origen": "Japón", "caracteristicas": ["Aventurero", "Seguro", "AWD"], "target_age": "25-50", "price_range": "medio-alto", "reliability": 8},
+    "Mitsubishi": {"origen": "Japón", "caracteristicas": ["Aventurero", "Robusto", "Accesible"], "target_age": "22-45", "price_range": "medio-bajo", "reliability": 7},
+    "Lexus": {"origen": "Japón", "caracteristicas": ["Lujo", "Confiable", "Refinado"], "target_age": "35-65", "price_range": "alto", "reliability": 9},
+    
+    # Marcas alemanas - Ingeniería, performance, lujo
+    "BMW": {"origen": "Alemania", "caracteristicas": ["Deportivo", "Lujo", "Performance"], "target_age": "25-55", "price_range": "alto", "reliability": 7},
+    "Mercedes-Benz": {"origen": "Alemania", "caracteristicas": ["Lujo", "Elegante", "Tecnológico"], "target_age": "30-65", "price_range": "alto", "reliability": 7},
+    "Audi": {"origen": "Alemania", "caracteristicas": ["Deportivo", "Tecnológico", "Lujo"], "target_age": "25-55", "price_range": "alto", "reliability": 7},
+    "Volkswagen": {"origen": "Alemania", "caracteristicas": ["Familiar", "Confiable", "Europeo"], "target_age": "25-55", "price_range": "medio", "reliability": 7},
+    "Porsche": {"origen": "Alemania", "caracteristicas": ["Deportivo", "Lujo", "Performance"], "target_age": "30-60", "price_range": "muy-alto", "reliability": 8},
+    
+    # Marcas americanas - Potencia, espacio, tradición
+    "Ford": {"origen": "Estados Unidos", "caracteristicas": ["Potente", "Robusto", "Americano"], "target_age": "25-65", "price_range": "medio", "reliability": 6},
+    "Chevrolet": {"origen": "Estados Unidos", "caracteristicas": ["Potente", "Deportivo", "Americano"], "target_age": "20-60", "price_range": "medio", "reliability": 6},
+    "Tesla": {"origen": "Estados Unidos", "caracteristicas": ["Innovador", "Ecológico", "Tecnológico"], "target_age": "25-50", "price_range": "alto", "reliability": 7},
+    "Jeep": {"origen": "Estados Unidos", "caracteristicas": ["Aventurero", "Robusto", "Off-road"], "target_age": "25-55", "price_range": "medio-alto", "reliability": 6},
+    
+    # Marcas coreanas - Valor, garantía, modernas
+    "Hyundai": {"origen": "Corea del Sur", "caracteristicas": ["Accesible", "Moderno", "Garantía"], "target_age": "20-50", "price_range": "medio-bajo", "reliability": 8},
+    "Kia": {"origen": "Corea del Sur", "caracteristicas": ["Accesible", "Estiloso", "Garantía"], "target_age": "18-45", "price_range": "medio-bajo", "reliability": 8},
+    "Genesis": {"origen": "Corea del Sur", "caracteristicas": ["Lujo", "Moderno", "Valor"], "target_age": "30-60", "price_range": "alto", "reliability": 8},
+    
+    # Marcas europeas - Elegancia, diseño
+    "Volvo": {"origen": "Suecia", "caracteristicas": ["Seguro", "Familiar", "Elegante"], "target_age": "30-60", "price_range": "alto", "reliability": 8},
+    "Peugeot": {"origen": "Francia", "caracteristicas": ["Elegante", "Europeo", "Eficiente"], "target_age": "25-55", "price_range": "medio", "reliability": 7},
+    "Renault": {"origen": "Francia", "caracteristicas": ["Compacto", "Urbano", "Europeo"], "target_age": "20-50", "price_range": "medio-bajo", "reliability": 6},
+}
+
+# Perfiles demográficos detallados
+DEMOGRAPHIC_PROFILES = {
+    "hombre_18_25": {
+        "preferencias": ["Deportivo", "Performance", "Estiloso", "Accesible"],
+        "tipos_vehiculo": ["Coupé", "Hatchback", "Sedán"],
+        "marcas_recomendadas": ["Honda", "Mazda", "Hyundai", "Kia", "Chevrolet"],
+        "caracteristicas_importantes": ["Potencia", "Diseño", "Precio"]
+    },
+    "hombre_26_35": {
+        "preferencias": ["Versátil", "Confiable", "Tecnológico", "Deportivo"],
+        "tipos_vehiculo": ["Sedán", "SUV", "Crossover"],
+        "marcas_recomendadas": ["Toyota", "Honda", "BMW", "Audi", "Tesla"],
+        "caracteristicas_importantes": ["Confiabilidad", "Tecnología", "Performance"]
+    },
+    "hombre_36_50": {
+        "preferencias": ["Familiar", "Confiable", "Espacioso", "Lujo"],
+        "tipos_vehiculo": ["SUV", "Sedán", "Pickup"],
+        "marcas_recomendadas": ["Toyota", "Honda", "BMW", "Mercedes-Benz", "Volvo"],
+        "caracteristicas_importantes": ["Espacio", "Seguridad", "Confort"]
+    },
+    "hombre_51_plus": {
+        "preferencias": ["Lujo", "Confort", "Confiable", "Prestigio"],
+        "tipos_vehiculo": ["Sedán", "SUV"],
+        "marcas_recomendadas": ["Mercedes-Benz", "BMW", "Lexus", "Volvo", "Genesis"],
+        "caracteristicas_importantes": ["Lujo", "Confort", "Prestigio"]
+    },
+    "mujer_18_25": {
+        "preferencias": ["Estiloso", "Compacto", "Eficiente", "Accesible"],
+        "tipos_vehiculo": ["Hatchback", "Sedán", "Crossover"],
+        "marcas_recomendadas": ["Honda", "Toyota", "Mazda", "Hyundai", "Kia"],
+        "caracteristicas_importantes": ["Diseño", "Eficiencia", "Facilidad de manejo"]
+    },
+    "mujer_26_35": {
+        "preferencias": ["Seguro", "Confiable", "Familiar", "Eficiente"],
+        "tipos_vehiculo": ["SUV", "Crossover", "Sedán"],
+        "marcas_recomendadas": ["Toyota", "Honda", "Subaru", "Volvo", "Mazda"],
+        "caracteristicas_importantes": ["Seguridad", "Confiabilidad", "Espacio"]
+    },
+    "mujer_36_50": {
+        "preferencias": ["Familiar", "Seguro", "Espacioso", "Confiable"],
+        "tipos_vehiculo": ["SUV", "Minivan", "Crossover"],
+        "marcas_recomendadas": ["Toyota", "Honda", "Subaru", "Volvo", "Lexus"],
+        "caracteristicas_importantes": ["Seguridad", "Espacio familiar", "Confiabilidad"]
+    },
+    "mujer_51_plus": {
+        "preferencias": ["Confort", "Lujo", "Fácil manejo", "Confiable"],
+        "tipos_vehiculo": ["Sedán", "SUV"],
+        "marcas_recomendadas": ["Lexus", "Mercedes-Benz", "Volvo", "BMW", "Genesis"],
+        "caracteristicas_importantes": ["Confort", "Facilidad de uso", "Lujo"]
+    }
+}
+
+# Similitudes entre marcas para recomendaciones
+BRAND_SIMILARITIES = {
+    "Toyota": ["Honda", "Nissan", "Mazda", "Subaru", "Lexus"],
+    "Honda": ["Toyota", "Mazda", "Nissan", "Subaru", "Hyundai"],
+    "BMW": ["Audi", "Mercedes-Benz", "Lexus", "Genesis", "Volvo"],
+    "Mercedes-Benz": ["BMW", "Audi", "Lexus", "Genesis", "Volvo"],
+    "Audi": ["BMW", "Mercedes-Benz", "Lexus", "Volvo", "Genesis"],
+    "Tesla": ["BMW", "Audi", "Mercedes-Benz", "Genesis", "Volvo"],
+    "Ford": ["Chevrolet", "Jeep", "Toyota", "Honda", "Nissan"],
+    "Chevrolet": ["Ford", "Jeep", "Hyundai", "Kia", "Nissan"],
+    "Hyundai": ["Kia", "Honda", "Toyota", "Nissan", "Chevrolet"],
+    "Kia": ["Hyundai", "Honda", "Mazda", "Toyota", "Nissan"],
+    "Nissan": ["Toyota", "Honda", "Mazda", "Hyundai", "Subaru"],
+    "Mazda": ["Honda", "Toyota", "Nissan", "Subaru", "Kia"],
+    "Subaru": ["Toyota", "Honda", "Mazda", "Volvo", "Nissan"],
+    "Volvo": ["BMW", "Mercedes-Benz", "Audi", "Subaru", "Lexus"],
+    "Lexus": ["Mercedes-Benz", "BMW", "Audi", "Genesis", "Volvo"],
+    "Genesis": ["BMW", "Mercedes-Benz", "Audi", "Lexus", "Volvo"],
+    "Porsche": ["BMW", "Audi", "Mercedes-Benz", "Lexus", "Tesla"],
+    "Jeep": ["Ford", "Chevrolet", "Subaru", "Toyota", "Nissan"],
+    "Mitsubishi": ["Nissan", "Subaru", "Honda", "Hyundai", "Kia"],
+    "Peugeot": ["Renault", "Volkswagen", "Honda", "Toyota", "Hyundai"],
+    "Renault": ["Peugeot", "Volkswagen", "Hyundai", "Kia", "Honda"],
+    "Volkswagen": ["Audi", "BMW", "Honda", "Toyota", "Peugeot"],
+}
+
+# Modelos por marca
+MODELS_BY_BRAND = {
+    "Toyota": [
+        {"modelo": "Corolla", "tipo": "Sedán", "precio_base": 25000, "segmento": "compacto"},
+        {"modelo": "Camry", "tipo": "Sedán", "precio_base": 30000, "segmento": "medio"},
+        {"modelo": "RAV4", "tipo": "SUV", "precio_base": 35000, "segmento": "compacto"},
+        {"modelo": "Highlander", "tipo": "SUV", "precio_base": 40000, "segmento": "grande"},
+        {"modelo": "Prius", "tipo": "Hatchback", "precio_base": 28000, "segmento": "híbrido"},
+        {"modelo": "Sienna", "tipo": "Minivan", "precio_base": 35000, "segmento": "familiar"},
+        {"modelo": "Yaris", "tipo": "Hatchback", "precio_base": 18000, "segmento": "económico"},
+        {"modelo": "Avalon", "tipo": "Sedán", "precio_base": 38000, "segmento": "lujo"},
+    ],
+    "Honda": [
+        {"modelo": "Civic", "tipo": "Sedán", "precio_base": 27000, "segmento": "compacto"},
+        {"modelo": "Accord", "tipo": "Sedán", "precio_base": 31000, "segmento": "medio"},
+        {"modelo": "CR-V", "tipo": "SUV", "precio_base": 36000, "segmento": "compacto"},
+        {"modelo": "Pilot", "tipo": "SUV", "precio_base": 42000, "segmento": "grande"},
+        {"modelo": "Fit", "tipo": "Hatchback", "precio_base": 20000, "segmento": "económico"},
+        {"modelo": "Odyssey", "tipo": "Minivan", "precio_base": 38000, "segmento": "familiar"},
+        {"modelo": "HR-V", "tipo": "Crossover", "precio_base": 24000, "segmento": "compacto"},
+        {"modelo": "Ridgeline", "tipo": "Pickup", "precio_base": 40000, "segmento": "medio"},
+    ],
+    "BMW": [
+        {"modelo": "3 Series", "tipo": "Sedán", "precio_base": 45000, "segmento": "lujo"},
+        {"modelo": "5 Series", "tipo": "Sedán", "precio_base": 55000, "segmento": "lujo"},
+        {"modelo": "X3", "tipo": "SUV", "precio_base": 50000, "segmento": "lujo"},
+        {"modelo": "X5", "tipo": "SUV", "precio_base": 65000, "segmento": "lujo"},
+        {"modelo": "2 Series", "tipo": "Coupé", "precio_base": 40000, "segmento": "deportivo"},
+        {"modelo": "Z4", "tipo": "Convertible", "precio_base": 55000, "segmento": "deportivo"},
+        {"modelo": "X1", "tipo": "Crossover", "precio_base": 38000, "segmento": "lujo"},
+        {"modelo": "i3", "tipo": "Hatchback", "precio_base": 48000, "segmento": "eléctrico"},
+    ],
+    "Tesla": [
+        {"modelo": "Model 3", "tipo": "Sedán", "precio_base": 42000, "segmento": "eléctrico"},
+        {"modelo": "Model S", "tipo": "Sedán", "precio_base": 75000, "segmento": "lujo_eléctrico"},
+        {"modelo": "Model Y", "tipo": "SUV", "precio_base": 48000, "segmento": "eléctrico"},
+        {"modelo": "Model X", "tipo": "SUV", "precio_base": 85000, "segmento": "lujo_eléctrico"},
+        {"modelo": "Cybertruck", "tipo": "Pickup", "precio_base": 60000, "segmento": "eléctrico"},
+    ],
+    "Ford": [
+        {"modelo": "Focus", "tipo": "Hatchback", "precio_base": 22000, "segmento": "compacto"},
+        {"modelo": "Fusion", "tipo": "Sedán", "precio_base": 28000, "segmento": "medio"},
+        {"modelo": "Mustang", "tipo": "Coupé", "precio_base": 38000, "segmento": "deportivo"},
+        {"modelo": "Explorer", "tipo": "SUV", "precio_base": 40000, "segmento": "grande"},
+        {"modelo": "F-150", "tipo": "Pickup", "precio_base": 45000, "segmento": "trabajo"},
+        {"modelo": "Escape", "tipo": "Crossover", "precio_base": 28000, "segmento": "compacto"},
+        {"modelo": "Bronco", "tipo": "SUV", "precio_base": 35000, "segmento": "aventura"},
+        {"modelo": "Edge", "tipo": "SUV", "precio_base": 38000, "segmento": "medio"},
+    ],
+}
+
+# Variaciones de cada modelo en el catálogo base
+YEARS = [2022, 2023, 2024]
+TRIM_LEVELS = ["Base", "Premium", "Sport"]
+TRIM_PRICE_MODIFIERS = {"Base": 0, "Premium": 5000, "Sport": 8000}
+
+# Años de los catálogos generados (el más nuevo primero) y depreciación por año
+GENERATED_YEARS = list(range(2024, 2014, -1))
+DEPRECIATION_PER_YEAR = 1200
+EDITION_PRICE_STEP = 750
+MIN_PRICE = 8000
+
+# Probabilidad de cada combustible por tipo de vehículo
+FUEL_PROBABILITIES = {
+    "Sedán": {"Gasolina": 0.6, "Híbrido": 0.3, "Eléctrico": 0.1},
+    "SUV": {"Gasolina": 0.7, "Híbrido": 0.2, "Eléctrico": 0.1},
+    "Hatchback": {"Gasolina": 0.5, "Híbrido": 0.3, "Eléctrico": 0.2},
+    "Pickup": {"Gasolina": 0.8, "Diésel": 0.2},
+    "Coupé": {"Gasolina": 0.9, "Eléctrico": 0.1},
+    "Convertible": {"Gasolina": 0.95, "Eléctrico": 0.05},
+    "Crossover": {"Gasolina": 0.6, "Híbrido": 0.3, "Eléctrico": 0.1},
+    "Minivan": {"Gasolina": 0.8, "Híbrido": 0.2}
+}
+DEFAULT_FUEL_PROBABILITIES = {"Gasolina": 0.7, "Híbrido": 0.2, "Eléctrico": 0.1}
+
+BASE_FEATURES = ["Aire acondicionado", "Radio AM/FM", "Bluetooth"]
+
+PREMIUM_FEATURES = {
+    "Base": [],
+    "Premium": ["Pantalla táctil", "Cámara trasera", "Control crucero", "Asientos de tela premium"],
+    "Sport": ["Asientos deportivos", "Volante deportivo", "Suspensión deportiva", "Llantas de aleación"]
+}
+
+LUXURY_BRAND_FEATURES = {
+    "BMW": ["iDrive", "Asientos de cuero", "Faros LED", "Sistema de sonido premium"],
+    "Mercedes-Benz": ["MBUX", "Asientos de cuero Artico", "Faros LED Inteligentes", "Sonido Burmester"],
+    "Audi": ["MMI", "Asientos de cuero", "Faros Matrix LED", "Sistema Bang & Olufsen"],
+    "Tesla": ["Piloto automático", "Pantalla táctil 15\"", "Actualizaciones OTA", "Supercargador"],
+    "Lexus": ["Lexus Safety System", "Asientos de cuero", "Sistema Mark Levinson", "Faros LED"]
+}
+
+TYPE_SPECIFIC_FEATURES = {
+    "SUV": ["Tracción integral", "Control de descenso", "Barras de techo"],
+    "Pickup": ["Caja de carga", "Gancho de remolque", "Tracción 4x4"],
+    "Coupé": ["Suspensión deportiva", "Frenos de alto rendimiento", "Escape deportivo"],
+    "Convertible": ["Techo convertible", "Barra antivuelco", "Asientos con calefacción"],
+    "Hatchback": ["Asientos traseros abatibles", "Portón trasero", "Diseño compacto"],
+    "Minivan": ["Puertas corredizas", "Asientos capitán", "8 asientos", "Entretenimiento trasero"]
+}
+
+def select_fuel_by_probability(vehicle_type: str, rng: Any = random) -> str:
+    """Seleccionar combustible basado en probabilidades por tipo"""
+    probs = FUEL_PROBABILITIES.get(vehicle_type, DEFAULT_FUEL_PROBABILITIES)
+    return rng.choices(list(probs.keys()), weights=list(probs.values()))[0]
+
+def select_fuel(brand: str, model_info: Dict[str, Any], trim_level: str, rng: Any = random) -> str:
+    """Determinar combustible basado en marca y modelo"""
+    if brand == "Tesla":
+        return "Eléctrico"
+    if "Prius" in model_info["modelo"] or "Ioniq" in model_info["modelo"]:
+        return "Híbrido"
+    if "Sport" in trim_level and model_info["tipo"] in ["Coupé", "Convertible"]:
+        return "Gasolina"
+    return select_fuel_by_probability(model_info["tipo"], rng)
+
+def select_transmission(fuel: str, model_info: Dict[str, Any], trim_level: str, car_id: int) -> str:
+    """Determinar transmisión (una de cada tres versiones Sport de sedán o coupé es manual)"""
+    if fuel == "Eléctrico":
+        return "Automática"
+    if trim_level == "Sport" and model_info["tipo"] in ["Coupé", "Sedán"]:
+        return "Manual" if car_id % 3 == 0 else "Automática"
+    return "Automática"
+
+def generate_features(brand: str, model_info: Dict[str, Any], trim_level: str) -> List[str]:
+    """Generar características realistas basadas en marca, modelo y trim"""
+    features = BASE_FEATURES.copy()
+    features.extend(PREMIUM_FEATURES.get(trim_level, []))
+    features.extend(LUXURY_BRAND_FEATURES.get(brand, []))
+    features.extend(TYPE_SPECIFIC_FEATURES.get(model_info["tipo"], []))
+    
+    # Eliminar duplicados (conservando el orden, para que sea reproducible) y limitar características
+    return list(dict.fromkeys(features))[:8]
+
+def build_car(car_id: int, brand: str, model_info: Dict[str, Any], year: int, trim_level: str,
+              rng: Any = random, price: Optional[int] = None, suffix: str = '') -> Dict[str, Any]:
+    """Un auto con las claves del catálogo"""
+    fuel = select_fuel(brand, model_info, trim_level, rng)
+    if price is None:
+        price = model_info["precio_base"] + TRIM_PRICE_MODIFIERS[trim_level]
+    return {
+        "id": f"car_{car_id}",
+        "modelo": f"{model_info['modelo']} {trim_level}{suffix}",
+        "año": year,
+        "precio": price,
+        "marca": brand,
+        "tipo": model_info["tipo"],
+        "combustible": fuel,
+        "transmision": select_transmission(fuel, model_info, trim_level, car_id),
+        "caracteristicas": generate_features(brand, model_info, trim_level),
+        "segmento": model_info["segmento"],
+        "trim_level": trim_level
+    }
+
+def comprehensive_cars(rng: Any = random) -> List[Dict[str, Any]]:
+    """Catálogo base: cada modelo en los años de YEARS y los tres trim levels"""
+    cars = []
+    car_id = 1
+    for brand, models in MODELS_BY_BRAND.items():
+        for model_info in models:
+            for year in YEARS:
+                for trim_level in TRIM_LEVELS:
+                    cars.append(build_car(car_id, brand, model_info, year, trim_level, rng))
+                    car_id += 1
+    return cars
+
+def generate_cars(size: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    Catálogo de exactamente size autos con la lógica del catálogo base.
+    Recorre GENERATED_YEARS (con depreciación por año) y, cuando se acaban,
+    agrega ediciones numeradas de cada modelo con un precio algo distinto.
+    """
+    rng = random.Random(seed)
+    cars: List[Dict[str, Any]] = []
+    if size <= 0:
+        return cars
+    
+    car_id = 1
+    for edition in count():
+        suffix = f" Edición {edition + 1}" if edition else ''
+        for year in GENERATED_YEARS:
+            for brand, models in MODELS_BY_BRAND.items():
+                for model_info in models:
+                    for trim_level in TRIM_LEVELS:
+                        price = (model_info["precio_base"] + TRIM_PRICE_MODIFIERS[trim_level]
+                                 - (GENERATED_YEARS[0] - year) * DEPRECIATION_PER_YEAR
+                                 + edition * EDITION_PRICE_STEP)
+                        cars.append(build_car(car_id, brand, model_info, year, trim_level, rng,
+                                              price=max(MIN_PRICE, price), suffix=suffix))
+                        car_id += 1
+                        if len(cars) >= size:
+                            return cars
+    return cars
+
+def similarity_weight(brand1: str, brand2: str) -> float:
+    """Calcular peso de similitud entre dos marcas"""
+    if brand1 not in BRAND_DATA or brand2 not in BRAND_DATA:
+        return 0.5
+    
+    data1 = BRAND_DATA[brand1]
+    data2 = BRAND_DATA[brand2]
+    
+    weight = 0.0
+    
+    # Mismo origen (+0.3)
+    if data1["origen"] == data2["origen"]:
+        weight += 0.3
+    
+    # Características similares (+0.1 por cada coincidencia)
+    common_characteristics = set(data1["caracteristicas"]) & set(data2["caracteristicas"])
+    weight += len(common_characteristics) * 0.1
+    
+    # Rango de precio similar (+0.2)
+    if data1["price_range"] == data2["price_range"]:
+        weight += 0.2
+    
+    # Confiabilidad similar (+0.1)
+    reliability_diff = abs(data1["reliability"] - data2["reliability"])
+    if reliability_diff <= 1:
+        weight += 0.1
+    
+    return min(weight, 1.0)  # Máximo 1.0
+
+def similarity_edges() -> List[Dict[str, Any]]:
+    """Aristas SIMILAR_A con su peso, en la forma que lee CatalogSnapshot"""
+    return [
+        {'origen': brand, 'destino': similar_brand, 'peso': similarity_weight(brand, similar_brand)}
+        for brand, similar_brands in BRAND_SIMILARITIES.items()
+        for similar_brand in similar_brands
+    ]
+
+def demographic_profile_rows() -> List[Dict[str, Any]]:
+    """Perfiles con sus marcas y tipos recomendados, en la forma que lee CatalogSnapshot"""
+    return [
+        {'id': profile_id, 'marcas': profile["marcas_recomendadas"], 'tipos': profile["tipos_vehiculo"]}
+        for profile_id, profile in DEMOGRAPHIC_PROFILES.items()
+    ]
+
+def generate_snapshot(size: int, seed: int = 0) -> CatalogSnapshot:
+    """Instantánea en memoria con size autos generados, similitudes y perfiles (sin Neo4j)"""
+    return CatalogSnapshot(generate_cars(size, seed), similarity_edges(), demographic_profile_rows())
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Índices invertidos en bits para filtros exactos sobre el catálogo
+Cada valor de marca, tipo, combustible y transmisión tiene un bitset (un int
+de Python) con un bit por auto. Como la instantánea está ordenada por precio,
+un rango de precios es un bloque contiguo de bits que se obtiene con búsqueda
+binaria, y un filtro exacto se resuelve con unos pocos AND
+"""
+
+from bisect import bisect_left, bisect_right
+from typing import List, Dict, Any, Iterable, Iterator, Optional
+
+from preferences import normalize_preferences, parse_budget
+
+# Faceta del catálogo -> clave del auto en la instantánea
+INDEXED_FACETS = ('marca', 'tipo', 'combustible', 'transmision')
+
+def popcount(mask: int) -> int:
+    """Cantidad de bits encendidos"""
+    return bin(mask).count("1")
+
+class CatalogIndex:
+    """Bitsets por valor de faceta y arreglo de precios ordenado de una CatalogSnapshot"""
+
+    def __init__(self, cars: List[Dict[str, Any]]):
+        self.cars = cars
+        self.size = len(cars)
+        self.all_rows = (1 << self.size) - 1
+
+        # Se arma cada bitset en un bytearray y se convierte a int una sola vez;
+        # hacer OR bit a bit sobre un int grande copiaría el entero en cada paso
+        self.bitsets: Dict[str, Dict[Any, int]] = {}
+        byte_count = (self.size + 7) // 8
+        for facet in INDEXED_FACETS:
+            buffers: Dict[Any, bytearray] = {}
+            for position, car in enumerate(cars):
+                value = car.get(facet)
+                if value is not None:
+                    buffer = buffers.get(value)
+                    if buffer is None:
+                        buffer = buffers[value] = bytearray(byte_count)
+                    buffer[position >> 3] |= 1 << (position & 7)
+            self.bitsets[facet] = {value: int.from_bytes(buffer, 'little')
+                                   for value, buffer in buffers.items()}
+
+        # Los autos sin precio quedan al final de la instantánea, fuera de cualquier rango
+        self.prices = [car['precio'] for car in cars if car.get('precio') is not None]
+
+    @classmethod
+    def from_snapshot(cls, snapshot) -> 'CatalogIndex':
+        return cls(snapshot.cars)
+
+    def facet_mask(self, facet: str, values: Iterable[Any]) -> int:
+        """Autos cuya faceta toma alguno de los valores (OR de bitsets)"""
+        bitsets = self.bitsets[facet]
+        mask = 0
+        for value in values:
+            mask |= bitsets.get(value, 0)
+        return mask
+
+    def price_mask(self, min_price: Optional[float] = None, max_price: Optional[float] = None) -> int:
+        """Autos con precio en [min_price, max_price] como bloque contiguo de bits"""
+        low = 0 if min_price is None else bisect_left(self.prices, min_price)
+        high = len(self.prices) if max_price is None else bisect_right(self.prices, max_price)
+        if high <= low:
+            return 0
+        return ((1 << high) - 1) ^ ((1 << low) - 1)
+
+    def rows(self, mask: int) -> Iterator[Dict[str, Any]]:
+        """Autos del bitset en orden de precio ascendente"""
+        data = mask.to_bytes((self.size + 7) // 8, 'little')
+        for byte_index, byte in enumerate(data):
+            if not byte:
+                continue
+            base = byte_index << 3
+            for bit in range(8):
+                if byte & (1 << bit):
+                    yield self.cars[base + bit]
+
+    def facet_counts(self, mask: int, facets: Iterable[str] = INDEXED_FACETS) -> Dict[str, Dict[Any, int]]:
+        """Conteo por valor de cada faceta dentro del bitset"""
+        counts = {}
+        for facet in facets:
+            facet_counts = {}
+            for value, bits in self.bitsets[facet].items():
+                count = popcount(bits & mask)
+                if count:
+                    facet_counts[value] = count
+            counts[facet] = facet_counts
+        return counts
+
+def get_index(snapshot) -> Optional[CatalogIndex]:
+    """Índice de la instantánea, construido una vez por versión del catálogo"""
+    if snapshot is None:
+        return None
+    return snapshot.derived('index', CatalogIndex.from_snapshot)
+
+def build_filter_masks(index: CatalogIndex, brands=None, budget=None, fuel=None,
+                       types=None, transmission=None) -> Dict[str, int]:
+    """Un bitset por filtro presente en la selección del usuario"""
+    masks = {}
+    if brands:
+        masks['marca'] = index.facet_mask('marca', brands)
+    budget_range = parse_budget(budget)
+    if budget_range is not None:
+        masks['precio'] = index.price_mask(*budget_range)
+    if fuel:
+        masks['combustible'] = index.facet_mask('combustible', [fuel] if isinstance(fuel, str) else fuel)
+    if types:
+        masks['tipo'] = index.facet_mask('tipo', [types] if isinstance(types, str) else types)
+    if transmission:
+        masks['transmision'] = index.facet_mask('transmision',
+                                                [transmission] if isinstance(transmission, str) else transmission)
+    return masks
+
+def combine_masks(index: CatalogIndex, masks: Iterable[int]) -> int:
+    """AND de todos los bitsets (todo el catálogo si no hay filtros)"""
+    result = index.all_rows
+    for mask in masks:
+        result &= mask
+    return result
+
+def facet_counts_for_selection(index: CatalogIndex, brands=None, budget=None, fuel=None,
+                               types=None, transmission=None) -> Dict[str, Any]:
+    """
+    Conteos por faceta para las páginas de selección.
+    Cada faceta se cuenta con los demás filtros aplicados pero no el suyo, para
+    que el usuario vea cuántos autos quedarían al elegir otro valor. La selección
+    llega como la guarda el frontend ('gasolina', 'sedan', 'automatic'): se
+    normaliza a los valores del catálogo antes de buscar en los bitsets.
+    """
+    preferences = normalize_preferences(brands, budget, fuel, types, transmission)
+    masks = build_filter_masks(index, preferences['brands'], preferences['budget'], preferences['fuel'],
+                               preferences['types'], preferences['transmission'])
+    counts = {}
+    for facet in INDEXED_FACETS:
+        others = combine_masks(index, (mask for name, mask in masks.items() if name != facet))
+        counts[facet] = index.facet_counts(others, [facet])[facet]
+    return {
+        'total': popcount(combine_masks(index, masks.values())),
+        'facets': counts
+    }
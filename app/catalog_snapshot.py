@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Instantánea en memoria del catálogo de autos
+Carga todos los autos con sus facetas, las similitudes entre marcas y los
+perfiles demográficos en una sola lectura, para servir recomendaciones sin
+consultar Neo4j en cada solicitud
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import List, Dict, Any, Optional, Tuple
+
+from car_record import CarRecord
+from catalog_file import CatalogFileError, catalog_file_path, read_catalog_file, write_catalog_file
+
+logger = logging.getLogger(__name__)
+
+# Una sola consulta trae todo el catálogo; las comprensiones de patrón evitan
+# multiplicar filas cuando un auto tiene más de una relación del mismo tipo
+CATALOG_QUERY = """
+    CALL {
+        MATCH (a:Auto)
+        RETURN collect({
+            id: a.id,
+            modelo: a.modelo,
+            año: a.año,
+            precio: a.precio,
+            caracteristicas: a.caracteristicas,
+            segmento: a.segmento,
+            trim_level: a.trim_level,
+            marca: head([(a)-[:ES_MARCA]->(m:Marca) | m.nombre]),
+            tipo: head([(a)-[:ES_TIPO]->(t:Tipo) | t.categoria]),
+            combustible: head([(a)-[:USA_COMBUSTIBLE]->(c:Combustible) | c.tipo]),
+            transmision: head([(a)-[:TIENE_TRANSMISION]->(tr:Transmision) | tr.tipo])
+        }) AS autos
+    }
+    CALL {
+        MATCH (m1:Marca)-[r:SIMILAR_A]->(m2:Marca)
+        RETURN collect({origen: m1.nombre, destino: m2.nombre, peso: r.peso}) AS similitudes
+    }
+    CALL {
+        MATCH (p:PerfilDemografico)
+        RETURN collect({
+            id: p.id,
+            marcas: [(p)-[:RECOMIENDA_MARCA]->(m:Marca) | m.nombre],
+            tipos: [(p)-[:RECOMIENDA_TIPO]->(t:Tipo) | t.categoria]
+        }) AS perfiles
+    }
+    RETURN autos, similitudes, perfiles
+"""
+
+class CatalogSnapshot:
+    """Catálogo inmutable: se reemplaza completo en cada recarga, nunca se modifica"""
+
+    def __init__(self, cars: List[Dict[str, Any]], similarities: List[Dict[str, Any]],
+                 profiles: List[Dict[str, Any]], version: int = 0):
+        self.version = version
+        self.loaded_at = time.time()
+
+        # Autos como registros compactos, ordenados por precio (nulos al final),
+        # igual que ORDER BY a.precio ASC
+        self.cars = sorted((CarRecord.from_row(car) for car in cars),
+                           key=lambda car: (car.precio is None, car.precio or 0))
+        self.cars_by_id = {car['id']: car for car in self.cars}
+
+        # Aristas SIMILAR_A agrupadas por marca de origen
+        self.brand_similarities: Dict[str, List[Tuple[str, float]]] = {}
+        for edge in similarities:
+            self.brand_similarities.setdefault(edge['origen'], []).append(
+                (edge['destino'], edge.get('peso') or 0.0)
+            )
+
+        # Perfiles demográficos con listas ordenadas como en las consultas originales
+        self.demographic_profiles: Dict[str, Dict[str, List[str]]] = {}
+        for profile in profiles:
+            self.demographic_profiles[profile['id']] = {
+                'brands': sorted(b for b in profile.get('marcas') or [] if b is not None),
+                'types': sorted(t for t in profile.get('tipos') or [] if t is not None),
+            }
+
+        # Estructuras derivadas (columnas, índices) construidas bajo demanda
+        self._derived: Dict[str, Any] = {}
+
+    def __len__(self):
+        return len(self.cars)
+
+    def derived(self, name: str, factory):
+        """Estructura derivada calculada una sola vez por instantánea"""
+        value = self._derived.get(name)
+        if value is None:
+            value = factory(self)
+            self._derived[name] = value
+        return value
+
+    def similar_brands(self, selected_brands: List[str], limit: int = 10) -> List[str]:
+        """Equivalente en memoria de la consulta SIMILAR_A de get_brand_similarities"""
+        if not selected_brands:
+            return []
+
+        weights: Dict[str, List[float]] = {}
+        for brand in set(selected_brands):
+            for similar, weight in self.brand_similarities.get(brand, []):
+                weights.setdefault(similar, []).append(weight)
+
+        ranked = sorted(
+            weights.items(),
+            key=lambda item: (-(sum(item[1]) / len(item[1])), -len(item[1]))
+        )
+        similar = [brand for brand, _ in ranked[:limit]]
+        return [brand for brand in similar if brand not in selected_brands]
+
+    def demographic_recommendations(self, profile_id: str) -> Dict[str, List[str]]:
+        """Marcas y tipos recomendados para un perfil demográfico"""
+        profile = self.demographic_profiles.get(profile_id, {})
+        return {
+            "brands": list(profile.get('brands', [])),
+            "types": list(profile.get('types', [])),
+            "profile_id": profile_id
+        }
+
+    def candidates(self, relevant_brands: List[str], demographic_types: List[str],
+                   min_price: Optional[float], max_price: Optional[float],
+                   limit: int) -> List[Dict[str, Any]]:
+        """Autos candidatos por marca relevante, tipo demográfico o presupuesto"""
+        brands = set(relevant_brands or [])
+        types = set(demographic_types or [])
+
+        result = []
+        for car in self.cars:
+            price = car.precio
+            in_budget = price is not None and (
+                (min_price is None or price >= min_price) and
+                (max_price is None or price <= max_price * 1.3)
+            )
+            if car.marca in brands or car.tipo in types or in_budget:
+                result.append(car)
+                if len(result) >= limit:
+                    break
+        return result
+
+class CatalogStore:
+    """
+    Contenedor compartido de la instantánea vigente.
+    Las lecturas toman la referencia actual sin bloqueo; las recargas construyen
+    una instantánea nueva y la publican con una sola asignación atómica.
+    Sin Neo4j, la primera lectura intenta cargar el archivo binario del catálogo.
+    """
+
+    def __init__(self):
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._load_lock = threading.Lock()
+        self._version = 0
+        self._offline_attempted = False
+
+    @property
+    def snapshot(self) -> Optional[CatalogSnapshot]:
+        return self._snapshot
+
+    @property
+    def version(self) -> int:
+        snapshot = self._snapshot
+        return snapshot.version if snapshot else 0
+
+    def get(self, driver=None) -> Optional[CatalogSnapshot]:
+        """Devolver la instantánea vigente, cargándola la primera vez si hay driver"""
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return snapshot
+        if driver is None:
+            return self._load_offline()
+
+        with self._load_lock:
+            # Otro hilo pudo haberla cargado mientras esperábamos
+            if self._snapshot is None:
+                self._load(driver)
+            return self._snapshot
+
+    def reload(self, driver) -> CatalogSnapshot:
+        """Recargar el catálogo desde Neo4j y reemplazar la instantánea"""
+        with self._load_lock:
+            return self._load(driver)
+
+    def install(self, snapshot: CatalogSnapshot) -> CatalogSnapshot:
+        """Publicar una instantánea construida fuera de Neo4j"""
+        with self._load_lock:
+            self._version += 1
+            snapshot.version = self._version
+            self._snapshot = snapshot
+            return snapshot
+
+    def load_file(self, path: Optional[str] = None) -> CatalogSnapshot:
+        """Cargar la instantánea desde el archivo binario del catálogo (sin Neo4j)"""
+        with self._load_lock:
+            return self._load_file(path or catalog_file_path())
+
+    def save_file(self, path: Optional[str] = None) -> int:
+        """Escribir la instantánea vigente al archivo binario; devuelve los bytes escritos"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            raise ValueError("No hay catálogo cargado para guardar")
+        return write_catalog_file(snapshot, path or catalog_file_path())
+
+    def _load_offline(self) -> Optional[CatalogSnapshot]:
+        """Intentar una sola vez el archivo del catálogo cuando no hay driver"""
+        if self._offline_attempted:
+            return self._snapshot
+
+        with self._load_lock:
+            if self._offline_attempted:
+                return self._snapshot
+            self._offline_attempted = True
+
+            path = catalog_file_path()
+            if not os.path.exists(path):
+                return None
+            try:
+                return self._load_file(path)
+            except (OSError, CatalogFileError) as e:
+                logger.warning(f"⚠️ No se pudo cargar el catálogo desde {path}: {e}")
+                return None
+
+    def clear(self):
+        with self._load_lock:
+            self._snapshot = None
+
+    def _load(self, driver) -> CatalogSnapshot:
+        start = time.perf_counter()
+        with driver.session() as session:
+            record = session.execute_read(lambda tx: tx.run(CATALOG_QUERY).single())
+
+        snapshot = CatalogSnapshot(
+            cars=record['autos'] or [],
+            similarities=record['similitudes'] or [],
+            profiles=record['perfiles'] or [],
+            version=self._version + 1
+        )
+        self._version = snapshot.version
+        self._snapshot = snapshot
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        logger.info(f"📦 Catálogo cargado en memoria: {len(snapshot)} autos, "
+                    f"versión {snapshot.version} ({elapsed_ms:.0f} ms)")
+
+        # Copia local para arrancar sin Neo4j la próxima vez
+        try:
+            write_catalog_file(snapshot, catalog_file_path())
+        except OSError as e:
+            logger.warning(f"⚠️ No se pudo guardar el archivo del catálogo: {e}")
+        return snapshot
+
+    def _load_file(self, path: str) -> CatalogSnapshot:
+        start = time.perf_counter()
+        cars, similarities, profiles = read_catalog_file(path)
+        snapshot = CatalogSnapshot(cars, similarities, profiles, version=self._version + 1)
+        self._version = snapshot.version
+        self._snapshot = snapshot
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        logger.info(f"💾 Catálogo cargado desde {path}: {len(snapshot)} autos, "
+                    f"versión {snapshot.version} ({elapsed_ms:.0f} ms)")
+        return snapshot
+
+# Instancia compartida por todos los recomendadores del proceso
+catalog_store = CatalogStore()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Circuit breaker para las llamadas a Neo4j
+Lleva la tasa de fallos de las últimas llamadas; si supera el umbral el
+circuito se abre y durante open_seconds no se intenta ninguna consulta (el
+llamador sirve desde el catálogo en memoria). Pasado ese tiempo deja pasar una
+llamada de prueba (semiabierto): si funciona se cierra, si falla vuelve a abrirse
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+
+from metrics import NEO4J_ERRORS
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+class CircuitOpenError(Exception):
+    """La llamada no se intentó porque el circuito está abierto"""
+    pass
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_rate_threshold: float = 0.5,
+                 minimum_calls: int = 5, window_size: int = 20,
+                 open_seconds: float = 30.0, half_open_max_calls: int = 1):
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.minimum_calls = minimum_calls
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+        self.state = CLOSED
+        self.opened_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.rejected = 0
+        self.times_opened = 0
+        # True = fallo, en las últimas window_size llamadas
+        self._outcomes: deque = deque(maxlen=window_size)
+        self._probes = 0
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        """True si se puede intentar la llamada; en semiabierto reserva un lugar de prueba"""
+        with self._lock:
+            if self.state == OPEN:
+                if time.monotonic() - self.opened_at < self.open_seconds:
+                    self.rejected += 1
+                    return False
+                self.state = HALF_OPEN
+                self._probes = 0
+                logger.info(f"🟡 Circuito {self.name} semiabierto: probando Neo4j")
+
+            if self.state == HALF_OPEN:
+                if self._probes >= self.half_open_max_calls:
+                    self.rejected += 1
+                    return False
+                self._probes += 1
+            return True
+
+    def record_success(self):
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self.state = CLOSED
+                self._outcomes.clear()
+                self._probes = 0
+                logger.info(f"🟢 Circuito {self.name} cerrado: Neo4j responde de nuevo")
+            self._outcomes.append(False)
+
+    def record_failure(self, error: Any = None):
+        NEO4J_ERRORS.inc(source=self.name)
+        with self._lock:
+            if error is not None:
+                self.last_error = str(error)
+            if self.state == HALF_OPEN:
+                self._open()
+                return
+            self._outcomes.append(True)
+            if self.state == CLOSED and len(self._outcomes) >= self.minimum_calls:
+                if self.failure_rate() >= self.failure_rate_threshold:
+                    self._open()
+
+    def failure_rate(self) -> float:
+        if not self._outcomes:
+            return 0.0
+        return sum(self._outcomes) / len(self._outcomes)
+
+    def _open(self):
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self.times_opened += 1
+        self._probes = 0
+        logger.warning(f"🔴 Circuito {self.name} abierto por {self.open_seconds:.0f}s "
+                       f"(tasa de fallos {self.failure_rate():.0%}): {self.last_error}")
+
+    def call(self, function: Callable[..., Any], *args, **kwargs) -> Any:
+        """Ejecutar function a través del circuito; CircuitOpenError si está abierto"""
+        if not self.allow_request():
+            raise CircuitOpenError(f"Circuito {self.name} abierto")
+        try:
+            result = function(*args, **kwargs)
+        except Exception as e:
+            self.record_failure(e)
+            raise
+        self.record_success()
+        return result
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            retry_in = None
+            if self.state == OPEN:
+                retry_in = round(max(0.0, self.open_seconds - (time.monotonic() - self.opened_at)), 1)
+            return {
+                'state': self.state,
+                'failure_rate': round(self.failure_rate(), 3),
+                'calls_in_window': len(self._outcomes),
+                'times_opened': self.times_opened,
+                'rejected': self.rejected,
+                'retry_in': retry_in,
+                'last_error': self.last_error,
+            }
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Lector del volcado export.csv de Neo4j Browser
+Cada fila es un literal Cypher sin comillas en los valores, por ejemplo
+    "(:Marca {id: brand_1,nombre: Toyota})"
+    "(:Auto {id: car_1})-[:ES_MARCA {peso: 0.8}]->(:Marca {nombre: Toyota})"
+El lector recorre el archivo línea por línea y produce registros tipados de
+nodos y relaciones, que se pueden cargar en Neo4j por lotes (load_dump) o
+convertir directamente en un catálogo en memoria (catalog_components)
+"""
+
+import logging
+import re
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from bulk_loader import batched
+from graph_migration import node_key, write_nodes_query, write_relationships_query
+from graph_schema import AUTO_FACETS, apply_schema
+
+logger = logging.getLogger(__name__)
+
+class NodeRecord(NamedTuple):
+    labels: Tuple[str, ...]
+    properties: Dict[str, Any]
+
+    @property
+    def label(self) -> Optional[str]:
+        return self.labels[0] if self.labels else None
+
+    @property
+    def key(self) -> Any:
+        """Valor de la propiedad que identifica al nodo según su etiqueta"""
+        return self.properties.get(node_key(self.label)) if self.label else None
+
+class RelationshipRecord(NamedTuple):
+    start: NodeRecord
+    type: str
+    properties: Dict[str, Any]
+    end: NodeRecord
+
+Record = Union[NodeRecord, RelationshipRecord]
+
+class DumpParseError(ValueError):
+    """Una fila del volcado no tiene la forma de un nodo o camino Cypher"""
+    pass
+
+NODE_PATTERN = re.compile(r"^\s*(?P<labels>(?::\s*[^\s{:]+\s*)*)(?:\{(?P<props>.*)\})?\s*$", re.DOTALL)
+# Camino de un salto en cualquiera de los dos sentidos
+PATH_PATTERN = re.compile(
+    r"^\((?P<left>.*?)\)(?P<incoming><)?-\[(?P<rel>.*?)\]-(?P<outgoing>>)?\((?P<right>.*)\)$",
+    re.DOTALL
+)
+# Una coma solo separa propiedades si le sigue `clave:`; así "Calle 123, Ciudad A" queda entero
+PROPERTY_SEPARATOR = re.compile(r",\s*(?=[^\W\d][\w]*\s*:)")
+INTEGER = re.compile(r"^-?\d+$")
+FLOAT = re.compile(r"^-?(\d+\.\d*|\.\d+|\d+)([eE][-+]?\d+)?$")
+
+def parse_value(text: str) -> Any:
+    """Convertir un valor sin comillas a int, float, bool, None, lista o texto"""
+    text = text.strip()
+    if len(text) >= 2 and text[0] == text[-1] and text[0] in ("'", '"'):
+        return text[1:-1]
+    if text.startswith('[') and text.endswith(']'):
+        inner = text[1:-1].strip()
+        return [parse_value(item) for item in inner.split(',')] if inner else []
+    if INTEGER.match(text):
+        return int(text)
+    if FLOAT.match(text):
+        return float(text)
+    lowered = text.lower()
+    if lowered in ('true', 'false'):
+        return lowered == 'true'
+    if lowered == 'null':
+        return None
+    return text
+
+def parse_properties(text: Optional[str]) -> Dict[str, Any]:
+    properties = {}
+    if not text or not text.strip():
+        return properties
+    for part in PROPERTY_SEPARATOR.split(text.strip()):
+        key, separator, value = part.partition(':')
+        if not separator:
+            raise DumpParseError(f"Propiedad sin valor: {part!r}")
+        properties[key.strip()] = parse_value(value)
+    return properties
+
+def parse_node(text: str) -> NodeRecord:
+    match = NODE_PATTERN.match(text)
+    if not match:
+        raise DumpParseError(f"Nodo no reconocido: {text!r}")
+    labels = tuple(label.strip() for label in match.group('labels').split(':') if label.strip())
+    return NodeRecord(labels, parse_properties(match.group('props')))
+
+def parse_relationship(text: str) -> Tuple[str, Dict[str, Any]]:
+    node = parse_node(text)
+    if len(node.labels) != 1:
+        raise DumpParseError(f"Relación sin tipo: {text!r}")
+    return node.labels[0], node.properties
+
+def parse_line(line: str) -> Optional[Record]:
+    """Registro de una fila del volcado, o None si es la cabecera o está vacía"""
+    line = line.strip()
+    if len(line) >= 2 and line[0] == '"' and line[-1] == '"':
+        line = line[1:-1].replace('""', '"')
+    if not line or line == 'n':
+        return None
+    if not line.startswith('('):
+        raise DumpParseError(f"Fila no reconocida: {line!r}")
+
+    path = PATH_PATTERN.match(line)
+    if path:
+        left, right = parse_node(path.group('left')), parse_node(path.group('right'))
+        rel_type, properties = parse_relationship(path.group('rel'))
+        if path.group('incoming'):
+            left, right = right, left
+        return RelationshipRecord(left, rel_type, properties, right)
+
+    if not line.endswith(')'):
+        raise DumpParseError(f"Fila no reconocida: {line!r}")
+    return parse_node(line[1:-1])
+
+def iter_dump(path: str, strict: bool = False) -> Iterator[Record]:
+    """Recorrer el volcado sin cargarlo completo; con strict=False las filas inválidas se saltan"""
+    skipped = 0
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        for line_number, line in enumerate(f, 1):
+            try:
+                record = parse_line(line)
+            except DumpParseError as e:
+                if strict:
+                    raise DumpParseError(f"{path}:{line_number}: {e}") from e
+                skipped += 1
+                logger.warning(f"⚠️ Fila {line_number} ignorada: {e}")
+                continue
+            if record is not None:
+                yield record
+    if skipped:
+        logger.warning(f"⚠️ {skipped} filas del volcado no se pudieron leer")
+
+def load_dump(driver, records: Iterable[Record], batch_size: int = 500) -> Dict[str, int]:
+    """
+    Escribir los registros en Neo4j con UNWIND por lotes (MERGE por la clave de
+    cada etiqueta, igual que la migración). Los nodos sin clave se omiten.
+    Las relaciones se escriben al final, cuando ya existen sus extremos.
+    """
+    apply_schema(driver)
+    stats = {'nodes': 0, 'relationships': 0, 'skipped': 0}
+    pending_relationships: List[RelationshipRecord] = []
+
+    def write(session, query: str, rows: List[Dict[str, Any]]):
+        session.execute_write(lambda tx: tx.run(query, rows=rows).consume())
+
+    with driver.session() as session:
+        for batch in batched(records, batch_size):
+            nodes: Dict[str, List[Dict[str, Any]]] = {}
+            for record in batch:
+                if isinstance(record, RelationshipRecord):
+                    pending_relationships.append(record)
+                    # Los extremos de un camino también son nodos del volcado
+                    candidates = (record.start, record.end)
+                else:
+                    candidates = (record,)
+                for node in candidates:
+                    if node.key is None:
+                        stats['skipped'] += 1
+                        continue
+                    nodes.setdefault(node.label, []).append({'key': node.key, 'properties': node.properties})
+            for label, rows in nodes.items():
+                write(session, write_nodes_query(label), rows)
+                stats['nodes'] += len(rows)
+
+        for batch in batched(pending_relationships, batch_size):
+            groups: Dict[Tuple[str, str, str], List[Dict[str, Any]]] = {}
+            for record in batch:
+                if record.start.key is None or record.end.key is None:
+                    stats['skipped'] += 1
+                    continue
+                groups.setdefault((record.start.label, record.type, record.end.label), []).append({
+                    'start': record.start.key, 'end': record.end.key, 'properties': record.properties
+                })
+            for (start_label, rel_type, end_label), rows in groups.items():
+                write(session, write_relationships_query(start_label, rel_type, end_label), rows)
+                stats['relationships'] += len(rows)
+
+    logger.info(f"📥 Volcado cargado: {stats['nodes']} nodos, {stats['relationships']} relaciones, "
+                f"{stats['skipped']} omitidos")
+    return stats
+
+# Relación de faceta -> propiedad del auto
+_FACET_BY_RELATIONSHIP = {rel: (prop, key) for prop, (rel, _, key) in AUTO_FACETS.items()}
+
+def catalog_components(records: Iterable[Record]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Autos, similitudes y perfiles con la forma de CATALOG_QUERY, para CatalogSnapshot"""
+    cars: Dict[Any, Dict[str, Any]] = {}
+    similarities: List[Dict[str, Any]] = []
+    profiles: Dict[Any, Dict[str, Any]] = {}
+
+    def car_for(node: NodeRecord) -> Dict[str, Any]:
+        car = cars.setdefault(node.key, {'id': node.key})
+        car.update({k: v for k, v in node.properties.items() if k not in car or car[k] is None})
+        return car
+
+    def profile_for(node: NodeRecord) -> Dict[str, Any]:
+        return profiles.setdefault(node.key, {'id': node.key, 'marcas': [], 'tipos': []})
+
+    for record in records:
+        if isinstance(record, NodeRecord):
+            if record.label == 'Auto' and record.key is not None:
+                car_for(record)
+            elif record.label == 'PerfilDemografico' and record.key is not None:
+                profile_for(record)
+            continue
+
+        start, end = record.start, record.end
+        if start.label == 'Auto' and start.key is not None and record.type in _FACET_BY_RELATIONSHIP:
+            prop, key = _FACET_BY_RELATIONSHIP[record.type]
+            car_for(start)[prop] = end.properties.get(key)
+        elif record.type == 'SIMILAR_A':
+            similarities.append({
+                'origen': start.properties.get('nombre'),
+                'destino': end.properties.get('nombre'),
+                'peso': record.properties.get('peso')
+            })
+        elif start.label == 'PerfilDemografico' and start.key is not None:
+            if record.type == 'RECOMIENDA_MARCA':
+                profile_for(start)['marcas'].append(end.properties.get('nombre'))
+            elif record.type == 'RECOMIENDA_TIPO':
+                profile_for(start)['tipos'].append(end.properties.get('categoria'))
+
+    return list(cars.values()), similarities, list(profiles.values())
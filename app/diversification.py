@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Selección top-K y diversificación de recomendaciones
+Usa un heap para recorrer los candidatos en orden de puntuación sin ordenar
+toda la lista, y contadores por marca/tipo para calcular las penalizaciones de
+diversidad en O(1) por candidato
+"""
+
+import heapq
+import zlib
+from collections import Counter
+from typing import List, Any, Callable, Iterable
+
+def seeded_jitter(seed: str, item_id: Any, scale: float = 5.0) -> float:
+    """
+    Variación pseudoaleatoria en [0, scale) que depende solo de la semilla y del auto.
+    Reemplaza a rand(): da diversidad entre combinaciones de preferencias distintas
+    pero el mismo resultado para las mismas, así las respuestas se pueden cachear.
+    """
+    digest = zlib.crc32(f"{seed}:{item_id}".encode('utf-8'))
+    return digest / 0x100000000 * scale
+
+def top_k(items: Iterable[Any], k: int, key: Callable[[Any], Any]) -> List[Any]:
+    """
+    Los k mejores elementos en orden descendente, en O(n log k).
+    Equivale a sorted(items, key=key, reverse=True)[:k], incluido el orden de empates.
+    """
+    return heapq.nlargest(k, items, key=key)
+
+def diversify(items: List[Any], limit: int,
+              score_key: Callable[[Any], float],
+              brand_key: Callable[[Any], Any],
+              type_key: Callable[[Any], Any],
+              brand_penalty: float = 10,
+              type_penalty: float = 5,
+              min_score: float = 40,
+              new_brand_share: float = 0.7,
+              always_keep: int = 3) -> List[Any]:
+    """
+    Diversificar candidatos para no repetir siempre la misma marca/tipo.
+
+    Recorre los candidatos de mayor a menor puntuación (empates en el orden
+    original) y acepta uno si su puntuación menos las penalizaciones por marca y
+    tipo repetidos sigue siendo >= min_score, si aporta una marca nueva mientras
+    no se llena new_brand_share del límite, o si aún no hay always_keep elegidos.
+    Los lugares que queden se llenan con los mejores descartados.
+
+    El heap se construye en O(n) y solo se extraen los candidatos que se llegan a
+    examinar, así que el costo es O(n + m log n) con m examinados, en vez de
+    ordenar todo y recontar la selección en cada paso.
+    """
+    if not items or limit <= 0:
+        return []
+
+    heap = [(-score_key(item), position) for position, item in enumerate(items)]
+    heapq.heapify(heap)
+
+    selected: List[Any] = []
+    skipped: List[int] = []
+    brand_counts: Counter = Counter()
+    type_counts: Counter = Counter()
+
+    while heap and len(selected) < limit:
+        negative_score, position = heapq.heappop(heap)
+        item = items[position]
+        brand = brand_key(item)
+        vehicle_type = type_key(item)
+
+        diversity_score = (-negative_score
+                           - brand_counts[brand] * brand_penalty
+                           - type_counts[vehicle_type] * type_penalty)
+
+        if (diversity_score >= min_score or
+                (brand not in brand_counts and len(selected) < limit * new_brand_share) or
+                len(selected) < always_keep):
+            selected.append(item)
+            brand_counts[brand] += 1
+            type_counts[vehicle_type] += 1
+        else:
+            skipped.append(position)
+
+    # Segunda pasada: los descartados (ya en orden) y luego lo que quede en el heap
+    remaining_slots = limit - len(selected)
+    for position in skipped[:remaining_slots]:
+        selected.append(items[position])
+    remaining_slots = limit - len(selected)
+    while heap and remaining_slots > 0:
+        _, position = heapq.heappop(heap)
+        selected.append(items[position])
+        remaining_slots -= 1
+
+    return selected
+
+def diversify_by_keys(items: List[Any], limit: int, score_field: str = 'similarity_score',
+                      brand_field: str = 'marca', type_field: str = 'tipo',
+                      **options: Any) -> List[Any]:
+    """Atajo de diversify para diccionarios de autos"""
+    return diversify(
+        items, limit,
+        score_key=lambda item: item[score_field],
+        brand_key=lambda item: item.get(brand_field),
+        type_key=lambda item: item.get(type_field),
+        **options
+    )
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Registro de drivers de Neo4j compartidos por todo el proceso
+Cada driver de Neo4j mantiene su propio pool de conexiones; crear uno por
+componente (recomendadores, Gestionador, catálogo) multiplica conexiones y
+apretones de mano. Este módulo configura el pool desde variables de entorno y
+entrega el mismo driver a todos los que piden la misma URI y usuario.
+
+Variables de entorno (todas opcionales):
+    NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD (o NEO4J_PASSWORDS separadas por comas)
+    NEO4J_MAX_POOL_SIZE, NEO4J_ACQUISITION_TIMEOUT, NEO4J_CONNECTION_TIMEOUT,
+    NEO4J_MAX_CONNECTION_LIFETIME, NEO4J_LIVENESS_CHECK_TIMEOUT (segundos)
+"""
+
+import atexit
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from neo4j import GraphDatabase
+from neo4j.exceptions import AuthError
+
+logger = logging.getLogger(__name__)
+
+# Contraseñas que el proyecto probaba en cada componente, en el mismo orden
+DEFAULT_URI = "bolt://localhost:7687"
+DEFAULT_USER = "neo4j"
+DEFAULT_PASSWORDS = ["estructura", "proyectoNEO4J"]
+
+def _env_float(name: str, default: float) -> float:
+    value = os.environ.get(name)
+    if not value:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        logger.warning(f"⚠️ {name}={value!r} no es un número, se usa {default}")
+        return default
+
+class DriverConfig:
+    """URI, credenciales a probar y parámetros del pool de conexiones"""
+
+    def __init__(self, uri: str = DEFAULT_URI, user: str = DEFAULT_USER,
+                 passwords: Optional[List[str]] = None,
+                 max_pool_size: int = 50,
+                 acquisition_timeout: float = 10.0,
+                 connection_timeout: float = 5.0,
+                 max_connection_lifetime: float = 3600.0,
+                 liveness_check_timeout: Optional[float] = 30.0):
+        self.uri = uri
+        self.user = user
+        self.passwords = list(passwords) if passwords else list(DEFAULT_PASSWORDS)
+        self.max_pool_size = max_pool_size
+        self.acquisition_timeout = acquisition_timeout
+        self.connection_timeout = connection_timeout
+        self.max_connection_lifetime = max_connection_lifetime
+        # Conexiones ociosas más de este tiempo se verifican antes de reutilizarlas
+        self.liveness_check_timeout = liveness_check_timeout
+
+    @classmethod
+    def from_env(cls, **overrides: Any) -> 'DriverConfig':
+        password = os.environ.get("NEO4J_PASSWORD")
+        passwords = os.environ.get("NEO4J_PASSWORDS")
+        settings = {
+            'uri': os.environ.get("NEO4J_URI", DEFAULT_URI),
+            'user': os.environ.get("NEO4J_USER", DEFAULT_USER),
+            'passwords': [password] if password else
+                         [p.strip() for p in passwords.split(",") if p.strip()] if passwords else None,
+            'max_pool_size': int(_env_float("NEO4J_MAX_POOL_SIZE", 50)),
+            'acquisition_timeout': _env_float("NEO4J_ACQUISITION_TIMEOUT", 10.0),
+            'connection_timeout': _env_float("NEO4J_CONNECTION_TIMEOUT", 5.0),
+            'max_connection_lifetime': _env_float("NEO4J_MAX_CONNECTION_LIFETIME", 3600.0),
+            'liveness_check_timeout': _env_float("NEO4J_LIVENESS_CHECK_TIMEOUT", 30.0),
+        }
+        settings.update({key: value for key, value in overrides.items() if value is not None})
+        return cls(**settings)
+
+    @property
+    def key(self) -> Tuple[str, str]:
+        return (self.uri, self.user)
+
+    def driver_options(self) -> Dict[str, Any]:
+        """Parámetros de pool para GraphDatabase.driver"""
+        options = {
+            'max_connection_pool_size': self.max_pool_size,
+            'connection_acquisition_timeout': self.acquisition_timeout,
+            'connection_timeout': self.connection_timeout,
+            'max_connection_lifetime': self.max_connection_lifetime,
+        }
+        if self.liveness_check_timeout is not None:
+            options['liveness_check_timeout'] = self.liveness_check_timeout
+        return options
+
+class DriverRegistry:
+    """Un driver (y un pool) por URI y usuario, creado al primer uso"""
+
+    def __init__(self):
+        self._drivers: Dict[Tuple[str, str], Any] = {}
+        self._lock = threading.Lock()
+
+    def get(self, config: Optional[DriverConfig] = None):
+        """
+        Driver compartido para la configuración (por defecto, la del entorno).
+        La primera vez prueba las contraseñas en orden con verify_connectivity;
+        lanza ConnectionError si ninguna funciona.
+        """
+        config = config or DriverConfig.from_env()
+        driver = self._drivers.get(config.key)
+        if driver is not None:
+            return driver
+
+        with self._lock:
+            driver = self._drivers.get(config.key)
+            if driver is None:
+                driver = self._connect(config)
+                self._drivers[config.key] = driver
+            return driver
+
+    def peek(self, config: Optional[DriverConfig] = None):
+        """Driver ya creado para la configuración, sin intentar conectar"""
+        config = config or DriverConfig.from_env()
+        return self._drivers.get(config.key)
+
+    def _connect(self, config: DriverConfig):
+        last_error: Optional[Exception] = None
+        for password in config.passwords:
+            driver = GraphDatabase.driver(config.uri, auth=(config.user, password),
+                                          **config.driver_options())
+            try:
+                driver.verify_connectivity()
+            except AuthError as e:
+                # Contraseña incorrecta: probar la siguiente
+                driver.close()
+                last_error = e
+                logger.warning(f"❌ Credenciales rechazadas para {config.user}@{config.uri}")
+                continue
+            except Exception as e:
+                # Servidor caído o inalcanzable: las demás contraseñas fallarían igual
+                driver.close()
+                raise ConnectionError(f"Neo4j no disponible en {config.uri}: {e}") from e
+
+            logger.info(f"✅ Driver compartido conectado a {config.uri} "
+                        f"(pool de {config.max_pool_size} conexiones)")
+            return driver
+
+        raise ConnectionError(f"Ninguna credencial válida para {config.user}@{config.uri}: {last_error}")
+
+    def close_all(self):
+        with self._lock:
+            drivers = list(self._drivers.values())
+            self._drivers.clear()
+        for driver in drivers:
+            try:
+                driver.close()
+            except Exception as e:
+                logger.warning(f"⚠️ Error cerrando driver: {e}")
+
+# Instancia compartida por todos los componentes del proceso
+driver_registry = DriverRegistry()
+atexit.register(driver_registry.close_all)
+
+def get_driver(config: Optional[DriverConfig] = None):
+    """Atajo para driver_registry.get"""
+    return driver_registry.get(config)
+
+class BackgroundConnector:
+    """
+    Conexión en segundo plano con reintentos exponenciales.
+    start() vuelve de inmediato: un hilo llama a connect() hasta que funcione,
+    esperando initial_delay, 2x, 4x... hasta max_delay entre intentos, y
+    entrega el driver a on_ready. restart() vuelve a empezar tras perder la base.
+    """
+
+    def __init__(self, on_ready: Callable[[Any], None],
+                 connect: Callable[[], Any] = get_driver,
+                 initial_delay: float = 0.5, max_delay: float = 30.0,
+                 name: str = "neo4j-connect"):
+        self.on_ready = on_ready
+        self.connect = connect
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.name = name
+        self.state = 'idle'
+        self.attempts = 0
+        self.last_error: Optional[str] = None
+        self.next_attempt_at: Optional[float] = None
+        self.ready_since: Optional[float] = None
+        self.ready = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Iniciar el hilo si no está conectado ni conectando (barato en cada solicitud)"""
+        if self.ready.is_set() or (self._thread is not None and self._thread.is_alive()):
+            return
+        with self._lock:
+            if self.ready.is_set() or (self._thread is not None and self._thread.is_alive()):
+                return
+            self._stop.clear()
+            self.state = 'connecting'
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def restart(self, error: Optional[Exception] = None):
+        """Marcar la conexión como perdida y reconectar en segundo plano"""
+        with self._lock:
+            self.ready.clear()
+            self.ready_since = None
+            if error is not None:
+                self.last_error = str(error)
+        self.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Esperar hasta estar conectado (útil en scripts y pruebas)"""
+        return self.ready.wait(timeout)
+
+    def _run(self):
+        delay = self.initial_delay
+        while not self._stop.is_set():
+            self.attempts += 1
+            try:
+                self.on_ready(self.connect())
+            except Exception as e:
+                self.last_error = str(e)
+                self.state = 'retrying'
+                self.next_attempt_at = time.time() + delay
+                logger.warning(f"🔁 Neo4j no disponible (intento {self.attempts}), "
+                               f"reintento en {delay:.1f}s: {e}")
+                self._stop.wait(delay)
+                delay = min(delay * 2, self.max_delay)
+                continue
+
+            self.state = 'ready'
+            self.next_attempt_at = None
+            self.ready_since = time.time()
+            self.ready.set()
+            logger.info(f"✅ Conectado a Neo4j tras {self.attempts} intento(s)")
+            return
+        self.state = 'stopped'
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            'ready': self.ready.is_set(),
+            'state': self.state,
+            'attempts': self.attempts,
+            'last_error': self.last_error,
+            'next_attempt_in': round(max(0.0, self.next_attempt_at - time.time()), 1)
+                               if self.next_attempt_at else None,
+            'ready_since': self.ready_since,
+        }
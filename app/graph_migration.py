@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Migración por streaming entre dos instancias de Neo4j
+Recorre el origen por páginas ordenadas por la clave de cada etiqueta (a.id,
+m.nombre, ...) y escribe cada página en el destino con un UNWIND dentro de una
+transacción. Después de cada lote confirmado guarda la última clave en un
+archivo de checkpoint, así una migración interrumpida continúa donde quedó.
+
+No borra el destino: nodos y relaciones se escriben con MERGE, de modo que
+repetir un lote es inofensivo. La memoria usada es la de un lote, sin importar
+el tamaño del catálogo.
+"""
+
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from graph_schema import apply_schema
+
+logger = logging.getLogger(__name__)
+
+# Propiedad que identifica a los nodos de cada etiqueta (las demás usan `id`)
+NODE_KEYS: Dict[str, str] = {
+    'Auto': 'id',
+    'Marca': 'nombre',
+    'Tipo': 'categoria',
+    'Combustible': 'tipo',
+    'Transmision': 'tipo',
+    'PerfilDemografico': 'id',
+}
+DEFAULT_NODE_KEY = 'id'
+
+def node_key(label: str) -> str:
+    return NODE_KEYS.get(label, DEFAULT_NODE_KEY)
+
+def quote(name: str) -> str:
+    """Escapar una etiqueta o tipo de relación para interpolarlo en Cypher"""
+    return "`" + name.replace("`", "``") + "`"
+
+def end_key_expression(variable: str = 'm') -> str:
+    """Clave del nodo destino de una relación según su etiqueta"""
+    cases = " ".join(
+        f"WHEN {variable}:{quote(label)} THEN {variable}.{quote(key)}"
+        for label, key in NODE_KEYS.items()
+    )
+    return f"CASE {cases} ELSE {variable}.{DEFAULT_NODE_KEY} END"
+
+def read_nodes_query(label: str) -> str:
+    key = quote(node_key(label))
+    return f"""
+        MATCH (n:{quote(label)})
+        WHERE n.{key} IS NOT NULL AND ($after IS NULL OR n.{key} > $after)
+        RETURN n.{key} AS key, properties(n) AS properties
+        ORDER BY n.{key}
+        LIMIT $batch_size
+    """
+
+def write_nodes_query(label: str) -> str:
+    return f"""
+        UNWIND $rows AS row
+        MERGE (n:{quote(label)} {{{quote(node_key(label))}: row.key}})
+        SET n += row.properties
+    """
+
+def read_relationships_query(label: str) -> str:
+    key = quote(node_key(label))
+    return f"""
+        MATCH (n:{quote(label)})
+        WHERE n.{key} IS NOT NULL AND ($after IS NULL OR n.{key} > $after)
+        WITH n ORDER BY n.{key} LIMIT $batch_size
+        OPTIONAL MATCH (n)-[r]->(m)
+        RETURN n.{key} AS key, type(r) AS type, properties(r) AS properties,
+               head(labels(m)) AS end_label, {end_key_expression()} AS end_key
+        ORDER BY key
+    """
+
+def write_relationships_query(start_label: str, rel_type: str, end_label: str) -> str:
+    return f"""
+        UNWIND $rows AS row
+        MATCH (a:{quote(start_label)} {{{quote(node_key(start_label))}: row.start}})
+        MATCH (b:{quote(end_label)} {{{quote(node_key(end_label))}: row.end}})
+        MERGE (a)-[r:{quote(rel_type)}]->(b)
+        SET r += row.properties
+    """
+
+def _write_rows(tx, query: str, rows: List[Dict[str, Any]]):
+    tx.run(query, rows=rows).consume()
+
+class GraphMigrator:
+    """Copia todos los nodos y relaciones del origen al destino, reanudable"""
+
+    def __init__(self, source_driver, target_driver, checkpoint_path: str,
+                 batch_size: int = 500, source_database: Optional[str] = None,
+                 target_database: Optional[str] = None):
+        self.source_driver = source_driver
+        self.target_driver = target_driver
+        self.checkpoint_path = checkpoint_path
+        self.batch_size = max(1, int(batch_size))
+        self.source_options = {'database': source_database} if source_database else {}
+        self.target_options = {'database': target_database} if target_database else {}
+        self.state: Dict[str, Dict[str, Any]] = self._load_checkpoint()
+
+    # --- checkpoint ---
+
+    def _load_checkpoint(self) -> Dict[str, Dict[str, Any]]:
+        if not os.path.exists(self.checkpoint_path):
+            return {}
+        with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        logger.info(f"↩️ Reanudando migración desde {self.checkpoint_path}")
+        return state
+
+    def _save_checkpoint(self):
+        """Escritura atómica: un corte a mitad de escritura no corrompe el checkpoint"""
+        temp_path = f"{self.checkpoint_path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.checkpoint_path)
+
+    def _step(self, name: str) -> Dict[str, Any]:
+        return self.state.setdefault(name, {'after': None, 'rows': 0, 'done': False})
+
+    def _commit_progress(self, name: str, after: Any, rows: int):
+        step = self._step(name)
+        step['after'] = after
+        step['rows'] += rows
+        self._save_checkpoint()
+
+    def _finish_step(self, name: str):
+        self._step(name)['done'] = True
+        self._save_checkpoint()
+
+    def clear_checkpoint(self):
+        """Borrar el checkpoint cuando la migración terminó"""
+        self.state = {}
+        if os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+
+    # --- lectura del origen ---
+
+    def source_labels(self) -> List[str]:
+        with self.source_driver.session(**self.source_options) as session:
+            return sorted(record['label'] for record in session.run("CALL db.labels() YIELD label"))
+
+    def _read_page(self, query: str, after: Any) -> List[Any]:
+        with self.source_driver.session(**self.source_options) as session:
+            return list(session.run(query, after=after, batch_size=self.batch_size))
+
+    # --- etapas ---
+
+    def copy_nodes(self, label: str) -> int:
+        """Copiar los nodos de una etiqueta, página por página"""
+        name = f"nodes:{label}"
+        step = self._step(name)
+        if step['done']:
+            return step['rows']
+
+        read_query = read_nodes_query(label)
+        write_query = write_nodes_query(label)
+        after = step['after']
+        with self.target_driver.session(**self.target_options) as target:
+            while True:
+                page = self._read_page(read_query, after)
+                if not page:
+                    break
+                rows = [{'key': record['key'], 'properties': record['properties']} for record in page]
+                target.execute_write(_write_rows, write_query, rows)
+                after = rows[-1]['key']
+                self._commit_progress(name, after, len(rows))
+
+        self._finish_step(name)
+        logger.info(f"🟢 {label}: {step['rows']} nodos copiados")
+        return step['rows']
+
+    def copy_relationships(self, label: str) -> int:
+        """Copiar las relaciones que salen de los nodos de una etiqueta"""
+        name = f"relationships:{label}"
+        step = self._step(name)
+        if step['done']:
+            return step['rows']
+
+        read_query = read_relationships_query(label)
+        after = step['after']
+        with self.target_driver.session(**self.target_options) as target:
+            while True:
+                page = self._read_page(read_query, after)
+                if not page:
+                    break
+
+                groups: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+                for record in page:
+                    if record['type'] is None or record['end_key'] is None:
+                        continue
+                    groups.setdefault((record['type'], record['end_label']), []).append({
+                        'start': record['key'],
+                        'end': record['end_key'],
+                        'properties': record['properties'],
+                    })
+
+                # Todas las relaciones de la página en una sola transacción
+                def write_page(tx):
+                    for (rel_type, end_label), rows in groups.items():
+                        _write_rows(tx, write_relationships_query(label, rel_type, end_label), rows)
+
+                target.execute_write(write_page)
+                after = page[-1]['key']
+                self._commit_progress(name, after, sum(len(rows) for rows in groups.values()))
+
+        self._finish_step(name)
+        logger.info(f"🔗 {label}: {step['rows']} relaciones copiadas")
+        return step['rows']
+
+    def run(self) -> Dict[str, Any]:
+        """Esquema en el destino, luego todos los nodos y después todas las relaciones"""
+        start = time.perf_counter()
+        apply_schema(self.target_driver)
+
+        labels = self.source_labels()
+        nodes = {label: self.copy_nodes(label) for label in labels}
+        relationships = {label: self.copy_relationships(label) for label in labels}
+
+        elapsed = time.perf_counter() - start
+        logger.info(f"✅ Migración completa en {elapsed:.1f}s: {sum(nodes.values())} nodos, "
+                    f"{sum(relationships.values())} relaciones")
+        return {
+            'nodes': nodes,
+            'relationships': relationships,
+            'seconds': round(elapsed, 3)
+        }
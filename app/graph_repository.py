@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+"""
+Acceso a los datos del grafo de autos detrás de una interfaz común
+Los recomendadores piden candidatos, marcas similares, recomendaciones por
+perfil demográfico, conteos por faceta y cargas masivas a un GraphRepository
+en lugar de escribir Cypher contra el driver. Así el mismo código de
+puntuación, y la aplicación Flask completa, corren con Neo4j o sin ninguna
+base de datos (pruebas de carga, benchmarks, entornos de integración).
+
+Backends (variable de entorno GRAPH_BACKEND):
+    neo4j   (por defecto) consultas Cypher con el driver compartido; responde
+            desde el catálogo en memoria cuando ya está cargado
+    memory  instantánea del catálogo en el proceso, sin Neo4j. Su origen se
+            elige con GRAPH_MEMORY_SOURCE:
+                generator   catálogo sintético (GRAPH_MEMORY_SIZE autos, o el
+                            catálogo base si no se indica; semilla GRAPH_MEMORY_SEED)
+                *.csv       volcado export.csv de Neo4j Browser
+                otra ruta   archivo binario del catálogo
+            Sin GRAPH_MEMORY_SOURCE se usa la instantánea ya instalada o el
+            archivo del catálogo y, si no hay ninguno, el catálogo base generado.
+Otros backends se registran con register_graph_repository
+"""
+
+import logging
+import os
+import random
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from bulk_loader import DEFAULT_BATCH_SIZE, car_row, load_cars
+from car_record import CarRecord
+from catalog_file import catalog_file_path, read_catalog_file
+from catalog_generator import comprehensive_cars, demographic_profile_rows, generate_snapshot, similarity_edges
+from catalog_index import facet_counts_for_selection, get_index
+from catalog_snapshot import CatalogSnapshot, CatalogStore, catalog_store
+from cypher_dump import catalog_components, iter_dump
+from graph_driver import get_driver
+from graph_schema import AUTO_FACETS, facet_fields, has_denormalized_properties
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GRAPH_BACKEND = 'neo4j'
+
+def graph_backend() -> str:
+    return os.environ.get("GRAPH_BACKEND", DEFAULT_GRAPH_BACKEND).lower()
+
+def snapshot_components(snapshot: CatalogSnapshot):
+    """Autos, similitudes y perfiles de una instantánea, con la forma de CATALOG_QUERY"""
+    similarities = [
+        {'origen': brand, 'destino': similar, 'peso': weight}
+        for brand, edges in snapshot.brand_similarities.items()
+        for similar, weight in edges
+    ]
+    profiles = [
+        {'id': profile_id, 'marcas': profile['brands'], 'tipos': profile['types']}
+        for profile_id, profile in snapshot.demographic_profiles.items()
+    ]
+    return list(snapshot.cars), similarities, profiles
+
+class GraphRepository:
+    """Interfaz común de los backends del grafo de autos"""
+
+    def snapshot(self) -> Optional[CatalogSnapshot]:
+        """Catálogo en memoria para las rutas vectorizadas, o None si no hay"""
+        raise NotImplementedError
+
+    def reload(self) -> Optional[CatalogSnapshot]:
+        """Volver a leer el catálogo desde su origen y publicar la instantánea nueva"""
+        raise NotImplementedError
+
+    def similar_brands(self, selected_brands: List[str], limit: int = 10) -> List[str]:
+        """Marcas SIMILAR_A de las seleccionadas, por peso promedio, sin las seleccionadas"""
+        raise NotImplementedError
+
+    def demographic_recommendations(self, profile_id: str) -> Dict[str, Any]:
+        """{'brands', 'types', 'profile_id'} recomendados para el perfil"""
+        raise NotImplementedError
+
+    def candidates(self, relevant_brands: List[str], demographic_types: List[str],
+                   min_price: Optional[float], max_price: Optional[float],
+                   limit: int) -> List[CarRecord]:
+        """Hasta limit autos de una marca relevante, un tipo demográfico o dentro del presupuesto, por precio"""
+        raise NotImplementedError
+
+    def facet_counts(self, brands=None, budget=None, fuel=None, types=None,
+                     transmission=None) -> Optional[Dict[str, Any]]:
+        """Conteos por faceta para la selección (ver facet_counts_for_selection) o None sin catálogo"""
+        snapshot = self.snapshot()
+        if snapshot is None:
+            return None
+        counts = facet_counts_for_selection(get_index(snapshot), brands, budget, fuel, types, transmission)
+        counts['catalog_version'] = snapshot.version
+        return counts
+
+    def upsert_cars(self, cars: Iterable[Dict[str, Any]],
+                    batch_size: int = DEFAULT_BATCH_SIZE) -> Dict[str, Any]:
+        """Crear o actualizar autos por id con sus facetas; devuelve las estadísticas de la carga"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+class Neo4jGraphRepository(GraphRepository):
+    """
+    Grafo en Neo4j. Mientras el catálogo en memoria esté cargado, las lecturas
+    se responden desde la instantánea; si no, con una consulta por operación.
+    """
+
+    def __init__(self, driver=None, use_node_properties: Optional[bool] = None,
+                 store: CatalogStore = catalog_store):
+        self.driver = driver or get_driver()
+        self.store = store
+        # Leer facetas desde propiedades del nodo Auto cuando la base está desnormalizada
+        if use_node_properties is None:
+            use_node_properties = self.detect_node_properties()
+        self.use_node_properties = use_node_properties
+
+    def detect_node_properties(self) -> bool:
+        """Usar propiedades desnormalizadas solo si son consistentes con las relaciones"""
+        try:
+            with self.driver.session() as session:
+                return has_denormalized_properties(session)
+        except Exception as e:
+            logger.warning(f"No se pudo verificar la desnormalización, se usan relaciones: {e}")
+            return False
+
+    def snapshot(self) -> Optional[CatalogSnapshot]:
+        try:
+            return self.store.get(self.driver)
+        except Exception as e:
+            logger.warning(f"No se pudo cargar el catálogo en memoria, usando Neo4j: {e}")
+            return None
+
+    def reload(self) -> CatalogSnapshot:
+        return self.store.reload(self.driver)
+
+    def similar_brands(self, selected_brands: List[str], limit: int = 10) -> List[str]:
+        if not selected_brands:
+            return []
+
+        snapshot = self.snapshot()
+        if snapshot is not None:
+            return snapshot.similar_brands(selected_brands, limit)
+
+        with self.driver.session() as session:
+            # Obtener marcas similares con sus pesos
+            result = session.run("""
+                MATCH (m1:Marca)-[r:SIMILAR_A]->(m2:Marca)
+                WHERE m1.nombre IN $brands
+                RETURN m2.nombre as marca_similar,
+                       avg(r.peso) as peso_promedio,
+                       count(*) as frecuencia
+                ORDER BY peso_promedio DESC, frecuencia DESC
+                LIMIT $limit
+            """, brands=selected_brands, limit=limit)
+
+            similar_brands = [record["marca_similar"] for record in result]
+
+        # Filtrar marcas que ya están seleccionadas
+        return [brand for brand in similar_brands if brand not in selected_brands]
+
+    def demographic_recommendations(self, profile_id: str) -> Dict[str, Any]:
+        snapshot = self.snapshot()
+        if snapshot is not None:
+            return snapshot.demographic_recommendations(profile_id)
+
+        with self.driver.session() as session:
+            # Obtener marcas recomendadas para el perfil
+            brands_result = session.run("""
+                MATCH (p:PerfilDemografico {id: $profile_id})-[:RECOMIENDA_MARCA]->(m:Marca)
+                RETURN m.nombre as marca
+                ORDER BY m.nombre
+            """, profile_id=profile_id)
+
+            recommended_brands = [record["marca"] for record in brands_result]
+
+            # Obtener tipos recomendados para el perfil
+            types_result = session.run("""
+                MATCH (p:PerfilDemografico {id: $profile_id})-[:RECOMIENDA_TIPO]->(t:Tipo)
+                RETURN t.categoria as tipo
+                ORDER BY t.categoria
+            """, profile_id=profile_id)
+
+            recommended_types = [record["tipo"] for record in types_result]
+
+        return {
+            "brands": recommended_brands,
+            "types": recommended_types,
+            "profile_id": profile_id
+        }
+
+    def candidates(self, relevant_brands: List[str], demographic_types: List[str],
+                   min_price: Optional[float], max_price: Optional[float],
+                   limit: int) -> List[CarRecord]:
+        snapshot = self.snapshot()
+        if snapshot is not None:
+            return snapshot.candidates(relevant_brands, demographic_types, min_price, max_price, limit)
+
+        with self.driver.session() as session:
+            # El filtro va después de WITH para que descarte filas y no solo
+            # el último OPTIONAL MATCH. Con la base desnormalizada no hay expansiones.
+            q = facet_fields(self.use_node_properties, optional=True)
+            query = f"""
+                {q['match']}
+                WITH {q['carry']}
+                WHERE (
+                    // Incluir autos de marcas relevantes
+                    {q['marca']} IN $relevant_brands
+                    OR
+                    // O autos que coincidan con preferencias demográficas
+                    ({q['tipo']} IN $demographic_types)
+                    OR
+                    // O autos dentro del rango de presupuesto
+                    ($min_price IS NULL OR a.precio >= $min_price) AND
+                    ($max_price IS NULL OR a.precio <= $max_price * 1.3)
+                )
+                RETURN a.id as id, a.modelo as modelo, a.año as año,
+                       a.precio as precio, a.caracteristicas as caracteristicas,
+                       a.segmento as segmento, a.trim_level as trim_level,
+                       {q['marca']} as marca, {q['tipo']} as tipo,
+                       {q['combustible']} as combustible, {q['transmision']} as transmision
+                ORDER BY a.precio ASC
+                LIMIT $query_limit
+            """
+
+            result = session.run(query,
+                                 relevant_brands=relevant_brands,
+                                 demographic_types=demographic_types or [],
+                                 min_price=min_price,
+                                 max_price=max_price,
+                                 query_limit=limit)
+
+            return [CarRecord.from_row(record) for record in result]
+
+    def upsert_cars(self, cars: Iterable[Dict[str, Any]],
+                    batch_size: int = DEFAULT_BATCH_SIZE) -> Dict[str, Any]:
+        stats = load_cars(self.driver, cars, batch_size)
+        # El catálogo en memoria ya cargado se recarga para que incluya los cambios
+        if self.store.snapshot is not None:
+            self.store.reload(self.driver)
+        return stats
+
+    def close(self):
+        # Driver compartido: lo cierra el registro al terminar el proceso
+        self.driver = None
+
+class MemoryGraphRepository(GraphRepository):
+    """
+    Grafo en memoria: una CatalogSnapshot publicada en catalog_store, la misma
+    que leen los recomendadores, así que todo el proceso sirve desde ella.
+    Las cargas masivas construyen una instantánea nueva y la publican; la
+    vigente nunca se modifica.
+    """
+
+    def __init__(self, loader: Optional[Callable[[], CatalogSnapshot]] = None,
+                 store: CatalogStore = catalog_store):
+        self.loader = loader
+        self.store = store
+        self._write_lock = threading.Lock()
+        if loader is not None:
+            self.reload()
+
+    @classmethod
+    def from_snapshot(cls, snapshot: CatalogSnapshot, store: CatalogStore = catalog_store) -> 'MemoryGraphRepository':
+        return cls(lambda: snapshot, store)
+
+    @classmethod
+    def from_generator(cls, size: Optional[int] = None, seed: int = 0,
+                       store: CatalogStore = catalog_store) -> 'MemoryGraphRepository':
+        """Catálogo sintético de size autos, o el catálogo base de enhanced_database_setup.py"""
+        if size is None:
+            return cls(lambda: CatalogSnapshot(comprehensive_cars(random.Random(seed)),
+                                               similarity_edges(), demographic_profile_rows()), store)
+        return cls(lambda: generate_snapshot(size, seed), store)
+
+    @classmethod
+    def from_export(cls, path: str, store: CatalogStore = catalog_store) -> 'MemoryGraphRepository':
+        """Volcado export.csv de Neo4j Browser"""
+        return cls(lambda: CatalogSnapshot(*catalog_components(iter_dump(path))), store)
+
+    @classmethod
+    def from_catalog_file(cls, path: Optional[str] = None,
+                          store: CatalogStore = catalog_store) -> 'MemoryGraphRepository':
+        """Archivo binario del catálogo (el que se guarda al cargar desde Neo4j)"""
+        return cls(lambda: CatalogSnapshot(*read_catalog_file(path or catalog_file_path())), store)
+
+    @classmethod
+    def from_env(cls) -> 'MemoryGraphRepository':
+        """Origen indicado en GRAPH_MEMORY_SOURCE (ver la documentación del módulo)"""
+        source = os.environ.get("GRAPH_MEMORY_SOURCE", "").strip()
+        if source == 'generator':
+            size = os.environ.get("GRAPH_MEMORY_SIZE")
+            return cls.from_generator(int(size) if size else None,
+                                      int(os.environ.get("GRAPH_MEMORY_SEED", "0")))
+        if source.lower().endswith('.csv'):
+            return cls.from_export(source)
+        if source:
+            return cls.from_catalog_file(source)
+
+        if catalog_store.snapshot is not None or os.path.exists(catalog_file_path()):
+            return cls()
+        return cls.from_generator()
+
+    def snapshot(self) -> Optional[CatalogSnapshot]:
+        snapshot = self.store.snapshot
+        if snapshot is None:
+            # Sin origen propio: el archivo del catálogo, si existe
+            snapshot = self.reload()
+        return snapshot
+
+    def reload(self) -> Optional[CatalogSnapshot]:
+        if self.loader is None:
+            return self.store.get(None)
+        snapshot = self.store.install(self.loader())
+        logger.info(f"🧪 Catálogo en memoria: {len(snapshot)} autos, versión {snapshot.version}")
+        return snapshot
+
+    def similar_brands(self, selected_brands: List[str], limit: int = 10) -> List[str]:
+        snapshot = self.snapshot()
+        return snapshot.similar_brands(selected_brands, limit) if snapshot is not None else []
+
+    def demographic_recommendations(self, profile_id: str) -> Dict[str, Any]:
+        snapshot = self.snapshot()
+        if snapshot is None:
+            return {"brands": [], "types": [], "profile_id": profile_id}
+        return snapshot.demographic_recommendations(profile_id)
+
+    def candidates(self, relevant_brands: List[str], demographic_types: List[str],
+                   min_price: Optional[float], max_price: Optional[float],
+                   limit: int) -> List[CarRecord]:
+        snapshot = self.snapshot()
+        if snapshot is None:
+            return []
+        return snapshot.candidates(relevant_brands, demographic_types, min_price, max_price, limit)
+
+    def upsert_cars(self, cars: Iterable[Dict[str, Any]],
+                    batch_size: int = DEFAULT_BATCH_SIZE) -> Dict[str, Any]:
+        """
+        Igual que LOAD_CARS_QUERY en Neo4j: cada faceta queda con el valor de la
+        fila (nulo incluido) y los demás campos no nulos se actualizan
+        """
+        with self._write_lock:
+            current = self.snapshot()
+            if current is not None:
+                existing, similarities, profiles = snapshot_components(current)
+            else:
+                existing, similarities, profiles = [], [], []
+
+            merged: Dict[Any, Dict[str, Any]] = {car['id']: car.as_dict() for car in existing}
+            rows = 0
+            for car in cars:
+                row = car_row(car)
+                data = merged.setdefault(row['id'], {'id': row['id']})
+                data.update(row['properties'])
+                data.update({prop: row[prop] for prop in AUTO_FACETS})
+                rows += 1
+
+            self.store.install(CatalogSnapshot(list(merged.values()), similarities, profiles))
+        return {'rows': rows, 'batches': 1 if rows else 0}
+
+# Nombre del backend -> constructor sin argumentos
+GRAPH_BACKENDS: Dict[str, Callable[[], GraphRepository]] = {
+    'neo4j': Neo4jGraphRepository,
+    'memory': MemoryGraphRepository.from_env,
+}
+
+def register_graph_repository(name: str, factory: Callable[[], GraphRepository]):
+    GRAPH_BACKENDS[name] = factory
+
+def create_graph_repository(backend: Optional[str] = None) -> GraphRepository:
+    """Backend indicado (o GRAPH_BACKEND); ValueError si no está registrado"""
+    backend = (backend or graph_backend()).lower()
+    factory = GRAPH_BACKENDS.get(backend)
+    if factory is None:
+        raise ValueError(f"Backend del grafo desconocido: {backend!r} "
+                         f"(disponibles: {', '.join(sorted(GRAPH_BACKENDS))})")
+    repository = factory()
+    logger.info(f"🗂️ Datos del grafo desde backend {backend}")
+    return repository
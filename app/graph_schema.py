@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Esquema del grafo: restricciones, índices y propiedades desnormalizadas
+Todos los scripts de setup y migración aplican el mismo esquema con
+apply_schema, que es idempotente y termina verificando que cada restricción e
+índice exista y esté en línea.
+
+Además cada auto guarda como propiedad el nombre de su marca, tipo, combustible
+y transmisión, para que las consultas de lectura filtren con índices sobre el
+propio nodo sin expandir las cuatro relaciones. Las relaciones siguen siendo la
+fuente de verdad: este módulo copia sus valores y verifica que coincidan
+"""
+
+import logging
+from typing import Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Propiedad en Auto -> (relación, etiqueta del nodo faceta, propiedad del nodo faceta)
+AUTO_FACETS: Dict[str, Tuple[str, str, str]] = {
+    'marca': ('ES_MARCA', 'Marca', 'nombre'),
+    'tipo': ('ES_TIPO', 'Tipo', 'categoria'),
+    'combustible': ('USA_COMBUSTIBLE', 'Combustible', 'tipo'),
+    'transmision': ('TIENE_TRANSMISION', 'Transmision', 'tipo'),
+}
+
+# Variable que usan las consultas para el nodo de cada faceta
+FACET_VARIABLES = {
+    'marca': 'm',
+    'tipo': 't',
+    'combustible': 'c',
+    'transmision': 'tr',
+}
+
+class SchemaError(Exception):
+    """Falta una restricción o índice requerido, o no está en línea"""
+    pass
+
+# Restricciones de unicidad (nombre, etiqueta, propiedad) para cada clave de búsqueda
+SCHEMA_CONSTRAINTS: List[Tuple[str, str, str]] = [
+    ("auto_id", "Auto", "id"),
+    ("marca_nombre", "Marca", "nombre"),
+    ("tipo_categoria", "Tipo", "categoria"),
+    ("combustible_tipo", "Combustible", "tipo"),
+    ("transmision_tipo", "Transmision", "tipo"),
+    ("perfil_demografico_id", "PerfilDemografico", "id"),
+    ("usuario_nombre", "Usuario", "nombre"),
+]
+
+# Índices compuestos: igualdad en la faceta y rango en el precio
+DENORMALIZED_INDEXES: List[Tuple[str, str, Tuple[str, ...]]] = [
+    ("auto_marca_precio", "Auto", ("marca", "precio")),
+    ("auto_tipo_precio", "Auto", ("tipo", "precio")),
+    ("auto_combustible_transmision", "Auto", ("combustible", "transmision")),
+]
+
+# Índices de rango (nombre, etiqueta, propiedades)
+SCHEMA_INDEXES: List[Tuple[str, str, Tuple[str, ...]]] = [
+    ("auto_precio", "Auto", ("precio",)),
+    ("auto_año", "Auto", ("año",)),
+    # Favoritos y recomendaciones pueden referirse a un auto por su modelo
+    ("auto_modelo", "Auto", ("modelo",)),
+] + DENORMALIZED_INDEXES
+
+def constraint_statement(name: str, label: str, prop: str) -> str:
+    return f"CREATE CONSTRAINT {name} IF NOT EXISTS FOR (n:{label}) REQUIRE n.{prop} IS UNIQUE"
+
+def index_statement(name: str, label: str, props: Tuple[str, ...]) -> str:
+    columns = ", ".join(f"n.{prop}" for prop in props)
+    return f"CREATE INDEX {name} IF NOT EXISTS FOR (n:{label}) ON ({columns})"
+
+def facet_assignments(alias: str = 'a') -> str:
+    """SET de las cuatro propiedades a partir de las relaciones del auto"""
+    return ",\n            ".join(
+        f"{alias}.{prop} = head([({alias})-[:{rel}]->(f:{label}) | f.{key}])"
+        for prop, (rel, label, key) in AUTO_FACETS.items()
+    )
+
+# Copiar las facetas a un solo auto (dentro de la misma transacción que cambia sus relaciones)
+SYNC_AUTO_QUERY = f"""
+    MATCH (a:Auto {{id: $id}})
+    SET {facet_assignments()}
+"""
+
+# Chequeo de consistencia: ninguna relación con la propiedad ausente o distinta
+CONSISTENCY_QUERY = "RETURN " + " AND ".join(
+    f"NOT EXISTS {{ MATCH (a:Auto)-[:{rel}]->(f:{label}) WHERE a.{prop} IS NULL OR a.{prop} <> f.{key} }}"
+    for prop, (rel, label, key) in AUTO_FACETS.items()
+) + " AND EXISTS { MATCH (a:Auto) } AS consistente"
+
+def denormalize_query(batch_size: int = 1000) -> str:
+    """Copiar las facetas a todos los autos en lotes (requiere transacción implícita)"""
+    return f"""
+        MATCH (a:Auto)
+        CALL {{
+            WITH a
+            SET {facet_assignments()}
+        }} IN TRANSACTIONS OF {int(batch_size)} ROWS
+    """
+
+def create_denormalized_indexes(session):
+    """Crear los índices sobre las propiedades desnormalizadas"""
+    for name, label, props in DENORMALIZED_INDEXES:
+        session.run(index_statement(name, label, props)).consume()
+
+def verify_schema(session):
+    """
+    Comprobar que existen todas las restricciones e índices del esquema.
+    Se comparan por etiqueta y propiedades (no por nombre), así un índice
+    equivalente creado con otro nombre también cuenta. Lanza SchemaError.
+    """
+    constraints = set()
+    for record in session.run("SHOW CONSTRAINTS YIELD labelsOrTypes, properties, type"):
+        if 'UNIQUE' in (record['type'] or ''):
+            for label in record['labelsOrTypes'] or []:
+                constraints.add((label, tuple(record['properties'] or [])))
+
+    indexes = {}
+    for record in session.run("SHOW INDEXES YIELD labelsOrTypes, properties, state, type"):
+        if record['type'] != 'RANGE':
+            continue
+        for label in record['labelsOrTypes'] or []:
+            indexes[(label, tuple(record['properties'] or []))] = record['state']
+
+    missing = []
+    for name, label, prop in SCHEMA_CONSTRAINTS:
+        if (label, (prop,)) not in constraints:
+            missing.append(f"restricción {name} ({label}.{prop})")
+    for name, label, props in SCHEMA_INDEXES:
+        state = indexes.get((label, props))
+        if state is None:
+            missing.append(f"índice {name} ({label}.{', '.join(props)})")
+        elif state != 'ONLINE':
+            missing.append(f"índice {name} en estado {state}")
+
+    if missing:
+        raise SchemaError("Esquema incompleto: " + "; ".join(missing))
+
+def apply_schema(driver, index_timeout: int = 300):
+    """
+    Crear restricciones e índices (idempotente), esperar a que estén en línea y verificarlos.
+    Lo llaman todos los scripts de setup y migración antes de cargar datos.
+    """
+    with driver.session() as session:
+        for name, label, prop in SCHEMA_CONSTRAINTS:
+            session.run(constraint_statement(name, label, prop)).consume()
+        for name, label, props in SCHEMA_INDEXES:
+            session.run(index_statement(name, label, props)).consume()
+        session.run("CALL db.awaitIndexes($timeout)", timeout=index_timeout).consume()
+        verify_schema(session)
+    logger.info(f"🗂️ Esquema verificado: {len(SCHEMA_CONSTRAINTS)} restricciones, "
+                f"{len(SCHEMA_INDEXES)} índices")
+
+def denormalize_auto_properties(session, batch_size: int = 1000) -> int:
+    """Escribir marca, tipo, combustible y transmisión en cada Auto; devuelve propiedades escritas"""
+    summary = session.run(denormalize_query(batch_size)).consume()
+    return summary.counters.properties_set
+
+def sync_auto_properties(tx, car_id: str):
+    """Recalcular las propiedades de un auto después de cambiar sus relaciones"""
+    tx.run(SYNC_AUTO_QUERY, id=car_id).consume()
+
+def has_denormalized_properties(session) -> bool:
+    """True si todos los autos tienen sus propiedades de faceta al día"""
+    record = session.run(CONSISTENCY_QUERY).single()
+    return bool(record and record['consistente'])
+
+def setup_denormalized_properties(driver, batch_size: int = 1000) -> int:
+    """Etapa de desnormalización de los scripts de setup: índices y copia de facetas"""
+    with driver.session() as session:
+        create_denormalized_indexes(session)
+        properties_set = denormalize_auto_properties(session, batch_size)
+    logger.info(f"🧩 Propiedades de faceta escritas en los autos: {properties_set}")
+    return properties_set
+
+def facet_fields(use_properties: bool, optional: bool = False) -> Dict[str, str]:
+    """
+    Fragmentos Cypher para leer las facetas de un auto `a`.
+    Con use_properties se leen las propiedades del nodo; si no, se expanden las
+    relaciones (MATCH, u OPTIONAL MATCH con optional=True). Devuelve la expresión
+    de cada faceta, el `match` inicial y `carry`, las variables a conservar en un WITH.
+    """
+    if use_properties:
+        fields = {prop: f"a.{prop}" for prop in AUTO_FACETS}
+        if optional:
+            fields['match'] = "MATCH (a:Auto)"
+        else:
+            not_null = " AND ".join(f"a.{prop} IS NOT NULL" for prop in AUTO_FACETS)
+            fields['match'] = f"MATCH (a:Auto)\n            WHERE {not_null}\n            WITH a"
+        fields['carry'] = "a"
+        return fields
+
+    fields = {}
+    match_lines = ["MATCH (a:Auto)"] if optional else []
+    keyword = "OPTIONAL MATCH" if optional else "MATCH"
+    for position, (prop, (rel, label, key)) in enumerate(AUTO_FACETS.items()):
+        variable = FACET_VARIABLES[prop]
+        fields[prop] = f"{variable}.{key}"
+        if position == 0 and not optional:
+            match_lines.append(f"MATCH (a:Auto)-[:{rel}]->({variable}:{label})")
+        else:
+            match_lines.append(f"{keyword} (a)-[:{rel}]->({variable}:{label})")
+    fields['match'] = "\n            ".join(match_lines)
+    fields['carry'] = "a, " + ", ".join(FACET_VARIABLES[prop] for prop in AUTO_FACETS)
+    return fields
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Métricas de latencia y contadores en formato de texto de Prometheus
+Cada etapa de una recomendación (perfil demográfico, marcas similares,
+candidatos, puntuación, diversificación, serialización) se mide con span() o
+@timed y se acumula en un histograma por etapa. Además del histograma
+acumulado (buckets, suma y conteo, agregable entre procesos) cada serie guarda
+una ventana de las últimas observaciones para los percentiles p50/p95/p99.
+
+Sin dependencias: el texto se genera aquí, no hace falta prometheus_client.
+"""
+
+import bisect
+import functools
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Sequence, Tuple
+
+# Segundos: de 0.5 ms a 10 s
+DEFAULT_BUCKETS: Tuple[float, ...] = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                                      0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUANTILES: Tuple[float, ...] = (0.5, 0.95, 0.99)
+
+LabelValues = Tuple[str, ...]
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+def _escape(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _labels_text(names: Sequence[str], values: Sequence[Any], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Percentil por rango más cercano sobre una lista ordenada"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, math.ceil(q * len(sorted_values)) - 1)
+    return sorted_values[rank]
+
+class Metric:
+    type_name = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} espera las etiquetas {self.labelnames}, recibió {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+
+    def expose(self) -> List[str]:
+        raise NotImplementedError
+
+    def snapshot(self) -> Any:
+        raise NotImplementedError
+
+class Counter(Metric):
+    """Valor que solo crece (aciertos de caché, activaciones del respaldo, errores)"""
+    type_name = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: Any):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: Any) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def expose(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_labels_text(self.labelnames, key)} {_format_value(value)}"
+                                for key, value in items]
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return {','.join(key) or 'total': value for key, value in sorted(self._values.items())}
+
+class _HistogramSeries:
+    __slots__ = ('bucket_counts', 'count', 'total', 'window')
+
+    def __init__(self, buckets: int, window: int):
+        self.bucket_counts = [0] * buckets
+        self.count = 0
+        self.total = 0.0
+        self.window: deque = deque(maxlen=window)
+
+class Histogram(Metric):
+    """
+    Distribución de duraciones en segundos: buckets acumulados para Prometheus
+    y percentiles (p50/p95/p99) de las últimas window observaciones
+    """
+    type_name = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS, window: int = 1024):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self.window = window
+        self._series: Dict[LabelValues, _HistogramSeries] = {}
+
+    def observe(self, value: float, **labels: Any):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _HistogramSeries(len(self.buckets), self.window)
+            series.bucket_counts[bisect.bisect_left(self.buckets, value)] += 1
+            series.count += 1
+            series.total += value
+            series.window.append(value)
+
+    @contextmanager
+    def time(self, **labels: Any):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def quantiles(self, **labels: Any) -> Dict[float, float]:
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            recent = sorted(series.window) if series else []
+        return {q: percentile(recent, q) for q in QUANTILES}
+
+    def expose(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(series.bucket_counts), series.count, series.total, sorted(series.window))
+                     for key, series in sorted(self._series.items())]
+
+        lines = self.header()
+        for key, bucket_counts, count, total, _ in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                le = 'le="%s"' % _format_value(bound)
+                lines.append(f"{self.name}_bucket{_labels_text(self.labelnames, key, le)} {cumulative}")
+            labels = _labels_text(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+
+        # Percentiles de la ventana reciente, como summary aparte
+        recent_name = f"{self.name}_recent"
+        lines.append(f"# HELP {recent_name} {self.documentation} (últimas {self.window} observaciones)")
+        lines.append(f"# TYPE {recent_name} summary")
+        for key, _, _, _, recent in items:
+            for q in QUANTILES:
+                quantile = 'quantile="%s"' % q
+                lines.append(f"{recent_name}{_labels_text(self.labelnames, key, quantile)} "
+                             f"{_format_value(percentile(recent, q))}")
+            labels = _labels_text(self.labelnames, key)
+            lines.append(f"{recent_name}_sum{labels} {_format_value(sum(recent))}")
+            lines.append(f"{recent_name}_count{labels} {len(recent)}")
+        return lines
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Por serie: conteo y p50/p95/p99 en milisegundos (para el estado del sistema)"""
+        with self._lock:
+            items = [(key, series.count, sorted(series.window)) for key, series in sorted(self._series.items())]
+        return {
+            ','.join(key) or 'total': {
+                'count': count,
+                **{f"p{int(q * 100)}_ms": round(percentile(recent, q) * 1000, 3) for q in QUANTILES},
+            }
+            for key, count, recent in items
+        }
+
+class CallbackMetric(Metric):
+    """Valores leídos al exponer (estadísticas que ya lleva otro componente)"""
+
+    def __init__(self, name: str, documentation: str, type_name: str,
+                 read: Callable[[], Dict[LabelValues, float]], labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.type_name = type_name
+        self.read = read
+
+    def _read(self) -> Dict[LabelValues, float]:
+        try:
+            return self.read() or {}
+        except Exception:
+            return {}
+
+    def expose(self) -> List[str]:
+        return self.header() + [f"{self.name}{_labels_text(self.labelnames, key)} {_format_value(value)}"
+                                for key, value in sorted(self._read().items())]
+
+    def snapshot(self) -> Dict[str, float]:
+        return {','.join(key) or 'total': value for key, value in sorted(self._read().items())}
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        """Registrar una métrica; si ya existe una con ese nombre se devuelve la existente"""
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def unregister(self, name: str):
+        with self._lock:
+            self._metrics.pop(name, None)
+
+    def metrics(self) -> Iterable[Metric]:
+        with self._lock:
+            return list(self._metrics.values())
+
+    def expose(self) -> str:
+        """Texto de exposición de Prometheus (versión 0.0.4)"""
+        lines: List[str] = []
+        for metric in self.metrics():
+            lines.extend(metric.expose())
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {metric.name: metric.snapshot() for metric in self.metrics()}
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Registro compartido por el proceso
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    'recommender_stage_seconds',
+    'Duración de cada etapa de una recomendación en segundos',
+    ('stage',),
+))
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    'http_request_seconds',
+    'Duración de las solicitudes HTTP por endpoint en segundos',
+    ('endpoint',),
+))
+FALLBACKS = REGISTRY.register(Counter(
+    'recommender_fallback_total',
+    'Veces que se sirvió desde un respaldo en lugar de la fuente principal',
+    ('reason',),
+))
+NEO4J_ERRORS = REGISTRY.register(Counter(
+    'neo4j_errors_total',
+    'Fallos de llamadas a Neo4j (errores y plazos vencidos)',
+    ('source',),
+))
+
+def span(stage: str):
+    """Medir un bloque como etapa: with span('scoring'): ..."""
+    return STAGE_SECONDS.time(stage=stage)
+
+def timed(stage: str) -> Callable:
+    """Decorador: medir cada llamada a la función como la etapa stage"""
+    def decorator(function: Callable) -> Callable:
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage)
+        return wrapper
+    return decorator
+
+def register_callback(name: str, documentation: str, type_name: str,
+                      read: Callable[[], Dict[LabelValues, float]],
+                      labelnames: Sequence[str] = ()) -> Metric:
+    """Exponer valores que ya calcula otro componente (p. ej. las estadísticas del caché)"""
+    REGISTRY.unregister(name)
+    return REGISTRY.register(CallbackMetric(name, documentation, type_name, read, labelnames))
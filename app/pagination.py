@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Paginación por cursor y NDJSON para /api/recommendations
+Las recomendaciones se entregan en dos secciones, 'filtered' (coincidencias
+exactas) y 'recommended' (sugerencias por gustos), cada una paginada por su
+lado. El cursor es opaco para el cliente: codifica la sección, el
+desplazamiento, un resumen de las preferencias y la versión del catálogo, de
+modo que un cursor de otra selección o de un catálogo recargado se rechaza en
+vez de devolver una página que no corresponde.
+"""
+
+import base64
+import hashlib
+import json
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+SECTIONS: Tuple[str, ...] = ('filtered', 'recommended')
+
+DEFAULT_PAGE_SIZE = 12
+MAX_PAGE_SIZE = 100
+
+# Puntuación a partir de la cual un auto sin match_type cuenta como filtrado
+FILTERED_SCORE = 85
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+class PaginationError(ValueError):
+    """Parámetros de paginación o cursor inválidos"""
+    pass
+
+class StaleCursorError(PaginationError):
+    """El cursor es de otra selección o de una versión anterior del catálogo"""
+    pass
+
+def section_of(car: Dict[str, Any]) -> str:
+    """Sección del auto; si no trae match_type se asigna por puntuación"""
+    if 'match_type' not in car:
+        car['match_type'] = 'filtered' if car.get('similarity_score', 0) >= FILTERED_SCORE else 'recommended'
+    return car['match_type']
+
+def split_sections(results: Iterable[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """Separar una lista de recomendaciones en sus secciones, conservando el orden"""
+    sections: Dict[str, List[Dict[str, Any]]] = {section: [] for section in SECTIONS}
+    for car in results:
+        sections.setdefault(section_of(car), []).append(car)
+    return sections
+
+def key_digest(key: Any) -> str:
+    """Resumen corto de la clave de preferencias para guardar en el cursor"""
+    return hashlib.sha1(repr(key).encode('utf-8')).hexdigest()[:12]
+
+def encode_cursor(section: str, offset: int, key: Any, version: int) -> str:
+    payload = json.dumps({'s': section, 'o': offset, 'k': key_digest(key), 'v': version},
+                         separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).rstrip(b'=').decode('ascii')
+
+def decode_cursor(token: str, key: Any, version: int) -> Tuple[str, int]:
+    """
+    Sección y desplazamiento del cursor. Lanza PaginationError si no se puede
+    leer y StaleCursorError si no corresponde a la selección o al catálogo actual
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        section, offset = payload['s'], payload['o']
+        digest, cursor_version = payload['k'], payload['v']
+    except (ValueError, TypeError, KeyError, UnicodeError):
+        raise PaginationError("Cursor inválido") from None
+
+    if section not in SECTIONS or not isinstance(offset, int) or offset < 0:
+        raise PaginationError("Cursor inválido")
+    if digest != key_digest(key) or cursor_version != version:
+        raise StaleCursorError("El cursor ya no corresponde a la selección o al catálogo actual")
+    return section, offset
+
+def parse_limit(value: Optional[str]) -> int:
+    if value in (None, ''):
+        return DEFAULT_PAGE_SIZE
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        raise PaginationError(f"limit debe ser un entero: {value!r}") from None
+    if limit < 1:
+        raise PaginationError("limit debe ser mayor que cero")
+    return min(limit, MAX_PAGE_SIZE)
+
+class PageRequest:
+    """Qué secciones pedir, desde qué posición y cuántos autos por sección"""
+
+    def __init__(self, limit: int = DEFAULT_PAGE_SIZE, sections: Tuple[str, ...] = SECTIONS,
+                 offset: int = 0):
+        self.limit = limit
+        self.sections = sections
+        self.offset = offset
+
+    @classmethod
+    def from_args(cls, args: Mapping[str, str], key: Any, version: int) -> Optional['PageRequest']:
+        """
+        Solicitud de página desde los parámetros limit, cursor y section, o None
+        si no viene ninguno (respuesta completa como lista, la de siempre)
+        """
+        if not any(args.get(name) for name in ('limit', 'cursor', 'section')):
+            return None
+
+        limit = parse_limit(args.get('limit'))
+        cursor = args.get('cursor')
+        if cursor:
+            section, offset = decode_cursor(cursor, key, version)
+            return cls(limit, (section,), offset)
+
+        section = args.get('section')
+        if section:
+            if section not in SECTIONS:
+                raise PaginationError(f"Sección desconocida: {section!r}")
+            return cls(limit, (section,))
+        return cls(limit)
+
+def page(cars: List[Dict[str, Any]], section: str, offset: int, limit: int,
+         key: Any, version: int) -> Dict[str, Any]:
+    """Una página de la sección con el total y el cursor de la siguiente (None al final)"""
+    end = offset + limit
+    return {
+        'items': cars[offset:end],
+        'total': len(cars),
+        'offset': offset,
+        'next_cursor': encode_cursor(section, end, key, version) if end < len(cars) else None,
+    }
+
+def paginate(sections: Dict[str, List[Dict[str, Any]]], page_request: PageRequest,
+             key: Any, version: int) -> Dict[str, Any]:
+    """Respuesta paginada: una página por sección pedida y la versión del catálogo"""
+    response: Dict[str, Any] = {
+        section: page(sections.get(section, []), section, page_request.offset,
+                      page_request.limit, key, version)
+        for section in page_request.sections
+    }
+    response['catalog_version'] = version
+    return response
+
+def ndjson_line(payload: Dict[str, Any]) -> str:
+    """Un objeto JSON por línea"""
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':')) + '\n'
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Normalización de las preferencias del usuario
+Convierte las selecciones guardadas en sesión (listas, textos o diccionarios,
+con nombres en español o inglés) a una forma canónica, usada tanto para llamar
+a los recomendadores como para formar la clave del caché de respuestas
+"""
+
+import hashlib
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+# Alias de combustible aceptados -> nombre en la base de datos
+FUEL_ALIASES = {
+    'gasolina': 'Gasolina',
+    'gas': 'Gasolina',
+    'diesel': 'Diésel',
+    'electrico': 'Eléctrico',
+    'electric': 'Eléctrico',
+    'hibrido': 'Híbrido',
+    'hybrid': 'Híbrido'
+}
+
+# Alias de transmisión aceptados -> nombre en la base de datos
+TRANSMISSION_ALIASES = {
+    'automatic': 'Automática',
+    'automatica': 'Automática',
+    'manual': 'Manual',
+    'semiautomatic': 'Semiautomática',
+    'semiautomatica': 'Semiautomática'
+}
+
+# Alias de tipo de vehículo aceptados -> categoría en la base de datos
+TYPE_ALIASES = {
+    'sedan': 'Sedán',
+    'suv': 'SUV',
+    'hatchback': 'Hatchback',
+    'pickup': 'Pickup',
+    'coupe': 'Coupé',
+    'convertible': 'Convertible'
+}
+
+def map_alias(value: Any, aliases: Dict[str, str]) -> Any:
+    """Nombre canónico de un valor, o el mismo valor si no es un alias conocido"""
+    if isinstance(value, str):
+        return aliases.get(value.strip().lower(), value.strip())
+    return value
+
+def _as_list(value: Any) -> List[Any]:
+    if value is None or value == '':
+        return []
+    if isinstance(value, dict):
+        return list(value.values())
+    if isinstance(value, (list, tuple, set)):
+        return list(value)
+    return [value]
+
+def _canonical_list(value: Any, aliases: Optional[Dict[str, str]] = None) -> List[Any]:
+    """Lista sin vacíos ni duplicados, con alias resueltos y ordenada"""
+    items = set()
+    for item in _as_list(value):
+        if aliases is not None:
+            item = map_alias(item, aliases)
+        elif isinstance(item, str):
+            item = item.strip()
+        if item:
+            items.add(item)
+    return sorted(items, key=str)
+
+def _canonical_choice(value: Any, aliases: Dict[str, str]) -> Union[str, List[Any], None]:
+    """Selección que puede venir como texto o como lista; conserva la forma recibida"""
+    if isinstance(value, str):
+        return map_alias(value, aliases) or None
+    items = _canonical_list(value, aliases)
+    return items or None
+
+def normalize_preferences(brands=None, budget=None, fuel=None, types=None, transmission=None,
+                          gender=None, age_range=None) -> Dict[str, Any]:
+    """Preferencias en forma canónica, listas para pasar a get_recommendations"""
+    return {
+        'brands': _canonical_list(brands),
+        'budget': budget.strip() if isinstance(budget, str) else budget,
+        'fuel': _canonical_choice(fuel, FUEL_ALIASES),
+        'types': _canonical_list(types, TYPE_ALIASES),
+        'transmission': _canonical_choice(transmission, TRANSMISSION_ALIASES),
+        'gender': gender or None,
+        'age_range': age_range or None
+    }
+
+def parse_budget(budget: Any) -> Optional[Tuple[int, int]]:
+    """
+    Rango (mínimo, máximo) de un presupuesto 'min-max', o None si no tiene esa
+    forma: un valor de sesión mal formado ('abc-def', '10-20-30', '-5000')
+    cuenta como sin presupuesto en vez de romper la solicitud
+    """
+    if not isinstance(budget, str):
+        return None
+    parts = budget.split('-')
+    if len(parts) != 2:
+        return None
+    try:
+        return int(parts[0]), int(parts[1])
+    except ValueError:
+        return None
+
+def preference_key(preferences: Dict[str, Any]) -> Tuple:
+    """
+    Tupla hashable que identifica una combinación de preferencias normalizadas.
+    Un texto y una lista de un solo elemento producen la misma clave.
+    """
+    return (
+        tuple(preferences.get('brands') or ()),
+        preferences.get('budget'),
+        tuple(_canonical_list(preferences.get('fuel'))),
+        tuple(preferences.get('types') or ()),
+        tuple(_canonical_list(preferences.get('transmission'))),
+        preferences.get('gender'),
+        preferences.get('age_range')
+    )
+
+def preference_seed(key: Tuple) -> str:
+    """Semilla estable para la diversidad de una combinación de preferencias"""
+    return hashlib.sha1(repr(key).encode('utf-8')).hexdigest()[:16]
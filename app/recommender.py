@@ -5,30 +5,106 @@ Usa algoritmos de similitud, perfiles demográficos y análisis de preferencias
 para recomendar autos más allá de simples filtros
 """
 
-from neo4j import GraphDatabase
 import logging
 from typing import List, Dict, Any, Optional, Tuple
 import math
+from operator import itemgetter
+
+from neo4j.exceptions import DriverError, Neo4jError
+
+from car_record import CarRecord
+from catalog_snapshot import catalog_store, CatalogSnapshot
+from catalog_columns import get_columns, np
+from diversification import diversify, diversify_by_keys
+from pagination import split_sections
+from preferences import map_alias, FUEL_ALIASES, TRANSMISSION_ALIASES, TYPE_ALIASES
+from graph_driver import DriverConfig, get_driver
+from metrics import FALLBACKS, NEO4J_ERRORS, span, timed
+from graph_repository import (GraphRepository, MemoryGraphRepository, Neo4jGraphRepository,
+                              create_graph_repository, graph_backend)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class ScoringContext:
+    """
+    Contexto de puntuación resuelto una sola vez por solicitud.
+    Guarda similitudes de marca, recomendaciones demográficas y presupuesto
+    para que cada candidato se evalúe en memoria sin consultar Neo4j.
+    """
+    
+    def __init__(self, user_preferences: Dict, demographic_recs: Dict, similar_brands: List[str]):
+        self.user_preferences = user_preferences
+        self.demographic_recs = demographic_recs
+        self.selected_brands = set(user_preferences.get('selected_brands') or [])
+        self.types = set(user_preferences.get('types') or [])
+        self.fuel = user_preferences.get('fuel')
+        self.transmission = user_preferences.get('transmission')
+        self.budget_range = user_preferences.get('budget_range')
+        self.similar_brands = similar_brands
+        # Posición de cada marca similar para puntuar sin list.index()
+        self.similar_positions = {}
+        for position, brand in enumerate(similar_brands):
+            self.similar_positions.setdefault(brand, position)
+        self.demographic_brands = set(demographic_recs.get('brands', []))
+        self.demographic_types = set(demographic_recs.get('types', []))
+        self.profile_id = demographic_recs.get('profile_id')
+
 class IntelligentCarRecommender:
-    def __init__(self, uri: str, user: str, password: str):
-        """Inicializar el sistema de recomendaciones inteligente"""
-        try:
-            self.driver = GraphDatabase.driver(uri, auth=(user, password))
-            with self.driver.session() as session:
-                session.run("RETURN 1")
-            logger.info("Conexión exitosa al sistema de recomendaciones")
-        except Exception as e:
-            logger.error(f"Error conectando a Neo4j: {e}")
-            raise
+    # Características premium relevantes para cada perfil demográfico
+    PREMIUM_FEATURES_BY_PROFILE = {
+        "hombre_18_25": ["deportivo", "sport", "turbo", "performance"],
+        "hombre_26_35": ["tecnológico", "navegación", "bluetooth", "pantalla"],
+        "hombre_36_50": ["lujo", "cuero", "premium", "sonido"],
+        "hombre_51_plus": ["lujo", "confort", "premium", "automatico"],
+        "mujer_18_25": ["bluetooth", "pantalla", "diseño", "compacto"],
+        "mujer_26_35": ["seguridad", "familia", "espacio", "camara"],
+        "mujer_36_50": ["seguridad", "familia", "espacio", "automatico"],
+        "mujer_51_plus": ["confort", "automatico", "lujo", "facil"]
+    }
+    
+    # Candidatos puntuados por cada recomendación pedida (limit * factor)
+    CANDIDATE_POOL_FACTOR = 3
+    
+    def __init__(self, uri: Optional[str] = None, user: Optional[str] = None, password: Optional[str] = None,
+                 repository: Optional[GraphRepository] = None):
+        """
+        Inicializar el sistema de recomendaciones inteligente sobre el driver
+        compartido del proceso. Sin argumentos se usa la configuración del entorno.
+        Con repository (p. ej. MemoryGraphRepository) los datos salen de ahí y no
+        hace falta Neo4j.
+        """
+        if repository is None:
+            try:
+                config = DriverConfig.from_env(uri=uri, user=user,
+                                               passwords=[password] if password is not None else None)
+                repository = Neo4jGraphRepository(get_driver(config))
+                logger.info("Conexión exitosa al sistema de recomendaciones")
+            except Exception as e:
+                logger.error(f"Error conectando a Neo4j: {e}")
+                raise
+        self.repository = repository
+    
+    @classmethod
+    def in_memory(cls, repository: Optional[MemoryGraphRepository] = None) -> 'IntelligentCarRecommender':
+        """
+        Recomendador sin Neo4j: sirve desde la instantánea del repositorio en
+        memoria, por defecto la ya instalada en catalog_store (benchmarks, pruebas)
+        """
+        return cls(repository=repository or MemoryGraphRepository())
+    
+    @property
+    def driver(self):
+        """Driver de Neo4j del repositorio, o None con un backend sin base de datos"""
+        return getattr(self.repository, 'driver', None)
     
     def close(self):
-        """Cerrar conexión"""
-        if hasattr(self, 'driver'):
-            self.driver.close()
+        """Soltar el repositorio; el driver es compartido y lo cierra el registro al terminar el proceso"""
+        self.repository.close()
+    
+    def get_catalog_snapshot(self) -> Optional[CatalogSnapshot]:
+        """Obtener la instantánea del catálogo en memoria (se carga la primera vez)"""
+        return self.repository.snapshot()
     
     def get_demographic_profile(self, gender: str, age_range: str) -> str:
         """Determinar perfil demográfico basado en género y edad"""
@@ -61,144 +137,200 @@ class IntelligentCarRecommender:
             logger.warning(f"Error parseando presupuesto '{budget_str}': {e}")
             return (0, 999999)
     
+    @timed('brand_similarities')
     def get_brand_similarities(self, selected_brands: List[str]) -> List[str]:
         """Obtener marcas similares a las seleccionadas"""
         if not selected_brands:
             return []
         
-        with self.driver.session() as session:
-            # Obtener marcas similares con sus pesos
-            result = session.run("""
-                MATCH (m1:Marca)-[r:SIMILAR_A]->(m2:Marca)
-                WHERE m1.nombre IN $brands
-                RETURN m2.nombre as marca_similar, 
-                       avg(r.peso) as peso_promedio,
-                       count(*) as frecuencia
-                ORDER BY peso_promedio DESC, frecuencia DESC
-                LIMIT 10
-            """, brands=selected_brands)
-            
-            similar_brands = [record["marca_similar"] for record in result]
-            
-            # Filtrar marcas que ya están seleccionadas
-            similar_brands = [brand for brand in similar_brands if brand not in selected_brands]
-            
-            logger.info(f"Marcas similares encontradas para {selected_brands}: {similar_brands[:5]}")
-            return similar_brands
+        similar_brands = self.repository.similar_brands(selected_brands)
+        logger.debug("Marcas similares encontradas para %s: %s", selected_brands, similar_brands[:5])
+        return similar_brands
     
+    @timed('demographic')
     def get_demographic_recommendations(self, gender: str, age_range: str) -> Dict[str, List[str]]:
         """Obtener recomendaciones basadas en perfil demográfico"""
         profile_id = self.get_demographic_profile(gender, age_range)
         
-        with self.driver.session() as session:
-            # Obtener marcas recomendadas para el perfil
-            brands_result = session.run("""
-                MATCH (p:PerfilDemografico {id: $profile_id})-[:RECOMIENDA_MARCA]->(m:Marca)
-                RETURN m.nombre as marca
-                ORDER BY m.nombre
-            """, profile_id=profile_id)
-            
-            recommended_brands = [record["marca"] for record in brands_result]
-            
-            # Obtener tipos recomendados para el perfil
-            types_result = session.run("""
-                MATCH (p:PerfilDemografico {id: $profile_id})-[:RECOMIENDA_TIPO]->(t:Tipo)
-                RETURN t.categoria as tipo
-                ORDER BY t.categoria
-            """, profile_id=profile_id)
-            
-            recommended_types = [record["tipo"] for record in types_result]
-            
-            logger.info(f"Perfil {profile_id}: marcas {recommended_brands[:3]}, tipos {recommended_types}")
-            
-            return {
-                "brands": recommended_brands,
-                "types": recommended_types,
-                "profile_id": profile_id
-            }
+        demographic_recs = self.repository.demographic_recommendations(profile_id)
+        logger.debug("Perfil %s: marcas %s, tipos %s", profile_id,
+                     demographic_recs['brands'][:3], demographic_recs['types'])
+        return demographic_recs
     
-    def calculate_car_score(self, car: Dict, user_preferences: Dict, demographic_recs: Dict) -> float:
+    def build_scoring_context(self, user_preferences: Dict, demographic_recs: Dict) -> ScoringContext:
+        """Resolver similitudes, perfil demográfico y presupuesto una vez por solicitud"""
+        similar_brands = self.get_brand_similarities(user_preferences.get('selected_brands', []))
+        return ScoringContext(user_preferences, demographic_recs, similar_brands)
+    
+    def calculate_car_score(self, car: Dict, user_preferences: Dict, demographic_recs: Dict,
+                            context: Optional[ScoringContext] = None) -> float:
         """Calcular puntuación de recomendación para un auto específico"""
+        if context is None:
+            context = self.build_scoring_context(user_preferences, demographic_recs)
+        
+        # Sin DEBUG activo no se arma ningún mensaje por regla y por auto
+        debug = logger.isEnabledFor(logging.DEBUG)
+        
         score = 0.0
         max_score = 0.0
         
         # 1. Coincidencia exacta con marcas seleccionadas (peso: 30%)
         max_score += 30
-        if car['marca'] in user_preferences.get('selected_brands', []):
+        if car['marca'] in context.selected_brands:
             score += 30
-            logger.debug(f"Marca exacta {car['marca']}: +30")
+            if debug:
+                logger.debug("Marca exacta %s: +30", car['marca'])
         
         # 2. Marca similar a las seleccionadas (peso: 20%)
         max_score += 20
-        similar_brands = self.get_brand_similarities(user_preferences.get('selected_brands', []))
-        if car['marca'] in similar_brands:
+        similar_position = context.similar_positions.get(car['marca'])
+        if similar_position is not None:
             # Puntuación decreciente basada en posición en la lista de similares
-            position_score = max(0, 20 - (similar_brands.index(car['marca']) * 2))
+            position_score = max(0, 20 - (similar_position * 2))
             score += position_score
-            logger.debug(f"Marca similar {car['marca']}: +{position_score}")
+            if debug:
+                logger.debug("Marca similar %s: +%s", car['marca'], position_score)
         
         # 3. Recomendación demográfica de marca (peso: 25%)
         max_score += 25
-        if car['marca'] in demographic_recs.get('brands', []):
+        if car['marca'] in context.demographic_brands:
             score += 25
-            logger.debug(f"Marca demográfica {car['marca']}: +25")
+            if debug:
+                logger.debug("Marca demográfica %s: +25", car['marca'])
         
         # 4. Coincidencia de tipo de vehículo (peso: 20%)
         max_score += 20
-        if user_preferences.get('types') and car['tipo'] in user_preferences['types']:
+        if context.types and car['tipo'] in context.types:
             score += 20
-            logger.debug(f"Tipo exacto {car['tipo']}: +20")
-        elif car['tipo'] in demographic_recs.get('types', []):
+            if debug:
+                logger.debug("Tipo exacto %s: +20", car['tipo'])
+        elif car['tipo'] in context.demographic_types:
             score += 15
-            logger.debug(f"Tipo demográfico {car['tipo']}: +15")
+            if debug:
+                logger.debug("Tipo demográfico %s: +15", car['tipo'])
         
         # 5. Compatibilidad de combustible (peso: 15%)
         max_score += 15
-        if user_preferences.get('fuel') and car['combustible'] == user_preferences['fuel']:
+        if context.fuel and car['combustible'] == context.fuel:
             score += 15
-            logger.debug(f"Combustible exacto {car['combustible']}: +15")
-        elif self.is_compatible_fuel(car['combustible'], user_preferences.get('fuel')):
+            if debug:
+                logger.debug("Combustible exacto %s: +15", car['combustible'])
+        elif self.is_compatible_fuel(car['combustible'], context.fuel):
             score += 10
-            logger.debug(f"Combustible compatible {car['combustible']}: +10")
+            if debug:
+                logger.debug("Combustible compatible %s: +10", car['combustible'])
         
         # 6. Compatibilidad de transmisión (peso: 10%)
         max_score += 10
-        if user_preferences.get('transmission') and car['transmision'] == user_preferences['transmission']:
+        if context.transmission and car['transmision'] == context.transmission:
             score += 10
-            logger.debug(f"Transmisión exacta {car['transmision']}: +10")
+            if debug:
+                logger.debug("Transmisión exacta %s: +10", car['transmision'])
         
         # 7. Ajuste de presupuesto (modificador: -20% a +10%)
-        if user_preferences.get('budget_range'):
-            min_budget, max_budget = user_preferences['budget_range']
+        if context.budget_range:
+            min_budget, max_budget = context.budget_range
             car_price = car['precio']
             
             if min_budget <= car_price <= max_budget:
                 # Dentro del presupuesto: sin penalización
                 budget_modifier = 1.0
-                logger.debug(f"Precio ${car_price:,} dentro del presupuesto: sin modificador")
+                if debug:
+                    logger.debug("Precio $%s dentro del presupuesto: sin modificador", car_price)
             elif car_price < min_budget:
                 # Muy barato: ligero bonus (pueden ser opciones de valor)
                 budget_modifier = 1.05
-                logger.debug(f"Precio ${car_price:,} por debajo del presupuesto: +5%")
+                if debug:
+                    logger.debug("Precio $%s por debajo del presupuesto: +5%%", car_price)
             else:
                 # Fuera del presupuesto: penalización gradual
                 over_budget_ratio = (car_price - max_budget) / max_budget
                 budget_modifier = max(0.3, 1.0 - (over_budget_ratio * 0.5))
-                logger.debug(f"Precio ${car_price:,} sobre presupuesto: {budget_modifier:.2f}x")
+                if debug:
+                    logger.debug("Precio $%s sobre presupuesto: %.2fx", car_price, budget_modifier)
             
             score *= budget_modifier
         
         # 8. Bonus por características premium según perfil demográfico
-        if self.has_premium_features_for_profile(car, demographic_recs.get('profile_id')):
+        if self.has_premium_features_for_profile(car, context.profile_id):
             score *= 1.1
-            logger.debug(f"Características premium para perfil: +10%")
+            if debug:
+                logger.debug("Características premium para perfil: +10%%")
         
         # Normalizar puntuación (0-100)
         normalized_score = (score / max_score) * 100 if max_score > 0 else 0
         
-        logger.debug(f"Auto {car['modelo']}: {normalized_score:.1f}/100")
+        if debug:
+            logger.debug("Auto %s: %.1f/100", car['modelo'], normalized_score)
         return normalized_score
     
+    @timed('scoring')
+    def calculate_scores_vectorized(self, columns, context: ScoringContext):
+        """
+        Versión vectorizada de calculate_car_score sobre el catálogo columnar.
+        Aplica las mismas reglas y pesos con máscaras booleanas sobre todos los autos.
+        """
+        max_score = 30 + 20 + 25 + 20 + 15 + 10
+        
+        # 1-3. Marca exacta, marca similar y marca demográfica
+        score = 30.0 * columns.isin('marca', context.selected_brands)
+        score += columns.map_values('marca', {
+            brand: max(0, 20 - (position * 2)) for brand, position in context.similar_positions.items()
+        })
+        score += 25.0 * columns.isin('marca', context.demographic_brands)
+        
+        # 4. Tipo exacto o demográfico
+        demographic_type = columns.isin('tipo', context.demographic_types)
+        if context.types:
+            exact_type = columns.isin('tipo', context.types)
+            score += np.where(exact_type, 20.0, np.where(demographic_type, 15.0, 0.0))
+        else:
+            score += 15.0 * demographic_type
+        
+        # 5. Combustible exacto o compatible
+        compatible_fuels = [fuel for fuel in columns.vocabularies['combustible']
+                            if self.is_compatible_fuel(fuel, context.fuel)]
+        compatible_fuel = columns.isin('combustible', compatible_fuels)
+        if context.fuel:
+            exact_fuel = columns.equals('combustible', context.fuel)
+            score += np.where(exact_fuel, 15.0, np.where(compatible_fuel, 10.0, 0.0))
+        else:
+            score += 10.0 * compatible_fuel
+        
+        # 6. Transmisión exacta
+        if context.transmission:
+            score += 10.0 * columns.equals('transmision', context.transmission)
+        
+        # 7. Modificador de presupuesto
+        if context.budget_range:
+            min_budget, max_budget = context.budget_range
+            price = columns.price
+            over_budget_ratio = (price - max_budget) / max_budget
+            budget_modifier = np.where(
+                (price >= min_budget) & (price <= max_budget), 1.0,
+                np.where(price < min_budget, 1.05, np.maximum(0.3, 1.0 - (over_budget_ratio * 0.5)))
+            )
+            score *= budget_modifier
+        
+        # 8. Características premium para el perfil
+        relevant_features = self.PREMIUM_FEATURES_BY_PROFILE.get(context.profile_id, [])
+        if relevant_features:
+            score *= np.where(columns.keyword_mask(relevant_features), 1.1, 1.0)
+        
+        return (score / max_score) * 100
+    
+    @timed('candidates')
+    def select_candidate_indices(self, columns, relevant_brands: List[str], demographic_types: List[str],
+                                 min_price: Optional[float], max_price: Optional[float], limit: int):
+        """Versión vectorizada de CatalogSnapshot.candidates: posiciones de los candidatos"""
+        in_budget = columns.has_price.copy()
+        if min_price is not None:
+            in_budget &= columns.price >= min_price
+        if max_price is not None:
+            in_budget &= columns.price <= max_price * 1.3
+        mask = columns.isin('marca', relevant_brands) | columns.isin('tipo', demographic_types) | in_budget
+        return np.flatnonzero(mask)[:limit]
+    
     def is_compatible_fuel(self, car_fuel: str, preferred_fuel: str) -> bool:
         """Verificar si dos tipos de combustible son compatibles"""
         if not preferred_fuel:
@@ -218,18 +350,7 @@ class IntelligentCarRecommender:
         if not profile_id or not car.get('caracteristicas'):
             return False
         
-        premium_features_by_profile = {
-            "hombre_18_25": ["deportivo", "sport", "turbo", "performance"],
-            "hombre_26_35": ["tecnológico", "navegación", "bluetooth", "pantalla"],
-            "hombre_36_50": ["lujo", "cuero", "premium", "sonido"],
-            "hombre_51_plus": ["lujo", "confort", "premium", "automatico"],
-            "mujer_18_25": ["bluetooth", "pantalla", "diseño", "compacto"],
-            "mujer_26_35": ["seguridad", "familia", "espacio", "camara"],
-            "mujer_36_50": ["seguridad", "familia", "espacio", "automatico"],
-            "mujer_51_plus": ["confort", "automatico", "lujo", "facil"]
-        }
-        
-        relevant_features = premium_features_by_profile.get(profile_id, [])
+        relevant_features = self.PREMIUM_FEATURES_BY_PROFILE.get(profile_id, [])
         car_features_text = " ".join(car['caracteristicas']).lower()
         
         return any(feature in car_features_text for feature in relevant_features)
@@ -242,7 +363,8 @@ class IntelligentCarRecommender:
                                       transmission: str = None,
                                       gender: str = None, 
                                       age_range: str = None,
-                                      limit: int = 15) -> List[Dict[str, Any]]:
+                                      limit: int = 15,
+                                      candidate_pool: Optional[int] = None) -> List[Dict[str, Any]]:
         """
         Obtener recomendaciones inteligentes de autos
         
@@ -251,12 +373,13 @@ class IntelligentCarRecommender:
         2. Filtrado basado en contenido (características del auto)
         3. Recomendaciones demográficas (perfil de usuario)
         4. Sistemas de puntuación ponderada
+        
+        candidate_pool fija cuántos candidatos se puntúan y diversifican
+        (por defecto limit * CANDIDATE_POOL_FACTOR).
         """
         
-        logger.info("=== INICIANDO RECOMENDACIONES INTELIGENTES ===")
-        logger.info(f"Entrada: brands={brands}, budget={budget}, fuel={fuel}")
-        logger.info(f"         types={types}, transmission={transmission}")
-        logger.info(f"         gender={gender}, age_range={age_range}")
+        logger.debug("Entrada: brands=%s, budget=%s, fuel=%s, types=%s, transmission=%s, gender=%s, age_range=%s",
+                     brands, budget, fuel, types, transmission, gender, age_range)
         
         # Preparar preferencias del usuario
         user_preferences = {
@@ -271,128 +394,117 @@ class IntelligentCarRecommender:
         demographic_recs = {}
         if gender and age_range:
             demographic_recs = self.get_demographic_recommendations(gender, age_range)
-            logger.info(f"Perfil demográfico: {demographic_recs['profile_id']}")
+            logger.debug("Perfil demográfico: %s", demographic_recs['profile_id'])
+        
+        # Resolver similitudes una sola vez para toda la solicitud
+        context = self.build_scoring_context(user_preferences, demographic_recs)
         
         # Expandir marcas con similares
         all_relevant_brands = (user_preferences['selected_brands'] + 
-                             self.get_brand_similarities(user_preferences['selected_brands']) +
+                             context.similar_brands +
                              demographic_recs.get('brands', []))
         
         # Remover duplicados manteniendo orden
         seen = set()
         all_relevant_brands = [x for x in all_relevant_brands if not (x in seen or seen.add(x))]
         
-        logger.info(f"Marcas expandidas: {all_relevant_brands[:8]}")
-        
-        # Obtener autos candidatos con consulta amplia
-        with self.driver.session() as session:
-            # Consulta que obtiene más autos para poder aplicar algoritmo de recomendación
-            query = """
-                MATCH (a:Auto)
-                OPTIONAL MATCH (a)-[:ES_MARCA]->(m:Marca)
-                OPTIONAL MATCH (a)-[:ES_TIPO]->(t:Tipo)
-                OPTIONAL MATCH (a)-[:USA_COMBUSTIBLE]->(c:Combustible)
-                OPTIONAL MATCH (a)-[:TIENE_TRANSMISION]->(tr:Transmision)
-                WHERE (
-                    // Incluir autos de marcas relevantes
-                    m.nombre IN $relevant_brands
-                    OR
-                    // O autos que coincidan con preferencias demográficas
-                    (t.categoria IN $demographic_types)
-                    OR 
-                    // O autos dentro del rango de presupuesto
-                    ($min_price IS NULL OR a.precio >= $min_price) AND
-                    ($max_price IS NULL OR a.precio <= $max_price * 1.3)
-                )
-                RETURN a.id as id, a.modelo as modelo, a.año as año, 
-                       a.precio as precio, a.caracteristicas as caracteristicas,
-                       a.segmento as segmento, a.trim_level as trim_level,
-                       m.nombre as marca, t.categoria as tipo, 
-                       c.tipo as combustible, tr.tipo as transmision
-                ORDER BY a.precio ASC
-                LIMIT $query_limit
-            """
-            
-            min_price, max_price = user_preferences['budget_range'] if user_preferences['budget_range'] else (None, None)
-            
-            result = session.run(query, 
-                               relevant_brands=all_relevant_brands[:15],
-                               demographic_types=demographic_recs.get('types', []),
-                               min_price=min_price,
-                               max_price=max_price,
-                               query_limit=limit * 3)  # Obtener más candidatos para filtrar
-            
-            candidates = []
-            for record in result:
-                car = {
-                    'id': record['id'],
-                    'name': f"{record['marca']} {record['modelo']} {record['año']}",
-                    'modelo': record['modelo'],
-                    'brand': record['marca'],
-                    'marca': record['marca'],  # Alias para compatibilidad
-                    'year': record['año'],
-                    'año': record['año'],
-                    'price': float(record['precio']) if record['precio'] else 0,
-                    'precio': float(record['precio']) if record['precio'] else 0,
-                    'type': record['tipo'] or 'No especificado',
-                    'tipo': record['tipo'] or 'No especificado',
-                    'fuel': record['combustible'] or 'No especificado',
-                    'combustible': record['combustible'] or 'No especificado',
-                    'transmission': record['transmision'] or 'No especificada',
-                    'transmision': record['transmision'] or 'No especificada',
-                    'features': record['caracteristicas'] or [],
-                    'caracteristicas': record['caracteristicas'] or [],
-                    'segmento': record['segmento'],
-                    'trim_level': record['trim_level'],
-                    'image': None
-                }
-                candidates.append(car)
-        
-        logger.info(f"Candidatos obtenidos: {len(candidates)}")
-        
-        # Aplicar algoritmo de puntuación a cada candidato
-        scored_cars = []
-        for car in candidates:
-            score = self.calculate_car_score(car, user_preferences, demographic_recs)
-            car['similarity_score'] = round(score, 2)
-            car['recommendation_reason'] = self.generate_recommendation_reason(
-                car, user_preferences, demographic_recs, score
-            )
-            scored_cars.append(car)
-        
-        # Ordenar por puntuación y aplicar diversificación
-        scored_cars.sort(key=lambda x: x['similarity_score'], reverse=True)
-        
-        # Aplicar diversificación para evitar repetir marcas/tipos
-        final_recommendations = self.diversify_recommendations(scored_cars, limit)
-        
-        logger.info(f"Recomendaciones finales: {len(final_recommendations)}")
-        for i, car in enumerate(final_recommendations[:5], 1):
-            logger.info(f"{i}. {car['name']} - Score: {car['similarity_score']}")
-        
-        logger.info("=== RECOMENDACIONES COMPLETADAS ===")
+        logger.debug("Marcas expandidas: %s", all_relevant_brands[:8])
+        
+        min_price, max_price = user_preferences['budget_range'] if user_preferences['budget_range'] else (None, None)
+        
+        # Tamaño del conjunto de candidatos a diversificar
+        pool_size = candidate_pool or limit * self.CANDIDATE_POOL_FACTOR
+        
+        # Obtener autos candidatos: desde el catálogo en memoria si está disponible.
+        # Con el catálogo columnar solo se construyen los diccionarios de los elegidos.
+        snapshot = self.get_catalog_snapshot()
+        columns = get_columns(snapshot)
+        if columns is not None:
+            # Catálogo columnar: selección y puntuación vectorizadas
+            candidate_indices = self.select_candidate_indices(columns, all_relevant_brands[:15],
+                                                              demographic_recs.get('types', []),
+                                                              min_price, max_price, pool_size)
+            scores = self.calculate_scores_vectorized(columns, context)[candidate_indices].tolist()
+            candidates = [snapshot.cars[i] for i in candidate_indices]
+            build = self.build_candidate
+        else:
+            with span('candidates'):
+                rows = self.repository.candidates(all_relevant_brands[:15],
+                                                  demographic_recs.get('types', []),
+                                                  min_price, max_price,
+                                                  pool_size)
+                candidates = [self.build_candidate(row) for row in rows]
+            with span('scoring'):
+                scores = [self.calculate_car_score(car, user_preferences, demographic_recs, context)
+                          for car in candidates]
+            build = None
+        
+        logger.debug("Candidatos obtenidos: %d", len(candidates))
+        
+        # Diversificar sobre (candidato, puntuación) para evitar repetir marcas/tipos
+        scored = [(car, round(score, 2)) for car, score in zip(candidates, scores)]
+        with span('diversify'):
+            selected = diversify(scored, limit,
+                                 score_key=itemgetter(1),
+                                 brand_key=lambda item: item[0]['marca'],
+                                 type_key=lambda item: item[0]['tipo'] or 'No especificado')
+        
+        # Puntuación, razón y vista bilingüe solo de los autos elegidos
+        final_recommendations = []
+        for row, score in selected:
+            car = build(row) if build else row
+            reason = self.generate_recommendation_reason(car, user_preferences, demographic_recs, score, context)
+            final_recommendations.append(car.bilingual(similarity_score=score, recommendation_reason=reason))
+        
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Recomendaciones finales: %d", len(final_recommendations))
+            for i, car in enumerate(final_recommendations[:5], 1):
+                logger.debug("%d. %s - Score: %s", i, car['name'], car['similarity_score'])
         
         return final_recommendations
     
+    def build_candidate(self, record) -> CarRecord:
+        """
+        Candidato compacto desde un auto del repositorio, con los
+        valores por defecto de la respuesta. El diccionario bilingüe se arma
+        solo para los elegidos (CarRecord.bilingual).
+        """
+        return CarRecord(
+            record['id'],
+            modelo=record['modelo'],
+            marca=record['marca'],
+            año=record['año'],
+            precio=float(record['precio']) if record['precio'] else 0,
+            tipo=record['tipo'] or 'No especificado',
+            combustible=record['combustible'] or 'No especificado',
+            transmision=record['transmision'] or 'No especificada',
+            caracteristicas=record['caracteristicas'] or (),
+            segmento=record['segmento'],
+            trim_level=record['trim_level']
+        )
+    
     def generate_recommendation_reason(self, car: Dict, user_preferences: Dict, 
-                                     demographic_recs: Dict, score: float) -> str:
+                                     demographic_recs: Dict, score: float,
+                                     context: Optional[ScoringContext] = None) -> str:
         """Generar explicación de por qué se recomienda este auto"""
+        if context is None:
+            context = self.build_scoring_context(user_preferences, demographic_recs)
+        
         reasons = []
         
-        if car['marca'] in user_preferences.get('selected_brands', []):
+        if car['marca'] in context.selected_brands:
             reasons.append(f"Es de {car['marca']}, una de tus marcas seleccionadas")
         
-        similar_brands = self.get_brand_similarities(user_preferences.get('selected_brands', []))
-        if car['marca'] in similar_brands:
+        if car['marca'] in context.similar_positions:
             reasons.append(f"{car['marca']} es similar a tus marcas preferidas")
         
-        if car['marca'] in demographic_recs.get('brands', []):
+        if car['marca'] in context.demographic_brands:
             reasons.append(f"Recomendado para tu perfil demográfico")
         
-        if user_preferences.get('types') and car['tipo'] in user_preferences['types']:
+        if context.types and car['tipo'] in context.types:
             reasons.append(f"Coincide con tu preferencia de {car['tipo']}")
         
-        if car['tipo'] in demographic_recs.get('types', []):
+        if car['tipo'] in context.demographic_types:
             reasons.append(f"{car['tipo']} es ideal para tu perfil")
         
         if score >= 80:
@@ -405,43 +517,9 @@ class IntelligentCarRecommender:
     def diversify_recommendations(self, scored_cars: List[Dict], limit: int) -> List[Dict]:
         """
         Diversificar recomendaciones para evitar que todas sean de la misma marca/tipo
-        Implementa un algoritmo de diversificación que balancea puntuación con variedad
+        Balancea puntuación con variedad; ver diversification.diversify
         """
-        if not scored_cars:
-            return []
-        
-        selected = []
-        used_brands = set()
-        used_types = set()
-        
-        # Primera pasada: tomar los mejores evitando repetir marca
-        for car in scored_cars:
-            if len(selected) >= limit:
-                break
-            
-            # Criterios de diversificación
-            brand_penalty = len([c for c in selected if c['marca'] == car['marca']]) * 10
-            type_penalty = len([c for c in selected if c['tipo'] == car['tipo']]) * 5
-            
-            # Aplicar penalización por diversidad
-            diversity_score = car['similarity_score'] - brand_penalty - type_penalty
-            
-            # Aceptar si es suficientemente bueno o si añade diversidad
-            if (diversity_score >= 40 or 
-                (car['marca'] not in used_brands and len(selected) < limit * 0.7) or
-                len(selected) < 3):  # Siempre incluir los 3 mejores
-                
-                selected.append(car)
-                used_brands.add(car['marca'])
-                used_types.add(car['tipo'])
-        
-        # Segunda pasada: llenar espacios restantes con los mejores disponibles
-        remaining_slots = limit - len(selected)
-        if remaining_slots > 0:
-            remaining_cars = [car for car in scored_cars if car not in selected]
-            selected.extend(remaining_cars[:remaining_slots])
-        
-        return selected[:limit]
+        return diversify_by_keys(scored_cars, limit)
     
     def get_fallback_recommendations(self, **kwargs) -> List[Dict]:
         """Recomendaciones de respaldo cuando no hay datos suficientes"""
@@ -525,28 +603,40 @@ def get_recommender_instance():
     """Obtener instancia singleton del recomendador inteligente"""
     global _recommender_instance
     if _recommender_instance is None:
-        # Configuraciones de conexión
-        configs = [
-            {"uri": "bolt://localhost:7687", "user": "neo4j", "password": "estructura"},
-            {"uri": "bolt://localhost:7687", "user": "neo4j", "password": "proyectoNEO4J"},
-        ]
-        
-        for config in configs:
-            try:
-                _recommender_instance = IntelligentCarRecommender(
-                    config["uri"], config["user"], config["password"]
-                )
-                logger.info(f"Recomendador inicializado con {config['password']}")
-                break
-            except Exception as e:
-                logger.warning(f"Error con config {config['password']}: {e}")
-                continue
-        
-        if _recommender_instance is None:
-            logger.error("No se pudo inicializar el recomendador")
+        try:
+            # Con GRAPH_BACKEND=memory (u otro registrado) no se conecta a Neo4j
+            backend = graph_backend()
+            repository = create_graph_repository(backend) if backend != 'neo4j' else None
+            _recommender_instance = IntelligentCarRecommender(repository=repository)
+            logger.info(f"Recomendador inicializado con el backend {backend}")
+        except Exception as e:
+            logger.error(f"No se pudo inicializar el recomendador: {e}")
     
     return _recommender_instance
 
+def get_readiness():
+    """Estado de la conexión, para el endpoint de readiness"""
+    ready = _recommender_instance is not None
+    return {
+        'ready': ready,
+        'state': 'ready' if ready else 'idle',
+        'catalog_version': catalog_store.version
+    }
+
+def reload_catalog():
+    """Recargar el catálogo en memoria desde su origen (p. ej. después de ejecutar un script de setup)"""
+    recommender = get_recommender_instance()
+    if recommender is None:
+        raise ConnectionError("Recomendador no disponible, no se puede recargar el catálogo")
+    return recommender.repository.reload()
+
+def get_facet_counts(brands=None, budget=None, fuel=None, types=None, transmission=None):
+    """Conteo de autos por marca, tipo, combustible y transmisión para la selección actual"""
+    recommender = get_recommender_instance()
+    # Sin recomendador: el catálogo ya publicado o el archivo del catálogo
+    repository = recommender.repository if recommender else MemoryGraphRepository()
+    return repository.facet_counts(brands, budget, fuel, types, transmission)
+
 def get_recommendations(brands=None, budget=None, fuel=None, types=None, 
                        transmission=None, gender=None, age_range=None):
     """
@@ -557,7 +647,8 @@ def get_recommendations(brands=None, budget=None, fuel=None, types=None,
     
     if recommender is None:
         logger.error("Recomendador no disponible, usando respaldo")
-        return IntelligentCarRecommender("", "", "").get_fallback_recommendations()
+        FALLBACKS.inc(reason='no_recommender')
+        return IntelligentCarRecommender.in_memory().get_fallback_recommendations()
     
     try:
         # Normalizar entrada
@@ -569,49 +660,19 @@ def get_recommendations(brands=None, budget=None, fuel=None, types=None,
         if isinstance(types, str):
             types = [types]
         
-        # Mapear nombres de combustible
-        fuel_mapping = {
-            'gasolina': 'Gasolina',
-            'gas': 'Gasolina', 
-            'diesel': 'Diésel',
-            'electrico': 'Eléctrico',
-            'electric': 'Eléctrico',
-            'hibrido': 'Híbrido',
-            'hybrid': 'Híbrido'
-        }
-        
+        # Mapear alias de combustible, transmisión y tipos a los nombres de la base
         if fuel and isinstance(fuel, str):
-            fuel = fuel_mapping.get(fuel.lower(), fuel)
-        
-        # Mapear transmisión
-        transmission_mapping = {
-            'automatic': 'Automática',
-            'automatica': 'Automática',
-            'manual': 'Manual',
-            'semiautomatic': 'Semiautomática',
-            'semiautomatica': 'Semiautomática'
-        }
+            fuel = map_alias(fuel, FUEL_ALIASES)
         
         if transmission and isinstance(transmission, str):
-            transmission = transmission_mapping.get(transmission.lower(), transmission)
-        
-        # Mapear tipos
-        type_mapping = {
-            'sedan': 'Sedán',
-            'suv': 'SUV',
-            'hatchback': 'Hatchback', 
-            'pickup': 'Pickup',
-            'coupe': 'Coupé',
-            'convertible': 'Convertible'
-        }
+            transmission = map_alias(transmission, TRANSMISSION_ALIASES)
         
         if types:
-            types = [type_mapping.get(t.lower() if isinstance(t, str) else t, t) for t in types]
+            types = [map_alias(t, TYPE_ALIASES) for t in types]
         
-        logger.info(f"Llamando recomendador inteligente con:")
-        logger.info(f"  brands={brands}, budget={budget}, fuel={fuel}")
-        logger.info(f"  types={types}, transmission={transmission}")
-        logger.info(f"  gender={gender}, age_range={age_range}")
+        logger.debug("Llamando recomendador inteligente con brands=%s, budget=%s, fuel=%s, "
+                     "types=%s, transmission=%s, gender=%s, age_range=%s",
+                     brands, budget, fuel, types, transmission, gender, age_range)
         
         # Llamar al sistema inteligente
         recommendations = recommender.get_intelligent_recommendations(
@@ -625,16 +686,28 @@ def get_recommendations(brands=None, budget=None, fuel=None, types=None,
             limit=10
         )
         
-        logger.info(f"Recomendador devolvió {len(recommendations)} resultados")
+        logger.debug("Recomendador devolvió %d resultados", len(recommendations))
         
         return recommendations
         
     except Exception as e:
-        logger.error(f"Error en recomendador inteligente: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error en recomendador inteligente: %s", e)
+        if isinstance(e, (Neo4jError, DriverError)):
+            NEO4J_ERRORS.inc(source='intelligent_recommender')
+        FALLBACKS.inc(reason='error')
         return recommender.get_fallback_recommendations()
 
+def iter_recommendations(brands=None, budget=None, fuel=None, types=None,
+                         transmission=None, gender=None, age_range=None):
+    """
+    Recomendaciones por sección, con la interfaz de recommender_minimal.
+    Este recomendador calcula todo en una pasada: las secciones se entregan juntas al final
+    """
+    results = get_recommendations(brands, budget, fuel, types, transmission, gender, age_range)
+    for section, cars in split_sections(results).items():
+        if cars:
+            yield section, cars
+
 def test_intelligent_recommendations():
     """Función de prueba para el sistema de recomendaciones"""
     print("=== PRUEBA DEL SISTEMA DE RECOMENDACIONES INTELIGENTE ===")
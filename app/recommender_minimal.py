@@ -4,47 +4,258 @@ Sistema de recomendaciones inteligente para autos con separación clara entre fi
 MEJORADO: Más resultados filtrados y recomendaciones
 """
 
-from neo4j import GraphDatabase
+from neo4j import Query
+from neo4j.exceptions import DriverError, Neo4jError, ServiceUnavailable, SessionExpired
 import logging
+import os
+import time
 import traceback
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError, as_completed
+from operator import itemgetter
 from typing import List, Dict, Any, Optional
 
+from catalog_snapshot import catalog_store, CatalogSnapshot
+from catalog_index import get_index, build_filter_masks, combine_masks, facet_counts_for_selection
+from diversification import top_k, seeded_jitter
+from preferences import normalize_preferences, parse_budget, preference_key, preference_seed
+from pagination import SECTIONS, split_sections
+from circuit_breaker import CircuitBreaker
+from metrics import FALLBACKS, span, timed
+from graph_driver import BackgroundConnector, get_driver
+from graph_repository import GraphRepository, Neo4jGraphRepository, create_graph_repository, graph_backend
+from graph_schema import facet_fields, has_denormalized_properties
+
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Fragmentos Cypher compartidos por las consultas separadas y la combinada.
+# {marca}, {tipo}, {combustible} y {transmision} se reemplazan por la expresión de
+# cada faceta (relación o propiedad del nodo), ver graph_schema.facet_fields
+CAR_FIELDS = """a.id as id, a.modelo as modelo, a.año as año, a.precio as precio,
+                   {marca} as marca, {tipo} as tipo, {combustible} as combustible,
+                   {transmision} as transmision, a.caracteristicas as caracteristicas,
+                   a.segmento as segmento"""
+
+FILTERED_SCORE = """90 + (CASE WHEN {marca} IN $brands THEN 5 ELSE 0 END) + 
+                 (CASE WHEN a.precio <= coalesce($max_price, 999999) * 0.9 THEN 3 ELSE 0 END) +
+                 (CASE 
+                     WHEN $gender = 'femenino' AND $age_range IN ['26-35', '36-45'] AND {tipo} = 'SUV' THEN 8
+                     WHEN $gender = 'masculino' AND $age_range = '18-25' AND {tipo} IN ['Coupé', 'Convertible'] THEN 8
+                     WHEN $age_range IN ['46-55', '56+'] AND {marca} IN ['Mercedes-Benz', 'BMW', 'Audi', 'Lexus'] THEN 8
+                     ELSE 0
+                 END)"""
+
+SMART_CONDITIONS = """{marca} IN $recommended_brands
+            AND (
+                // Respetar presupuesto si está definido (más flexible)
+                ($min_price IS NULL OR a.precio >= $min_price * 0.7) AND
+                ($max_price IS NULL OR a.precio <= $max_price * 1.5)  // 50% más flexible en precio
+            )
+            AND (
+                // Ser más flexible con tipos y combustibles
+                $types IS NULL OR SIZE($types) = 0 OR 
+                {tipo} IN $types OR 
+                ({tipo} = 'SUV' AND 'Crossover' IN $types) OR
+                ({tipo} = 'Crossover' AND 'SUV' IN $types) OR
+                ({tipo} = 'Sedán' AND 'Hatchback' IN $types) OR
+                ({tipo} = 'Hatchback' AND 'Sedán' IN $types)
+            )
+            AND (
+                // Ser más flexible con combustible
+                $fuel_filter IS NULL OR
+                {combustible} = $fuel_filter OR
+                ({combustible} = 'Híbrido' AND $fuel_filter = 'Gasolina') OR
+                ({combustible} = 'Gasolina' AND $fuel_filter = 'Híbrido')
+            )"""
+
+SMART_SCORE = """50 + 
+                 // Bonificación por marca en patrones detectados
+                 (CASE WHEN {marca} IN $pattern_brands THEN 15 ELSE 5 END) +
+                 
+                 // Bonificación por rango de precio
+                 (CASE 
+                     WHEN a.precio >= 15000 AND a.precio <= 30000 THEN 8  // Económico
+                     WHEN a.precio >= 30000 AND a.precio <= 50000 THEN 12 // Medio
+                     WHEN a.precio >= 50000 AND a.precio <= 80000 THEN 10 // Premium
+                     WHEN a.precio >= 80000 THEN 8                       // Lujo
+                     ELSE 5
+                 END) +
+                 
+                 // Personalización demográfica
+                 (CASE 
+                     WHEN $gender = 'femenino' AND $age_range IN ['26-35', '36-45'] AND {tipo} = 'SUV' THEN 15
+                     WHEN $gender = 'masculino' AND $age_range = '18-25' AND {tipo} IN ['Coupé', 'Convertible'] THEN 12
+                     WHEN $age_range IN ['46-55', '56+'] AND {marca} IN ['Mercedes-Benz', 'BMW', 'Audi', 'Lexus'] THEN 18
+                     WHEN {tipo} = 'SUV' THEN 5  // SUVs son populares en general
+                     WHEN {combustible} = 'Híbrido' THEN 5   // Híbridos son atractivos
+                     ELSE 3
+                 END)"""
+
+# Filtrados y recomendaciones en un solo recorrido: cada auto se expande una vez,
+# se marca con las dos condiciones y dos subconsultas ordenan y cortan cada conjunto
+def build_combined_query(q, filtered_conditions):
+    return q['match'] + """
+            WITH """ + q['carry'] + """,
+                 (""" + filtered_conditions + """) AS es_filtrado,
+                 (""" + q['smart_conditions'] + """) AS es_recomendado
+            WHERE es_filtrado OR es_recomendado
+            
+            WITH collect({
+                id: a.id, modelo: a.modelo, año: a.año, precio: a.precio,
+                marca: """ + q['marca'] + """, tipo: """ + q['tipo'] + """,
+                combustible: """ + q['combustible'] + """, transmision: """ + q['transmision'] + """,
+                caracteristicas: a.caracteristicas, segmento: a.segmento,
+                filtered_score: CASE WHEN es_filtrado THEN """ + q['filtered_score'] + """ END,
+                smart_score: CASE WHEN es_recomendado THEN """ + q['smart_score'] + """ END
+            }) AS filas
+            
+            CALL {
+                WITH filas
+                UNWIND filas AS fila
+                WITH fila WHERE fila.filtered_score IS NOT NULL
+                RETURN fila, 'filtered' AS match_type, fila.filtered_score AS score
+                ORDER BY score DESC, fila.precio ASC
+                LIMIT $filtered_limit
+                UNION ALL
+                WITH filas
+                UNWIND filas AS fila
+                WITH fila WHERE fila.smart_score IS NOT NULL
+                RETURN fila, 'recommended' AS match_type, fila.smart_score AS score
+                ORDER BY score DESC, fila.precio ASC
+                LIMIT $query_limit
+            }
+            RETURN match_type, score, fila
+"""
+
+def render_cypher_fields(use_node_properties):
+    """Expresiones de faceta y fragmentos Cypher para el modo de lectura elegido"""
+    fields = facet_fields(use_node_properties)
+    for name, template in (('car_fields', CAR_FIELDS), ('filtered_score', FILTERED_SCORE),
+                           ('smart_conditions', SMART_CONDITIONS), ('smart_score', SMART_SCORE)):
+        fields[name] = template.format(**fields)
+    return fields
+
+# Errores con los que el servidor rechaza la consulta combinada en sí (p. ej. sin
+# subconsultas CALL): no dicen nada de su salud, así que se usan las consultas separadas
+UNSUPPORTED_QUERY_CODES = (
+    'Neo.ClientError.Statement.SyntaxError',
+    'Neo.ClientError.Statement.SemanticError',
+)
+
+def is_unsupported_query_error(error: Exception) -> bool:
+    return isinstance(error, Neo4jError) and getattr(error, 'code', None) in UNSUPPORTED_QUERY_CODES
+
 class CarRecommendationSystem:
-    def __init__(self):
-        # Configuraciones de conexión a probar
-        self.configs = [
-            {"uri": "bolt://localhost:7687", "user": "neo4j", "password": "estructura"},
-            {"uri": "bolt://localhost:7687", "user": "neo4j", "password": "proyectoNEO4J"},
-        ]
+    # Candidatos que trae la consulta inteligente antes de sumar la variación
+    # de diversidad y quedarse con los 20 mejores
+    SMART_CANDIDATE_POOL = 100
+    
+    # Segundos que puede tardar cada consulta (en el servidor y esperando el resultado)
+    QUERY_TIMEOUT = 5.0
+    
+    def __init__(self, offline: Optional[bool] = None):
         self.driver = None
         self.connected = False
-        self.connect()
+        # Sin conexión a Neo4j: todo se sirve desde un repositorio en memoria
+        # (benchmarks, pruebas). Lo activan RECOMMENDER_OFFLINE=1 o GRAPH_BACKEND=memory
+        if offline is None:
+            offline = (os.environ.get('RECOMMENDER_OFFLINE', '').lower() in ('1', 'true', 'yes')
+                       or graph_backend() != 'neo4j')
+        self.offline = offline
+        # Origen del catálogo: Neo4j una vez conectado, o el backend en memoria
+        self.repository: Optional[GraphRepository] = None
+        # Leer facetas desde propiedades del nodo Auto cuando la base está desnormalizada
+        self.use_node_properties = False
+        self.cypher = render_cypher_fields(False)
+        # Pasa a False si el servidor no admite la consulta combinada
+        self.combined_query_supported = True
+        # La conexión no bloquea la importación: se hace en segundo plano al primer uso
+        self.connector = BackgroundConnector(self.attach, connect=self.open_driver,
+                                             name="recommender-connect")
+        # Deja de consultar Neo4j cuando falla o se demora; mientras tanto se sirve del catálogo
+        self.breaker = CircuitBreaker("neo4j", failure_rate_threshold=0.5, minimum_calls=4,
+                                      window_size=20, open_seconds=30.0)
     
-    def connect(self):
-        """Establecer conexión con Neo4j"""
-        for config in self.configs:
-            try:
-                self.driver = GraphDatabase.driver(config["uri"], auth=(config["user"], config["password"]))
-                with self.driver.session() as session:
-                    session.run("RETURN 1")
-                logger.info(f"✅ Conexión exitosa con Neo4j usando {config['password']}")
-                self.connected = True
-                return
-            except Exception as e:
-                logger.warning(f"❌ Fallo conexión con {config['password']}: {e}")
-                continue
-        
-        logger.error("❌ No se pudo conectar a Neo4j con ninguna configuración")
+    def ensure_connecting(self):
+        """Arrancar la conexión en segundo plano si aún no se hizo (no bloquea)"""
+        if not self.offline:
+            self.connector.start()
+    
+    def open_driver(self):
+        """Driver compartido, verificado (también al reconectar con un driver ya creado)"""
+        driver = get_driver()
+        driver.verify_connectivity()
+        return driver
+    
+    def attach(self, driver):
+        """Llamado por el hilo de conexión cuando Neo4j responde"""
+        self.driver = driver
+        self.detect_read_mode()
+        self.repository = Neo4jGraphRepository(driver, self.use_node_properties)
+        # Tras reconectar puede ser otro servidor: volver a probar la consulta combinada
+        self.combined_query_supported = True
+        self.connected = True
+        logger.info("✅ Conexión exitosa con Neo4j")
+        # Precargar el catálogo para que la primera solicitud no espere
+        try:
+            self.repository.reload()
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo precargar el catálogo: {e}")
+    
+    def mark_unavailable(self, error):
+        """Neo4j dejó de responder: servir sin él y reconectar en segundo plano"""
+        if self.connected:
+            logger.warning(f"🔌 Conexión con Neo4j perdida, reconectando: {error}")
         self.connected = False
+        self.connector.restart(error)
+    
+    def detect_read_mode(self):
+        """Usar propiedades desnormalizadas solo si son consistentes con las relaciones"""
+        try:
+            with self.driver.session() as session:
+                self.use_node_properties = has_denormalized_properties(session)
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo verificar la desnormalización, se usan relaciones: {e}")
+            self.use_node_properties = False
+        self.cypher = render_cypher_fields(self.use_node_properties)
+        logger.info("🧩 Lectura de facetas desde " +
+                    ("propiedades del nodo Auto" if self.use_node_properties else "relaciones"))
     
     def close(self):
-        if self.driver:
-            self.driver.close()
+        # El driver es compartido: lo cierra el registro al terminar el proceso
+        self.connector.stop()
+        self.driver = None
+        self.connected = False
+    
+    def get_repository(self) -> Optional[GraphRepository]:
+        """Repositorio del catálogo; sin conexión, el backend en memoria (se crea la primera vez)"""
+        if self.repository is None and self.offline:
+            backend = graph_backend()
+            self.repository = create_graph_repository(backend if backend != 'neo4j' else 'memory')
+        return self.repository
+    
+    def get_catalog_snapshot(self) -> Optional[CatalogSnapshot]:
+        """Obtener la instantánea del catálogo en memoria (se carga la primera vez)"""
+        if self.offline:
+            return self.get_repository().snapshot()
+        self.ensure_connecting()
+        snapshot = catalog_store.snapshot
+        if snapshot is not None:
+            return snapshot
+        if not self.connected or not self.breaker.allow_request():
+            # Sin Neo4j (o con el circuito abierto): solo el archivo del catálogo
+            return catalog_store.get(None)
+        try:
+            snapshot = catalog_store.get(self.driver)
+        except Exception as e:
+            self.breaker.record_failure(e)
+            logger.warning(f"⚠️ No se pudo cargar el catálogo en memoria, usando Neo4j: {e}")
+            return None
+        self.breaker.record_success()
+        return snapshot
     
+    @timed('brand_patterns')
     def get_brand_patterns(self, selected_brands):
         """Analizar patrones en las marcas seleccionadas para hacer recomendaciones inteligentes"""
         if not selected_brands:
@@ -77,86 +288,144 @@ class CarRecommendationSystem:
         # Remover marcas ya seleccionadas
         recommended_brands = list(recommended_brands - set(selected_brands))
         
-        logger.info(f"🔍 Patrones detectados: {detected_patterns}")
-        logger.info(f"🎯 Marcas recomendadas: {recommended_brands[:8]}")
+        logger.debug("🔍 Patrones detectados: %s, marcas recomendadas: %s",
+                     detected_patterns, recommended_brands[:8])
         
         return recommended_brands
     
+    def run_in_session(self, query_method, *args):
+        """Ejecutar un método de consulta en su propia sesión (las sesiones no se comparten entre hilos)"""
+        with self.driver.session() as session:
+            return query_method(session, *args)
+    
+    def query_result(self, future, label):
+        """
+        Resultado de una consulta concurrente ya terminada, o lista vacía si
+        falló. Cada resultado cuenta para el circuit breaker.
+        """
+        try:
+            result = future.result()
+        except Exception as e:
+            logger.error(f"❌ Error en consulta de {label}: {e}")
+            self.breaker.record_failure(e)
+            return []
+        self.breaker.record_success()
+        return result
+    
+    def query_timed_out(self, label):
+        """
+        Consulta concurrente que no terminó a tiempo: se deja de esperar y cuenta
+        como fallo. No se cancela el futuro (ya está en ejecución); la consulta
+        termina en el servidor con su Query(timeout=QUERY_TIMEOUT), que libera el hilo.
+        """
+        logger.warning(f"⏱️ Consulta de {label} superó {self.QUERY_TIMEOUT:.1f}s, se omite")
+        self.breaker.record_failure(f"timeout en {label}")
+    
+    def build_filtered_conditions(self, brands, budget, fuel, types, transmission):
+        """Condiciones estrictas de los filtrados exactos y sus parámetros"""
+        q = self.cypher
+        conditions = []
+        params = {'brands': brands or [], 'min_price': None, 'max_price': None}
+        
+        if brands and len(brands) > 0:
+            conditions.append(f"{q['marca']} IN $brands")
+        
+        budget_range = parse_budget(budget)
+        if budget_range is not None:
+            conditions.append("a.precio >= $min_price AND a.precio <= $max_price")
+            params['min_price'], params['max_price'] = budget_range
+        
+        if fuel and len(fuel) > 0:
+            # Manejar si fuel es string o list
+            if isinstance(fuel, str):
+                conditions.append(f"{q['combustible']} = $fuel")
+            else:
+                conditions.append(f"{q['combustible']} IN $fuel")
+            params['fuel'] = fuel
+        
+        if types and len(types) > 0:
+            conditions.append(f"{q['tipo']} IN $types")
+            params['types'] = types
+        
+        if transmission and len(transmission) > 0:
+            # Manejar si transmission es string o list
+            if isinstance(transmission, str):
+                conditions.append(f"{q['transmision']} = $transmission")
+            else:
+                conditions.append(f"{q['transmision']} IN $transmission")
+            params['transmission'] = transmission
+        
+        return conditions, params
+    
+    def build_smart_params(self, brands, budget, fuel, types, gender, age_range):
+        """Parámetros de la consulta inteligente: marcas por patrones más marcas populares"""
+        # Obtener marcas recomendadas basadas en patrones
+        recommended_brands = self.get_brand_patterns(brands)
+        
+        # CAMBIO: Siempre incluir algunas marcas populares para asegurar resultados
+        popular_brands = ['Toyota', 'Honda', 'Ford', 'BMW', 'Mercedes-Benz', 'Audi', 'Tesla', 'Nissan']
+        all_recommended_brands = list(set(recommended_brands + popular_brands))
+        
+        # Remover marcas ya seleccionadas por el usuario
+        all_recommended_brands = [b for b in all_recommended_brands if b not in (brands or [])]
+        
+        if not all_recommended_brands:
+            logger.debug("⚠️ No se detectaron patrones, usando marcas populares")
+            all_recommended_brands = popular_brands
+        
+        params = {
+            'recommended_brands': all_recommended_brands[:20],  # Incluir más marcas
+            'pattern_brands': recommended_brands[:10] if recommended_brands else [],
+            'types': types if types else [],
+            'gender': gender or '',
+            'age_range': age_range or '',
+            'fuel_filter': fuel[0] if isinstance(fuel, list) and fuel else (fuel if isinstance(fuel, str) else None),
+            'min_price': None,
+            'max_price': None,
+            'query_limit': self.SMART_CANDIDATE_POOL
+        }
+        
+        # Agregar parámetros de presupuesto si existe
+        budget_range = parse_budget(budget)
+        if budget_range is not None:
+            params['min_price'], params['max_price'] = budget_range
+        
+        return params
+    
+    @timed('rank_smart')
+    def rank_smart_candidates(self, candidates, brands, gender, age_range, seed=''):
+        """
+        Sumar la variación de diversidad a (puntuación base, auto) y quedarse con los 20 mejores.
+        La variación usa una semilla estable en lugar de rand(), para que la misma
+        selección produzca siempre la misma lista.
+        """
+        jittered = [(float(score) + seeded_jitter(seed, car['id']), car) for score, car in candidates]
+        return [
+            self.format_car(car, min(score, 84), 'recommended',  # Máximo 84 para recomendaciones
+                            self.generate_recommendation_reason(car['marca'], brands, gender, age_range))
+            for score, car in top_k(jittered, 20, key=lambda item: (item[0], -(item[1]['precio'] or 0)))
+        ]
+    
+    @timed('neo4j_filtered')
     def get_filtered_cars(self, session, brands, budget, fuel, types, transmission, gender, age_range):
         """Obtener autos que coinciden EXACTAMENTE con todos los filtros del usuario"""
         try:
             # Construir condiciones de filtro estrictas
-            conditions = []
-            params = {}
-            
-            if brands and len(brands) > 0:
-                conditions.append("m.nombre IN $brands")
-                params['brands'] = brands
-            
-            if budget and isinstance(budget, str) and '-' in budget:
-                min_price, max_price = budget.split('-')
-                conditions.append("a.precio >= $min_price AND a.precio <= $max_price")
-                params['min_price'] = int(min_price)
-                params['max_price'] = int(max_price)
-            
-            if fuel and len(fuel) > 0:
-                # Manejar si fuel es string o list
-                if isinstance(fuel, str):
-                    conditions.append("c.tipo = $fuel")
-                    params['fuel'] = fuel
-                else:
-                    conditions.append("c.tipo IN $fuel")
-                    params['fuel'] = fuel
-            
-            if types and len(types) > 0:
-                conditions.append("t.categoria IN $types")
-                params['types'] = types
-            
-            if transmission and len(transmission) > 0:
-                # Manejar si transmission es string o list
-                if isinstance(transmission, str):
-                    conditions.append("tr.tipo = $transmission")
-                    params['transmission'] = transmission
-                else:
-                    conditions.append("tr.tipo IN $transmission")
-                    params['transmission'] = transmission
+            q = self.cypher
+            conditions, params = self.build_filtered_conditions(brands, budget, fuel, types, transmission)
             
             # CAMBIO: Reducir el requisito mínimo de filtros de 3 a 2
             if len(conditions) < 2:
-                logger.info("⚠️ Insuficientes filtros para resultados exactos (mínimo 2)")
+                logger.debug("⚠️ Insuficientes filtros para resultados exactos (mínimo 2)")
                 return []
             
-            where_clause = "WHERE " + " AND ".join(conditions)
-            
             cypher_query = f"""
-            MATCH (a:Auto)-[:ES_MARCA]->(m:Marca)
-            MATCH (a)-[:ES_TIPO]->(t:Tipo)
-            MATCH (a)-[:USA_COMBUSTIBLE]->(c:Combustible)
-            MATCH (a)-[:TIENE_TRANSMISION]->(tr:Transmision)
-            {where_clause}
+            {q['match']}
+            WHERE {" AND ".join(conditions)}
             
-            WITH a, m, t, c, tr,
-                 90 + (CASE WHEN m.nombre IN $brands THEN 5 ELSE 0 END) + 
-                 (CASE WHEN a.precio <= $max_price * 0.9 THEN 3 ELSE 0 END) +
-                 (CASE 
-                     WHEN $gender = 'femenino' AND $age_range IN ['26-35', '36-45'] AND t.categoria = 'SUV' THEN 8
-                     WHEN $gender = 'masculino' AND $age_range = '18-25' AND t.categoria IN ['Coupé', 'Convertible'] THEN 8
-                     WHEN $age_range IN ['46-55', '56+'] AND m.nombre IN ['Mercedes-Benz', 'BMW', 'Audi', 'Lexus'] THEN 8
-                     ELSE 0
-                 END) as filtered_score
+            WITH {q['carry']}, {q['filtered_score']} as filtered_score
             
-            RETURN 
-                a.id as id,
-                a.modelo as model,
-                m.nombre as brand,
-                a.año as year,
-                a.precio as price,
-                t.categoria as type,
-                c.tipo as fuel_type,
-                tr.tipo as transmission,
-                a.caracteristicas as features,
-                a.segmento as segment,
-                filtered_score as similarity_score
+            RETURN {q['car_fields']}, filtered_score as similarity_score
             
             ORDER BY filtered_score DESC, a.precio ASC
             LIMIT 15
@@ -164,188 +433,244 @@ class CarRecommendationSystem:
             
             params['gender'] = gender or ''
             params['age_range'] = age_range or ''
-            # Asegurar que max_price existe para el cálculo
-            if 'max_price' not in params:
-                params['max_price'] = 999999
             
-            logger.info(f"🔍 Ejecutando consulta de filtros exactos")
-            logger.info(f"📋 Condiciones: {len(conditions)} filtros aplicados")
+            logger.debug("🔍 Ejecutando consulta de filtros exactos (%d filtros)", len(conditions))
             
-            result = session.run(cypher_query, params)
+            result = session.run(Query(cypher_query, timeout=self.QUERY_TIMEOUT), params)
             
-            filtered_cars = []
-            for record in result:
-                car = {
-                    'id': record['id'],
-                    'name': f"{record['brand']} {record['model']} {record['year']}",
-                    'model': record['model'],
-                    'brand': record['brand'],
-                    'year': record['year'],
-                    'price': record['price'],
-                    'type': record['type'],
-                    'fuel': record['fuel_type'],
-                    'transmission': record['transmission'],
-                    'features': record['features'] or [],
-                    'segment': record['segment'],
-                    'similarity_score': float(record['similarity_score']),
-                    'match_type': 'filtered',
-                    'match_reason': 'Coincide exactamente con todos tus filtros',
-                    'image': None
-                }
-                filtered_cars.append(car)
+            filtered_cars = [
+                self.format_car(record, record['similarity_score'], 'filtered',
+                                'Coincide exactamente con todos tus filtros')
+                for record in result
+            ]
             
-            logger.info(f"🔍 Obtenidos {len(filtered_cars)} resultados filtrados exactos")
+            logger.debug("🔍 Obtenidos %d resultados filtrados exactos", len(filtered_cars))
             return filtered_cars
             
         except Exception as e:
             logger.error(f"❌ Error en filtrados exactos: {e}")
-            return []
+            raise
     
-    def get_smart_recommendations(self, session, brands, budget, fuel, types, transmission, gender, age_range):
+    @timed('neo4j_smart')
+    def get_smart_recommendations(self, session, brands, budget, fuel, types, transmission, gender, age_range, seed=''):
         """Obtener recomendaciones inteligentes basadas en patrones de gustos"""
         try:
-            # Obtener marcas recomendadas basadas en patrones
-            recommended_brands = self.get_brand_patterns(brands)
-            
-            # CAMBIO: Siempre incluir algunas marcas populares para asegurar resultados
-            popular_brands = ['Toyota', 'Honda', 'Ford', 'BMW', 'Mercedes-Benz', 'Audi', 'Tesla', 'Nissan']
-            all_recommended_brands = list(set(recommended_brands + popular_brands))
-            
-            # Remover marcas ya seleccionadas por el usuario
-            all_recommended_brands = [b for b in all_recommended_brands if b not in (brands or [])]
-            
-            if not all_recommended_brands:
-                logger.info("⚠️ No se detectaron patrones, usando marcas populares")
-                all_recommended_brands = popular_brands
+            params = self.build_smart_params(brands, budget, fuel, types, gender, age_range)
+            q = self.cypher
             
             # Construir consulta más flexible para recomendaciones
-            cypher_query = """
-            MATCH (a:Auto)-[:ES_MARCA]->(m:Marca)
-            MATCH (a)-[:ES_TIPO]->(t:Tipo)
-            MATCH (a)-[:USA_COMBUSTIBLE]->(c:Combustible)
-            MATCH (a)-[:TIENE_TRANSMISION]->(tr:Transmision)
-            
-            WHERE m.nombre IN $recommended_brands
-            AND (
-                // Respetar presupuesto si está definido (más flexible)
-                ($min_price IS NULL OR a.precio >= $min_price * 0.7) AND
-                ($max_price IS NULL OR a.precio <= $max_price * 1.5)  // 50% más flexible en precio
-            )
-            AND (
-                // Ser más flexible con tipos y combustibles
-                $types IS NULL OR SIZE($types) = 0 OR 
-                t.categoria IN $types OR 
-                (t.categoria = 'SUV' AND 'Crossover' IN $types) OR
-                (t.categoria = 'Crossover' AND 'SUV' IN $types) OR
-                (t.categoria = 'Sedán' AND 'Hatchback' IN $types) OR
-                (t.categoria = 'Hatchback' AND 'Sedán' IN $types)
-            )
-            AND (
-                // Ser más flexible con combustible
-                $fuel_filter IS NULL OR
-                c.tipo = $fuel_filter OR
-                (c.tipo = 'Híbrido' AND $fuel_filter = 'Gasolina') OR
-                (c.tipo = 'Gasolina' AND $fuel_filter = 'Híbrido')
-            )
+            cypher_query = f"""
+            {q['match']}
+            WHERE {q['smart_conditions']}
             
-            WITH a, m, t, c, tr,
-                 // Calcular score de recomendación
-                 50 + 
-                 // Bonificación por marca en patrones detectados
-                 (CASE WHEN m.nombre IN $pattern_brands THEN 15 ELSE 5 END) +
-                 
-                 // Bonificación por rango de precio
-                 (CASE 
-                     WHEN a.precio >= 15000 AND a.precio <= 30000 THEN 8  // Económico
-                     WHEN a.precio >= 30000 AND a.precio <= 50000 THEN 12 // Medio
-                     WHEN a.precio >= 50000 AND a.precio <= 80000 THEN 10 // Premium
-                     WHEN a.precio >= 80000 THEN 8                       // Lujo
-                     ELSE 5
-                 END) +
-                 
-                 // Personalización demográfica
-                 (CASE 
-                     WHEN $gender = 'femenino' AND $age_range IN ['26-35', '36-45'] AND t.categoria = 'SUV' THEN 15
-                     WHEN $gender = 'masculino' AND $age_range = '18-25' AND t.categoria IN ['Coupé', 'Convertible'] THEN 12
-                     WHEN $age_range IN ['46-55', '56+'] AND m.nombre IN ['Mercedes-Benz', 'BMW', 'Audi', 'Lexus'] THEN 18
-                     WHEN t.categoria = 'SUV' THEN 5  // SUVs son populares en general
-                     WHEN c.tipo = 'Híbrido' THEN 5   // Híbridos son atractivos
-                     ELSE 3
-                 END) +
-                 
-                 // Bonificación aleatoria para diversidad
-                 (rand() * 5) as recommendation_score
+            WITH {q['carry']}, {q['smart_score']} as recommendation_score
             
-            RETURN 
-                a.id as id,
-                a.modelo as model,
-                m.nombre as brand,
-                a.año as year,
-                a.precio as price,
-                t.categoria as type,
-                c.tipo as fuel_type,
-                tr.tipo as transmission,
-                a.caracteristicas as features,
-                a.segmento as segment,
-                recommendation_score as similarity_score
+            RETURN {q['car_fields']}, recommendation_score as similarity_score
             
             ORDER BY recommendation_score DESC, a.precio ASC
-            LIMIT 20
+            LIMIT $query_limit
             """
             
-            # Preparar parámetros
-            params = {
-                'recommended_brands': all_recommended_brands[:20],  # Incluir más marcas
-                'pattern_brands': recommended_brands[:10] if recommended_brands else [],
-                'types': types if types else [],
-                'gender': gender or '',
-                'age_range': age_range or '',
-                'fuel_filter': fuel[0] if isinstance(fuel, list) and fuel else (fuel if isinstance(fuel, str) else None),
-                'min_price': None,
-                'max_price': None
-            }
+            logger.debug("🎯 Ejecutando recomendaciones con %d marcas sugeridas", len(params['recommended_brands']))
+            
+            result = session.run(Query(cypher_query, timeout=self.QUERY_TIMEOUT), params)
+            recommended_cars = self.rank_smart_candidates(
+                [(record['similarity_score'], record) for record in result], brands, gender, age_range, seed
+            )
+            
+            logger.debug("🎯 Obtenidas %d recomendaciones inteligentes", len(recommended_cars))
+            return recommended_cars
+            
+        except Exception as e:
+            logger.error(f"❌ Error en recomendaciones inteligentes: {e}")
+            raise
+    
+    @timed('neo4j_combined')
+    def get_combined_results(self, session, brands, budget, fuel, types, transmission, gender, age_range, seed=''):
+        """
+        Filtrados exactos y recomendaciones inteligentes en una sola consulta.
+        Las cuatro relaciones de cada auto se recorren una vez y cada fila se marca
+        como 'filtered' o 'recommended' en el servidor. Cada fallo cuenta para el
+        circuit breaker. Devuelve None solo si el servidor no admite la consulta,
+        para que el llamador use las dos consultas separadas (y no la vuelva a
+        intentar); los timeouts y los errores transitorios se propagan.
+        """
+        try:
+            conditions, params = self.build_filtered_conditions(brands, budget, fuel, types, transmission)
+            params.update(self.build_smart_params(brands, budget, fuel, types, gender, age_range))
+            params['filtered_limit'] = 15
             
-            # Agregar parámetros de presupuesto si existe
-            if budget and isinstance(budget, str) and '-' in budget:
-                min_price, max_price = budget.split('-')
-                params['min_price'] = int(min_price)
-                params['max_price'] = int(max_price)
+            # Con menos de 2 filtros no hay resultados exactos, solo recomendaciones
+            filtered_conditions = " AND ".join(conditions) if len(conditions) >= 2 else "false"
+            cypher_query = build_combined_query(self.cypher, filtered_conditions)
             
-            logger.info(f"🎯 Ejecutando recomendaciones con {len(all_recommended_brands)} marcas sugeridas")
+            logger.debug("🔀 Ejecutando consulta combinada (%d filtros, %d marcas sugeridas)",
+                         len(conditions), len(params['recommended_brands']))
             
-            result = session.run(cypher_query, params)
+            result = session.run(Query(cypher_query, timeout=self.QUERY_TIMEOUT), params)
             
-            recommended_cars = []
+            filtered_cars = []
+            smart_candidates = []
             for record in result:
-                # Generar razón de recomendación personalizada
-                brand = record['brand']
-                match_reason = self.generate_recommendation_reason(brand, brands, gender, age_range)
-                
-                car = {
-                    'id': record['id'],
-                    'name': f"{record['brand']} {record['model']} {record['year']}",
-                    'model': record['model'],
-                    'brand': record['brand'],
-                    'year': record['year'],
-                    'price': record['price'],
-                    'type': record['type'],
-                    'fuel': record['fuel_type'],
-                    'transmission': record['transmission'],
-                    'features': record['features'] or [],
-                    'segment': record['segment'],
-                    'similarity_score': min(float(record['similarity_score']), 84),  # Máximo 84 para recomendaciones
-                    'match_type': 'recommended',
-                    'match_reason': match_reason,
-                    'image': None
-                }
-                recommended_cars.append(car)
+                if record['match_type'] == 'filtered':
+                    filtered_cars.append(self.format_car(record['fila'], record['score'], 'filtered',
+                                                         'Coincide exactamente con todos tus filtros'))
+                else:
+                    smart_candidates.append((record['score'], record['fila']))
             
-            logger.info(f"🎯 Obtenidas {len(recommended_cars)} recomendaciones inteligentes")
-            return recommended_cars
+            recommended_cars = self.rank_smart_candidates(smart_candidates, brands, gender, age_range, seed)
+            logger.debug("🔀 Consulta combinada: %d filtrados, %d recomendaciones",
+                         len(filtered_cars), len(recommended_cars))
+            return filtered_cars, recommended_cars
             
-        except Exception as e:
-            logger.error(f"❌ Error en recomendaciones inteligentes: {e}")
+        except (Neo4jError, DriverError) as e:
+            self.breaker.record_failure(e)
+            if not is_unsupported_query_error(e):
+                raise
+            logger.warning(f"⚠️ El servidor no admite la consulta combinada, se usan consultas separadas: {e}")
+            self.combined_query_supported = False
+            return None
+    
+    @timed('filtered')
+    def get_filtered_cars_from_snapshot(self, snapshot, brands, budget, fuel, types, transmission, gender, age_range):
+        """Versión en memoria de get_filtered_cars: filtros con índices de bits, misma puntuación"""
+        index = get_index(snapshot)
+        masks = build_filter_masks(index, brands, budget, fuel, types, transmission)
+        
+        if len(masks) < 2:
+            logger.debug("⚠️ Insuficientes filtros para resultados exactos (mínimo 2)")
             return []
+        
+        max_price = 999999
+        if 'precio' in masks:
+            max_price = parse_budget(budget)[1]
+        
+        brand_set = set(brands or [])
+        scored = []
+        for car in index.rows(combine_masks(index, masks.values())):
+            score = 90 + (5 if car['marca'] in brand_set else 0)
+            if car['precio'] is not None and car['precio'] <= max_price * 0.9:
+                score += 3
+            score += self.filtered_demographic_bonus(car, gender, age_range)
+            scored.append((score, car))
+        
+        # Las filas ya vienen por precio ascendente y top_k respeta ese orden en los empates
+        filtered_cars = [
+            self.format_car(car, score, 'filtered', 'Coincide exactamente con todos tus filtros')
+            for score, car in top_k(scored, 15, key=itemgetter(0))
+        ]
+        logger.debug("🔍 Obtenidos %d resultados filtrados exactos (catálogo en memoria)", len(filtered_cars))
+        return filtered_cars
+    
+    def get_smart_recommendations_from_snapshot(self, snapshot, brands, budget, fuel, types, transmission, gender, age_range, seed=''):
+        """Versión en memoria de get_smart_recommendations: mismos criterios flexibles"""
+        recommended_brands = self.get_brand_patterns(brands)
+        popular_brands = ['Toyota', 'Honda', 'Ford', 'BMW', 'Mercedes-Benz', 'Audi', 'Tesla', 'Nissan']
+        all_recommended_brands = list(set(recommended_brands + popular_brands))
+        all_recommended_brands = [b for b in all_recommended_brands if b not in (brands or [])]
+        if not all_recommended_brands:
+            all_recommended_brands = popular_brands
+        
+        candidate_brands = set(all_recommended_brands[:20])
+        pattern_brands = set(recommended_brands[:10])
+        types = types or []
+        fuel_filter = fuel[0] if isinstance(fuel, list) and fuel else (fuel if isinstance(fuel, str) else None)
+        
+        min_price, max_price = parse_budget(budget) or (None, None)
+        
+        scored = []
+        with span('scoring'):
+            # Recorrido completo del catálogo: atributos del registro en vez de car[...]
+            for car in snapshot.cars:
+                price = car.precio
+                if car.marca not in candidate_brands or price is None:
+                    continue
+                if min_price is not None and price < min_price * 0.7:
+                    continue
+                if max_price is not None and price > max_price * 1.5:
+                    continue
+                if not self.is_flexible_type_match(car.tipo, types):
+                    continue
+                if not self.is_flexible_fuel_match(car.combustible, fuel_filter):
+                    continue
+                
+                score = 50 + (15 if car.marca in pattern_brands else 5)
+                score += self.price_band_bonus(price)
+                score += self.smart_demographic_bonus(car, gender, age_range)
+                scored.append((score, car))
+        
+        recommended_cars = self.rank_smart_candidates(scored, brands, gender, age_range, seed)
+        logger.debug("🎯 Obtenidas %d recomendaciones inteligentes (catálogo en memoria)", len(recommended_cars))
+        return recommended_cars
+    
+    def filtered_demographic_bonus(self, car, gender, age_range):
+        """Bonificación demográfica de los resultados filtrados (mismo CASE que la consulta)"""
+        if gender == 'femenino' and age_range in ['26-35', '36-45'] and car['tipo'] == 'SUV':
+            return 8
+        if gender == 'masculino' and age_range == '18-25' and car['tipo'] in ['Coupé', 'Convertible']:
+            return 8
+        if age_range in ['46-55', '56+'] and car['marca'] in ['Mercedes-Benz', 'BMW', 'Audi', 'Lexus']:
+            return 8
+        return 0
+    
+    def smart_demographic_bonus(self, car, gender, age_range):
+        """Personalización demográfica de las recomendaciones (mismo CASE que la consulta)"""
+        if gender == 'femenino' and age_range in ['26-35', '36-45'] and car['tipo'] == 'SUV':
+            return 15
+        if gender == 'masculino' and age_range == '18-25' and car['tipo'] in ['Coupé', 'Convertible']:
+            return 12
+        if age_range in ['46-55', '56+'] and car['marca'] in ['Mercedes-Benz', 'BMW', 'Audi', 'Lexus']:
+            return 18
+        if car['tipo'] == 'SUV':
+            return 5
+        if car['combustible'] == 'Híbrido':
+            return 5
+        return 3
+    
+    def price_band_bonus(self, price):
+        """Bonificación por rango de precio de las recomendaciones"""
+        if 15000 <= price <= 30000:
+            return 8   # Económico
+        if 30000 <= price <= 50000:
+            return 12  # Medio
+        if 50000 <= price <= 80000:
+            return 10  # Premium
+        if price >= 80000:
+            return 8   # Lujo
+        return 5
+    
+    def is_flexible_type_match(self, car_type, types):
+        """Tipos equivalentes aceptados por las recomendaciones"""
+        if not types or car_type in types:
+            return True
+        equivalents = {'SUV': 'Crossover', 'Crossover': 'SUV', 'Sedán': 'Hatchback', 'Hatchback': 'Sedán'}
+        return equivalents.get(car_type) in types
+    
+    def is_flexible_fuel_match(self, car_fuel, fuel_filter):
+        """Combustibles compatibles aceptados por las recomendaciones"""
+        if fuel_filter is None or car_fuel == fuel_filter:
+            return True
+        return {car_fuel, fuel_filter} == {'Híbrido', 'Gasolina'}
+    
+    def format_car(self, car, score, match_type, match_reason):
+        """Dar formato de respuesta a un auto del catálogo en memoria"""
+        return {
+            'id': car['id'],
+            'name': f"{car['marca']} {car['modelo']} {car['año']}",
+            'model': car['modelo'],
+            'brand': car['marca'],
+            'year': car['año'],
+            'price': car['precio'],
+            'type': car['tipo'],
+            'fuel': car['combustible'],
+            'transmission': car['transmision'],
+            'features': list(car['caracteristicas'] or []),
+            'segment': car['segmento'],
+            'similarity_score': float(score),
+            'match_type': match_type,
+            'match_reason': match_reason,
+            'image': None
+        }
     
     def generate_recommendation_reason(self, brand, selected_brands, gender, age_range):
         """Generar razón personalizada para la recomendación"""
@@ -395,7 +720,7 @@ class CarRecommendationSystem:
     
     def get_fallback_data(self, brands, budget, fuel, types, transmission, gender, age_range):
         """Datos de respaldo cuando Neo4j no está disponible"""
-        logger.info("🔄 Generando datos de respaldo con separación filtrados/recomendaciones")
+        logger.debug("🔄 Generando datos de respaldo con separación filtrados/recomendaciones")
         
         # Simular datos filtrados (coincidencias exactas) - MÁS CANTIDAD
         filtered_results = []
@@ -502,22 +827,156 @@ class CarRecommendationSystem:
                 }
                 recommended_results.append(car)
         
-        logger.info(f"🔄 Generados {len(filtered_results)} filtrados y {len(recommended_results)} recomendaciones de respaldo")
+        logger.debug("🔄 Generados %d filtrados y %d recomendaciones de respaldo",
+                     len(filtered_results), len(recommended_results))
         return filtered_results + recommended_results
 
 # Instancia global del sistema de recomendaciones
 recommendation_system = CarRecommendationSystem()
 
-def get_recommendations(brands=None, budget=None, fuel=None, types=None, transmission=None, gender=None, age_range=None):
+# Hilos acotados para las consultas concurrentes a Neo4j (dos por solicitud)
+QUERY_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="neo4j-query")
+# Margen sobre QUERY_TIMEOUT: el servidor corta la consulta antes de que se deje de esperarla
+QUERY_TIMEOUT_GRACE = 0.5
+
+def get_readiness():
+    """Estado de la conexión en segundo plano, para el endpoint de readiness"""
+    if recommendation_system.offline:
+        # Sin Neo4j: listo en cuanto el repositorio en memoria tiene catálogo
+        snapshot = recommendation_system.get_catalog_snapshot()
+        status = {'ready': snapshot is not None, 'state': 'offline', 'backend': graph_backend()}
+    else:
+        recommendation_system.ensure_connecting()
+        status = recommendation_system.connector.status()
+    status['catalog_version'] = catalog_store.version
+    status['circuit_breaker'] = recommendation_system.breaker.status()
+    return status
+
+def reload_catalog():
+    """Recargar el catálogo en memoria desde su origen (p. ej. después de ejecutar un script de setup)"""
+    recommendation_system.ensure_connecting()
+    if not (recommendation_system.offline or recommendation_system.connected):
+        raise ConnectionError("Neo4j no conectado, no se puede recargar el catálogo")
+    return recommendation_system.get_repository().reload()
+
+def get_facet_counts(brands=None, budget=None, fuel=None, types=None, transmission=None):
+    """Conteo de autos por marca, tipo, combustible y transmisión para la selección actual"""
+    snapshot = recommendation_system.get_catalog_snapshot()
+    if snapshot is None:
+        return None
+    counts = facet_counts_for_selection(get_index(snapshot), brands, budget, fuel, types, transmission)
+    counts['catalog_version'] = snapshot.version
+    return counts
+
+def iter_separate_sections(brands, budget, fuel, types, transmission, gender, age_range, seed=''):
+    """
+    Filtrados exactos y recomendaciones inteligentes en paralelo, cada uno en su
+    sesión: genera cada sección en cuanto su consulta termina, así una consulta
+    lenta no retrasa a la otra. Ambas consultas llevan el plazo del servidor
+    (Query(timeout=QUERY_TIMEOUT)); aquí solo se deja de esperarlas poco después.
+    Una sección que falla o no termina a tiempo se genera vacía.
+    """
+    futures = {
+        QUERY_EXECUTOR.submit(
+            recommendation_system.run_in_session, recommendation_system.get_filtered_cars,
+            brands, budget, fuel, types, transmission, gender, age_range
+        ): ('filtered', 'filtrados'),
+        QUERY_EXECUTOR.submit(
+            recommendation_system.run_in_session, recommendation_system.get_smart_recommendations,
+            brands, budget, fuel, types, transmission, gender, age_range, seed
+        ): ('recommended', 'recomendaciones'),
+    }
+    pending = dict(futures)
+    try:
+        timeout = recommendation_system.QUERY_TIMEOUT + QUERY_TIMEOUT_GRACE
+        for future in as_completed(futures, timeout=timeout):
+            section, label = pending.pop(future)
+            yield section, recommendation_system.query_result(future, label)
+    except FutureTimeoutError:
+        for section, label in pending.values():
+            recommendation_system.query_timed_out(label)
+            yield section, []
+
+def iter_fallback_sections(brands, budget, fuel, types, transmission, gender, age_range, reason='no_results'):
+    """Autos de respaldo separados en secciones"""
+    FALLBACKS.inc(reason=reason)
+    fallback = recommendation_system.get_fallback_data(brands, budget, fuel, types, transmission, gender, age_range)
+    for section, cars in split_sections(fallback).items():
+        if cars:
+            yield section, cars
+
+def iter_snapshot_sections(snapshot, brands, budget, fuel, types, transmission, gender, age_range, seed=''):
+    """
+    Filtrados y recomendaciones sobre una instantánea del catálogo, sección por
+    sección: los filtrados se entregan antes de calcular las recomendaciones
+    """
+    filtered_cars = recommendation_system.get_filtered_cars_from_snapshot(
+        snapshot, brands, budget, fuel, types, transmission, gender, age_range
+    )
+    if filtered_cars:
+        yield 'filtered', filtered_cars
+    
+    recommended_cars = recommendation_system.get_smart_recommendations_from_snapshot(
+        snapshot, brands, budget, fuel, types, transmission, gender, age_range, seed
+    )
+    
+    logger.debug("📊 Resultados (catálogo v%s): %d filtrados, %d recomendaciones",
+                 snapshot.version, len(filtered_cars), len(recommended_cars))
+    
+    if recommended_cars:
+        yield 'recommended', recommended_cars
+    elif not filtered_cars:
+        logger.warning("⚠️ No se encontraron resultados, usando respaldo")
+        yield from iter_fallback_sections(brands, budget, fuel, types, transmission, gender, age_range)
+
+def iter_degraded_sections(brands, budget, fuel, types, transmission, gender, age_range, seed=''):
+    """
+    Modo degradado (Neo4j lento, caído o con el circuito abierto): la última
+    instantánea buena del catálogo o el archivo del catálogo; los autos de
+    respaldo solo si no hay ninguna de las dos
+    """
+    snapshot = catalog_store.snapshot or catalog_store.get(None)
+    if snapshot is not None:
+        FALLBACKS.inc(reason='degraded_snapshot')
+        logger.debug("🛟 Modo degradado: catálogo en memoria v%s", snapshot.version)
+        yield from iter_snapshot_sections(snapshot, brands, budget, fuel, types, transmission, gender, age_range, seed)
+        return
+    
+    logger.warning("❌ Sin catálogo disponible, usando datos de respaldo")
+    yield from iter_fallback_sections(brands, budget, fuel, types, transmission, gender, age_range,
+                                      reason='no_catalog')
+
+def serve_from_snapshot(snapshot, brands, budget, fuel, types, transmission, gender, age_range, seed=''):
+    """Filtrados y recomendaciones calculados sobre una instantánea del catálogo"""
+    return [car for _, cars in iter_snapshot_sections(
+        snapshot, brands, budget, fuel, types, transmission, gender, age_range, seed
+    ) for car in cars]
+
+def serve_degraded(brands, budget, fuel, types, transmission, gender, age_range, seed=''):
+    """Lista completa del modo degradado (ver iter_degraded_sections)"""
+    return [car for _, cars in iter_degraded_sections(
+        brands, budget, fuel, types, transmission, gender, age_range, seed
+    ) for car in cars]
+
+def iter_recommendations(brands=None, budget=None, fuel=None, types=None, transmission=None, gender=None, age_range=None):
     """
-    Función principal de recomendaciones que devuelve tanto filtrados como recomendaciones
+    Recomendaciones por sección: genera pares (sección, autos) en cuanto cada
+    sección está lista: 'filtered' antes que 'recommended', salvo con las consultas
+    separadas a Neo4j, donde llega primero la que termina antes. Cada sección aparece
+    a lo sumo una vez; una sección sin resultados no se genera.
+    Es determinista: las mismas preferencias producen las mismas secciones (ver preference_seed).
     """
+    seed = ''
+    emitted = set()
+    snapshot = None
     try:
-        logger.info("🎯 INICIANDO SISTEMA DE RECOMENDACIONES INTELIGENTE")
-        logger.info("=" * 60)
-        logger.info(f"📊 Entrada: brands={brands}, budget={budget}, fuel={fuel}")
-        logger.info(f"         types={types}, transmission={transmission}")
-        logger.info(f"         gender={gender}, age_range={age_range}")
+        logger.debug("🎯 Entrada: brands=%s, budget=%s, fuel=%s, types=%s, transmission=%s, gender=%s, age_range=%s",
+                     brands, budget, fuel, types, transmission, gender, age_range)
+        
+        # Semilla de diversidad derivada de las preferencias, no del azar
+        seed = preference_seed(preference_key(normalize_preferences(
+            brands, budget, fuel, types, transmission, gender, age_range
+        )))
         
         # Normalizar parámetros
         brands = brands if isinstance(brands, list) else [brands] if brands else []
@@ -525,40 +984,86 @@ def get_recommendations(brands=None, budget=None, fuel=None, types=None, transmi
         types = types if isinstance(types, list) else [types] if types else []
         transmission = transmission if isinstance(transmission, list) else [transmission] if transmission else []
         
+        snapshot = recommendation_system.get_catalog_snapshot()
+        if snapshot is not None:
+            # Catálogo en memoria: sin viajes a Neo4j por solicitud
+            for section, cars in iter_snapshot_sections(snapshot, brands, budget, fuel, types, transmission, gender, age_range, seed):
+                emitted.add(section)
+                yield section, cars
+            return
+        
         if not recommendation_system.connected:
-            logger.warning("❌ Neo4j no conectado, usando datos de respaldo")
-            return recommendation_system.get_fallback_data(brands, budget, fuel, types, transmission, gender, age_range)
+            logger.warning("❌ Neo4j no conectado")
+            yield from iter_degraded_sections(brands, budget, fuel, types, transmission, gender, age_range, seed)
+            return
         
-        with recommendation_system.driver.session() as session:
-            # Obtener resultados filtrados (coincidencias exactas)
-            filtered_cars = recommendation_system.get_filtered_cars(
-                session, brands, budget, fuel, types, transmission, gender, age_range
-            )
-            
-            # Obtener recomendaciones inteligentes
-            recommended_cars = recommendation_system.get_smart_recommendations(
-                session, brands, budget, fuel, types, transmission, gender, age_range
+        if not recommendation_system.breaker.allow_request():
+            logger.warning("🚧 Circuito de Neo4j abierto, sirviendo sin consultar la base")
+            yield from iter_degraded_sections(brands, budget, fuel, types, transmission, gender, age_range, seed)
+            return
+        
+        combined = None
+        if recommendation_system.combined_query_supported:
+            # Una sola consulta para filtrados y recomendaciones
+            try:
+                with recommendation_system.driver.session() as session:
+                    combined = recommendation_system.get_combined_results(
+                        session, brands, budget, fuel, types, transmission, gender, age_range, seed
+                    )
+            except (Neo4jError, DriverError) as e:
+                # Timeout o error transitorio (ya contado en el circuit breaker):
+                # no se insiste con otras dos consultas, se sirve en modo degradado
+                logger.warning(f"⏱️ Consulta combinada fallida, sirviendo en modo degradado: {e}")
+                if isinstance(e, (ServiceUnavailable, SessionExpired)):
+                    recommendation_system.mark_unavailable(e)
+                yield from iter_degraded_sections(brands, budget, fuel, types, transmission, gender, age_range, seed)
+                return
+        
+        if combined is not None:
+            recommendation_system.breaker.record_success()
+            sections = (('filtered', combined[0]), ('recommended', combined[1]))
+        else:
+            # Servidor sin la consulta combinada (p. ej. sin subconsultas CALL):
+            # las dos consultas en paralelo, cada sección en cuanto está lista
+            sections = iter_separate_sections(
+                brands, budget, fuel, types, transmission, gender, age_range, seed
             )
-            
-            # Combinar resultados
-            all_results = filtered_cars + recommended_cars
-            
-            logger.info(f"📊 RESULTADOS FINALES:")
-            logger.info(f"  🔍 Filtrados exactos: {len(filtered_cars)}")
-            logger.info(f"  🎯 Recomendaciones inteligentes: {len(recommended_cars)}")
-            logger.info(f"  📋 Total: {len(all_results)}")
-            
-            if not all_results:
-                logger.warning("⚠️ No se encontraron resultados, usando respaldo")
-                return recommendation_system.get_fallback_data(brands, budget, fuel, types, transmission, gender, age_range)
-            
-            logger.info("=" * 60)
-            return all_results
+        
+        for section, cars in sections:
+            logger.debug("📊 Resultados: %d en %s", len(cars), section)
+            if cars:
+                emitted.add(section)
+                yield section, cars
+        
+        if not emitted:
+            logger.warning("⚠️ No se encontraron resultados, usando respaldo")
+            yield from iter_fallback_sections(brands, budget, fuel, types, transmission, gender, age_range)
         
     except Exception as e:
-        logger.error(f"❌ ERROR EN get_recommendations: {e}")
-        traceback.print_exc()
-        return recommendation_system.get_fallback_data(brands, budget, fuel, types, transmission, gender, age_range)
+        logger.exception("❌ ERROR EN get_recommendations: %s", e)
+        if isinstance(e, (Neo4jError, DriverError)):
+            recommendation_system.breaker.record_failure(e)
+        if isinstance(e, (ServiceUnavailable, SessionExpired)):
+            recommendation_system.mark_unavailable(e)
+        if snapshot is not None:
+            # Falló el cálculo sobre el catálogo en memoria: el modo degradado
+            # repetiría el mismo cálculo, así que directo a los autos de respaldo
+            fallback = iter_fallback_sections(brands, budget, fuel, types, transmission, gender, age_range,
+                                              reason='error')
+        else:
+            fallback = iter_degraded_sections(brands, budget, fuel, types, transmission, gender, age_range, seed)
+        # Las secciones ya entregadas no se repiten
+        for section, cars in fallback:
+            if section not in emitted:
+                yield section, cars
+
+def get_recommendations(brands=None, budget=None, fuel=None, types=None, transmission=None, gender=None, age_range=None):
+    """
+    Función principal de recomendaciones que devuelve tanto filtrados como recomendaciones.
+    Es determinista: las mismas preferencias producen la misma lista (ver preference_seed).
+    """
+    sections = dict(iter_recommendations(brands, budget, fuel, types, transmission, gender, age_range))
+    return [car for section in SECTIONS for car in sections.get(section, [])]
 
 def test_recommendations():
     """Función de prueba"""
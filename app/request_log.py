@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Registro estructurado de solicitudes
+Reemplaza las decenas de print por solicitud con una sola línea JSON al
+terminar cada solicitud: método, ruta, estado, duración total y la de cada
+etapa (caché, recomendador, serialización), más los campos que agregue el
+endpoint. Los mensajes de los módulos se formatean solo si su nivel está
+activo, los niveles se ajustan por módulo y las solicitudes exitosas se pueden
+muestrear; las que terminan en error se registran siempre.
+
+Variables de entorno (todas opcionales):
+    LOG_LEVEL        nivel general (INFO)
+    LOG_LEVELS       niveles por módulo, p. ej. "recommender=DEBUG,request=WARNING"
+    LOG_FORMAT       json (por defecto) o text
+    LOG_SAMPLE_RATE  fracción de solicitudes exitosas que se registran (1.0)
+"""
+
+import json
+import logging
+import os
+import random
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+from flask import g, has_request_context, request
+
+from metrics import REQUEST_SECONDS, STAGE_SECONDS
+
+REQUEST_LOGGER = 'request'
+request_logger = logging.getLogger(REQUEST_LOGGER)
+
+# Atributos propios de LogRecord: todo lo demás llegó por extra=
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+class JsonFormatter(logging.Formatter):
+    """Un objeto JSON por línea con la hora, el nivel, el logger, el mensaje y los extra"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            'ts': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                payload[key] = value
+        if record.exc_info:
+            payload['exc'] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+def parse_levels(spec: Optional[str]) -> Dict[str, int]:
+    """'modulo=NIVEL,otro=NIVEL' -> {modulo: nivel}; se ignoran las entradas inválidas"""
+    levels: Dict[str, int] = {}
+    for item in (spec or '').split(','):
+        name, _, level = item.partition('=')
+        level_number = logging.getLevelName(level.strip().upper())
+        if name.strip() and isinstance(level_number, int):
+            levels[name.strip()] = level_number
+    return levels
+
+def _env_sample_rate() -> float:
+    try:
+        return min(1.0, max(0.0, float(os.environ.get('LOG_SAMPLE_RATE', '1'))))
+    except ValueError:
+        return 1.0
+
+def configure_logging(level: Optional[str] = None, module_levels: Optional[Dict[str, int]] = None,
+                      fmt: Optional[str] = None, stream=None):
+    """
+    Configurar el registro del proceso. Reemplaza los handlers de logging.basicConfig
+    que instalan los recomendadores al importarse
+    """
+    level = (level or os.environ.get('LOG_LEVEL', 'INFO')).upper()
+    fmt = (fmt or os.environ.get('LOG_FORMAT', 'json')).lower()
+
+    handler = logging.StreamHandler(stream or sys.stderr)
+    if fmt == 'json':
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+    logging.basicConfig(level=level, handlers=[handler], force=True)
+
+    levels = parse_levels(os.environ.get('LOG_LEVELS'))
+    levels.update(module_levels or {})
+    for name, module_level in levels.items():
+        logging.getLogger(name).setLevel(module_level)
+
+class RequestLog:
+    """Duración por etapa y campos de una solicitud, registrados en una sola línea al final"""
+
+    def __init__(self, method: str = '', path: str = '', sample_rate: Optional[float] = None,
+                 endpoint: Optional[str] = None):
+        self.started = time.perf_counter()
+        self.method = method
+        self.path = path
+        self.endpoint = endpoint
+        self.fields: Dict[str, Any] = {}
+        self.timings: Dict[str, float] = {}
+        rate = _env_sample_rate() if sample_rate is None else sample_rate
+        self.sampled = rate >= 1.0 or random.random() < rate
+        self.emitted = False
+
+    def elapsed_ms(self) -> float:
+        return round((time.perf_counter() - self.started) * 1000, 3)
+
+    @contextmanager
+    def stage(self, name: str):
+        """Medir una etapa (también en el histograma de etapas); si se repite, las duraciones se suman"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            STAGE_SECONDS.observe(duration, stage=name)
+            self.timings[name] = round(self.timings.get(name, 0.0) + duration * 1000, 3)
+
+    def mark(self, name: str):
+        """Tiempo desde el inicio de la solicitud hasta este punto (p. ej. la primera sección)"""
+        self.timings.setdefault(name, self.elapsed_ms())
+
+    def set(self, **fields: Any):
+        self.fields.update(fields)
+
+    def emit(self, status: int):
+        """Registrar la solicitud una sola vez; los errores no se muestrean"""
+        if self.emitted:
+            return
+        self.emitted = True
+        if self.endpoint is not None:
+            REQUEST_SECONDS.observe(time.perf_counter() - self.started, endpoint=self.endpoint)
+
+        level = logging.ERROR if status >= 500 else logging.WARNING if status >= 400 else logging.INFO
+        if level == logging.INFO and not self.sampled:
+            return
+        if not request_logger.isEnabledFor(level):
+            return
+
+        request_logger.log(level, "%s %s %s", self.method, self.path, status, extra={'request': {
+            'method': self.method,
+            'path': self.path,
+            'status': status,
+            'duration_ms': self.elapsed_ms(),
+            'timings_ms': self.timings,
+            **self.fields,
+        }})
+
+# Para llamadas fuera de una solicitud (scripts, pruebas): mide pero nunca registra
+_DETACHED = RequestLog(sample_rate=0.0)
+_DETACHED.emitted = True
+
+def current_request_log() -> RequestLog:
+    """RequestLog de la solicitud en curso"""
+    if has_request_context():
+        log = g.get('request_log')
+        if log is not None:
+            return log
+    return _DETACHED
+
+def install_request_logging(app, skip_prefixes=('/static/',)):
+    """
+    Abrir un RequestLog al empezar cada solicitud y registrarlo al cerrar la
+    respuesta, de modo que las respuestas en streaming cuentan su duración completa
+    """
+    @app.before_request
+    def _start_request_log():
+        if not request.path.startswith(skip_prefixes):
+            g.request_log = RequestLog(request.method, request.path,
+                                       endpoint=request.endpoint or 'unmatched')
+
+    @app.after_request
+    def _finish_request_log(response):
+        log = g.get('request_log')
+        if log is not None:
+            status = response.status_code
+            response.call_on_close(lambda: log.emit(status))
+        return response
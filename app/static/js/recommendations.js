@@ -6,6 +6,13 @@ let filteredCars = [];
 let recommendedCars = [];
 let currentFilters = {};
 
+// Paginación por sección: total en el servidor y cursor de la página siguiente
+const PAGE_SIZE = 12;
+const sectionState = {
+    filtered: { total: 0, nextCursor: null },
+    recommended: { total: 0, nextCursor: null }
+};
+
 // Inicialización
 document.addEventListener('DOMContentLoaded', function() {
     console.log('📱 DOM cargado, iniciando aplicación con separación...');
@@ -147,14 +154,19 @@ function formatBudget(budget) {
 }
 
 // Cargar recomendaciones con separación clara
+// El servidor envía NDJSON: una línea por sección en cuanto está lista (los
+// filtrados primero) con su primera página, y una línea final 'done'
 async function loadRecommendationsWithSeparation() {
     console.log('🎯 Iniciando carga de recomendaciones con separación...');
     
     try {
         showLoading();
         
-        console.log('📡 Realizando petición a /api/recommendations...');
-        const response = await fetch('/api/recommendations');
+        filteredCars = [];
+        recommendedCars = [];
+        
+        console.log('📡 Realizando petición a /api/recommendations (stream)...');
+        const response = await fetch(`/api/recommendations?stream=1&limit=${PAGE_SIZE}`);
         
         console.log('📨 Respuesta recibida:', response.status, response.statusText);
         
@@ -164,41 +176,143 @@ async function loadRecommendationsWithSeparation() {
             throw new Error(`HTTP ${response.status}: ${errorText}`);
         }
         
-        const data = await response.json();
-        console.log('📄 Datos parseados:', data);
+        await readNdjson(response, message => {
+            if (message.error) {
+                throw new Error(message.error);
+            }
+            if (message.done) {
+                return;
+            }
+            
+            // Mostrar cada sección apenas llega
+            hideLoading();
+            applySectionPage(message.section, message);
+        });
         
-        if (data.error) {
-            throw new Error(data.error);
-        }
+        hideLoading();
         
-        if (!Array.isArray(data)) {
-            throw new Error('Formato de datos inválido: esperaba un array');
-        }
+        console.log('📊 SEPARACIÓN DE RESULTADOS:');
+        console.log(`  🔍 Filtrados exactos: ${sectionState.filtered.total}`);
+        console.log(`  🎯 Recomendaciones inteligentes: ${sectionState.recommended.total}`);
+        console.log('✅ Recomendaciones cargadas y separadas exitosamente');
         
-        // Separar resultados por tipo
-        const filtered = data.filter(car => car.match_type === 'filtered');
-        const recommended = data.filter(car => car.match_type === 'recommended');
+    } catch (error) {
+        console.error('❌ Error cargando recomendaciones:', error);
+        hideLoading();
+        showError(error.message);
+    }
+}
+
+// Leer una respuesta NDJSON línea por línea a medida que llega
+async function readNdjson(response, onMessage) {
+    if (!response.body || !response.body.getReader) {
+        // Navegadores sin streams: esperar la respuesta completa
+        const text = await response.text();
+        text.split('\n').filter(line => line.trim()).forEach(line => onMessage(JSON.parse(line)));
+        return;
+    }
+    
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    
+    while (true) {
+        const { value, done } = await reader.read();
+        if (value) {
+            buffer += decoder.decode(value, { stream: true });
+        }
         
-        console.log('📊 SEPARACIÓN DE RESULTADOS:');
-        console.log(`  🔍 Filtrados exactos: ${filtered.length}`);
-        console.log(`  🎯 Recomendaciones inteligentes: ${recommended.length}`);
+        let newline;
+        while ((newline = buffer.indexOf('\n')) >= 0) {
+            const line = buffer.slice(0, newline).trim();
+            buffer = buffer.slice(newline + 1);
+            if (line) {
+                onMessage(JSON.parse(line));
+            }
+        }
         
-        // Guardar en variables globales
-        filteredCars = filtered;
-        recommendedCars = recommended;
+        if (done) {
+            break;
+        }
+    }
+    
+    buffer += decoder.decode();
+    if (buffer.trim()) {
+        onMessage(JSON.parse(buffer));
+    }
+}
+
+// Agregar una página a su sección y volver a mostrarla
+function applySectionPage(section, pageData) {
+    if (!pageData || !sectionState[section]) {
+        console.warn('⚠️ Sección desconocida:', section);
+        return;
+    }
+    
+    sectionState[section] = { total: pageData.total, nextCursor: pageData.next_cursor };
+    
+    if (section === 'filtered') {
+        filteredCars = filteredCars.concat(pageData.items);
+        displayFilteredResults(filteredCars);
+    } else {
+        recommendedCars = recommendedCars.concat(pageData.items);
+        displayIntelligentRecommendations(recommendedCars);
+    }
+    
+    updateLoadMoreButton(section);
+}
+
+// Pedir la página siguiente de una sección con su cursor
+async function loadMoreCars(section) {
+    const state = sectionState[section];
+    if (!state || !state.nextCursor) {
+        return;
+    }
+    
+    const button = document.getElementById(`${section}-load-more`);
+    if (button) button.disabled = true;
+    
+    try {
+        const response = await fetch(`/api/recommendations?limit=${PAGE_SIZE}&cursor=${encodeURIComponent(state.nextCursor)}`);
         
-        // Mostrar cada sección por separado
-        displayFilteredResults(filtered);
-        displayIntelligentRecommendations(recommended);
+        if (response.status === 410) {
+            // Cambió la selección o se recargó el catálogo: empezar de nuevo
+            console.warn('🔄 Cursor vencido, recargando recomendaciones');
+            await loadRecommendationsWithSeparation();
+            return;
+        }
         
-        hideLoading();
+        const data = await response.json();
+        if (!response.ok || data.error) {
+            throw new Error(data.error || `HTTP ${response.status}`);
+        }
         
-        console.log('✅ Recomendaciones cargadas y separadas exitosamente');
+        applySectionPage(section, data[section]);
+        console.log(`✅ Página siguiente de '${section}' cargada`);
         
     } catch (error) {
-        console.error('❌ Error cargando recomendaciones:', error);
-        hideLoading();
+        console.error('❌ Error cargando más resultados:', error);
         showError(error.message);
+    } finally {
+        if (button) button.disabled = false;
+    }
+}
+
+// Mostrar u ocultar el botón "ver más" de la sección
+function updateLoadMoreButton(section) {
+    const button = document.getElementById(`${section}-load-more`);
+    if (!button) return;
+    
+    const loaded = section === 'filtered' ? filteredCars.length : recommendedCars.length;
+    const remaining = sectionState[section].total - loaded;
+    
+    if (sectionState[section].nextCursor && remaining > 0) {
+        button.textContent = section === 'filtered'
+            ? `Ver más coincidencias (${remaining})`
+            : `Ver más recomendaciones (${remaining})`;
+        button.style.display = 'block';
+    } else {
+        button.style.display = 'none';
     }
 }
 
@@ -219,7 +333,7 @@ function displayFilteredResults(cars) {
         return;
     }
     
-    countElement.textContent = cars.length;
+    countElement.textContent = Math.max(sectionState.filtered.total, cars.length);
     container.innerHTML = cars.map(car => createCarCard(car, 'filtered')).join('');
     section.style.display = 'block';
     
@@ -246,7 +360,7 @@ function displayIntelligentRecommendations(cars) {
         return;
     }
     
-    countElement.textContent = cars.length;
+    countElement.textContent = Math.max(sectionState.recommended.total, cars.length);
     container.innerHTML = cars.map(car => createCarCard(car, 'recommended')).join('');
     section.style.display = 'block';
     
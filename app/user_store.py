@@ -0,0 +1,494 @@
+#!/usr/bin/env python3
+"""
+Almacenamiento de usuarios, perfiles y favoritos
+Reemplaza los diccionarios del proceso (USERS_DB, USER_PROFILES, USER_FAVORITES)
+por un almacén persistente que comparten todos los workers. Los favoritos se
+indexan por (usuario, car_id), así agregar, quitar o verificar uno no recorre
+la lista del usuario.
+
+Backends (variable de entorno USER_STORE):
+    sqlite  (por defecto) archivo local en modo WAL, ruta en USER_STORE_PATH
+    neo4j   nodos Usuario con relaciones FAVORITO, los mismos que usa
+            MotorNeo4j (backend/motor_neo4j.py)
+    memory  diccionarios del proceso, solo para desarrollo con un worker
+Otros backends se registran con register_user_store
+"""
+
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from graph_driver import get_driver
+
+logger = logging.getLogger(__name__)
+
+# Ruta por defecto; se puede cambiar con la variable de entorno USER_STORE_PATH
+DEFAULT_USER_STORE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "users.db")
+
+def user_store_path() -> str:
+    return os.environ.get("USER_STORE_PATH", DEFAULT_USER_STORE_PATH)
+
+def favorite_key(car_id: Any) -> str:
+    """Los ids llegan como texto o número desde el frontend; se comparan como texto"""
+    return str(car_id)
+
+class UnknownCarError(LookupError):
+    """El backend no tiene el auto que se quiso marcar como favorito"""
+
+    def __init__(self, car_ids: Iterable[str]):
+        self.car_ids = list(car_ids)
+        super().__init__(f"Autos inexistentes: {', '.join(self.car_ids)}")
+
+class UserStore:
+    """Interfaz común de los backends de usuarios"""
+
+    def create_user(self, email: str, password_hash: str) -> bool:
+        """Crear usuario con perfil y favoritos vacíos; False si ya existía"""
+        raise NotImplementedError
+
+    def get_user(self, email: str) -> Optional[Dict[str, Any]]:
+        """{'password', 'created_at'} o None"""
+        raise NotImplementedError
+
+    def get_profile(self, email: str) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def save_profile(self, email: str, profile: Dict[str, Any]):
+        """Reemplazar el perfil completo"""
+        raise NotImplementedError
+
+    def update_profile(self, email: str, **fields: Any):
+        """Cambiar solo algunos campos del perfil (por ejemplo el tema)"""
+        raise NotImplementedError
+
+    def list_favorites(self, email: str) -> List[Dict[str, Any]]:
+        """Favoritos en el orden en que se agregaron"""
+        raise NotImplementedError
+
+    def add_favorite(self, email: str, car: Dict[str, Any]) -> bool:
+        """False si el auto ya estaba en favoritos; UnknownCarError si el backend no lo tiene"""
+        return self.add_favorites(email, [car]) == 1
+
+    def add_favorites(self, email: str, cars: Iterable[Dict[str, Any]]) -> int:
+        """
+        Agregar varios favoritos en una sola escritura; devuelve cuántos eran
+        nuevos. Los backends que solo enlazan autos existentes lanzan
+        UnknownCarError (sin agregar ninguno) si falta alguno
+        """
+        raise NotImplementedError
+
+    def remove_favorite(self, email: str, car_id: Any) -> bool:
+        raise NotImplementedError
+
+    def clear_favorites(self, email: str) -> int:
+        raise NotImplementedError
+
+    def counts(self) -> Dict[str, int]:
+        """{'users', 'profiles', 'favorites'} para las rutas de diagnóstico"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS users (
+        email TEXT PRIMARY KEY,
+        password TEXT NOT NULL,
+        created_at TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS profiles (
+        email TEXT PRIMARY KEY REFERENCES users(email) ON DELETE CASCADE,
+        data TEXT NOT NULL DEFAULT '{}'
+    );
+    CREATE TABLE IF NOT EXISTS favorites (
+        email TEXT NOT NULL REFERENCES users(email) ON DELETE CASCADE,
+        car_id TEXT NOT NULL,
+        data TEXT NOT NULL,
+        created_at TEXT NOT NULL,
+        PRIMARY KEY (email, car_id)
+    );
+"""
+
+class SQLiteUserStore(UserStore):
+    """
+    Archivo SQLite en modo WAL: los lectores no bloquean al escritor y varios
+    procesos (workers de gunicorn, por ejemplo) pueden usar el mismo archivo.
+    Las conexiones salen de un pool acotado (pool_size) y vuelven a él al
+    terminar cada operación, así un servidor con un hilo por solicitud no abre
+    una conexión por hilo. Las escrituras usan BEGIN IMMEDIATE y esperan hasta
+    busy_timeout si otro proceso está escribiendo.
+    """
+
+    def __init__(self, path: Optional[str] = None, busy_timeout: float = 5.0, pool_size: int = 8):
+        self.path = path or user_store_path()
+        self.busy_timeout = busy_timeout
+        if self.path == ":memory:":
+            # Cada conexión a :memory: es otra base: una sola conexión compartida
+            pool_size = 1
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.pool_size = pool_size
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self._closed = False
+        # Crear las tablas una sola vez, al abrir, no en la primera solicitud
+        with self._connection() as connection:
+            connection.executescript(SCHEMA)
+
+    def _open(self) -> sqlite3.Connection:
+        # isolation_level=None: las transacciones se abren explícitamente en _write
+        connection = sqlite3.connect(self.path, timeout=self.busy_timeout,
+                                     isolation_level=None, check_same_thread=False)
+        connection.row_factory = sqlite3.Row
+        # Opciones por conexión (journal_mode queda guardado en el archivo)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute("PRAGMA foreign_keys=ON")
+        connection.execute(f"PRAGMA busy_timeout={int(self.busy_timeout * 1000)}")
+        return connection
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        """Conexión del pool para una operación; espera si las pool_size están en uso"""
+        self._slots.acquire()
+        try:
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                connection = self._open()
+            try:
+                yield connection
+            finally:
+                if self._closed:
+                    connection.close()
+                else:
+                    self._idle.put(connection)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def _write(self) -> Iterator[sqlite3.Connection]:
+        """Una transacción de escritura; todo lo que se haga dentro se confirma junto"""
+        with self._connection() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+
+    def create_user(self, email: str, password_hash: str) -> bool:
+        with self._write() as connection:
+            created = connection.execute(
+                "INSERT OR IGNORE INTO users (email, password, created_at) VALUES (?, ?, ?)",
+                (email, password_hash, datetime.now().isoformat())
+            ).rowcount == 1
+            if created:
+                connection.execute("INSERT OR IGNORE INTO profiles (email) VALUES (?)", (email,))
+        return created
+
+    def get_user(self, email: str) -> Optional[Dict[str, Any]]:
+        with self._connection() as connection:
+            row = connection.execute(
+                "SELECT password, created_at FROM users WHERE email = ?", (email,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def get_profile(self, email: str) -> Dict[str, Any]:
+        with self._connection() as connection:
+            row = connection.execute("SELECT data FROM profiles WHERE email = ?", (email,)).fetchone()
+        return json.loads(row['data']) if row else {}
+
+    def save_profile(self, email: str, profile: Dict[str, Any]):
+        with self._write() as connection:
+            connection.execute(
+                "INSERT INTO profiles (email, data) VALUES (?, ?) "
+                "ON CONFLICT(email) DO UPDATE SET data = excluded.data",
+                (email, json.dumps(profile))
+            )
+
+    def update_profile(self, email: str, **fields: Any):
+        # Leer y escribir dentro de la misma transacción para no perder cambios de otro worker
+        with self._write() as connection:
+            row = connection.execute("SELECT data FROM profiles WHERE email = ?", (email,)).fetchone()
+            profile = json.loads(row['data']) if row else {}
+            profile.update(fields)
+            connection.execute(
+                "INSERT INTO profiles (email, data) VALUES (?, ?) "
+                "ON CONFLICT(email) DO UPDATE SET data = excluded.data",
+                (email, json.dumps(profile))
+            )
+
+    def list_favorites(self, email: str) -> List[Dict[str, Any]]:
+        with self._connection() as connection:
+            rows = connection.execute(
+                "SELECT data FROM favorites WHERE email = ? ORDER BY rowid", (email,)
+            ).fetchall()
+        return [json.loads(row['data']) for row in rows]
+
+    def add_favorites(self, email: str, cars: Iterable[Dict[str, Any]]) -> int:
+        now = datetime.now().isoformat()
+        rows = [(email, favorite_key(car.get('id')), json.dumps(car), now) for car in cars]
+        if not rows:
+            return 0
+        with self._write() as connection:
+            before = connection.total_changes
+            connection.executemany(
+                "INSERT OR IGNORE INTO favorites (email, car_id, data, created_at) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            return connection.total_changes - before
+
+    def remove_favorite(self, email: str, car_id: Any) -> bool:
+        with self._write() as connection:
+            return connection.execute(
+                "DELETE FROM favorites WHERE email = ? AND car_id = ?", (email, favorite_key(car_id))
+            ).rowcount > 0
+
+    def clear_favorites(self, email: str) -> int:
+        with self._write() as connection:
+            return connection.execute("DELETE FROM favorites WHERE email = ?", (email,)).rowcount
+
+    def counts(self) -> Dict[str, int]:
+        with self._connection() as connection:
+            row = connection.execute(
+                "SELECT (SELECT COUNT(*) FROM users) AS users, "
+                "(SELECT COUNT(*) FROM profiles) AS profiles, "
+                "(SELECT COUNT(*) FROM favorites) AS favorites"
+            ).fetchone()
+        return dict(row)
+
+    def close(self):
+        # Las conexiones en uso se cierran al devolverse
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+class MemoryUserStore(UserStore):
+    """Diccionarios del proceso, con favoritos indexados por car_id; no persiste ni se comparte"""
+
+    def __init__(self):
+        self.users: Dict[str, Dict[str, Any]] = {}
+        self.profiles: Dict[str, Dict[str, Any]] = {}
+        # dict conserva el orden de inserción: sirve de lista y de índice a la vez
+        self.favorites: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def create_user(self, email: str, password_hash: str) -> bool:
+        with self._lock:
+            if email in self.users:
+                return False
+            self.users[email] = {"password": password_hash, "created_at": datetime.now().isoformat()}
+            self.profiles[email] = {}
+            self.favorites[email] = {}
+            return True
+
+    def get_user(self, email: str) -> Optional[Dict[str, Any]]:
+        user = self.users.get(email)
+        return dict(user) if user else None
+
+    def get_profile(self, email: str) -> Dict[str, Any]:
+        return dict(self.profiles.get(email, {}))
+
+    def save_profile(self, email: str, profile: Dict[str, Any]):
+        with self._lock:
+            self.profiles[email] = dict(profile)
+
+    def update_profile(self, email: str, **fields: Any):
+        with self._lock:
+            self.profiles.setdefault(email, {}).update(fields)
+
+    def list_favorites(self, email: str) -> List[Dict[str, Any]]:
+        return list(self.favorites.get(email, {}).values())
+
+    def add_favorites(self, email: str, cars: Iterable[Dict[str, Any]]) -> int:
+        added = 0
+        with self._lock:
+            favorites = self.favorites.setdefault(email, {})
+            for car in cars:
+                key = favorite_key(car.get('id'))
+                if key not in favorites:
+                    favorites[key] = car
+                    added += 1
+        return added
+
+    def remove_favorite(self, email: str, car_id: Any) -> bool:
+        with self._lock:
+            return self.favorites.get(email, {}).pop(favorite_key(car_id), None) is not None
+
+    def clear_favorites(self, email: str) -> int:
+        with self._lock:
+            removed = len(self.favorites.get(email, {}))
+            self.favorites[email] = {}
+            return removed
+
+    def counts(self) -> Dict[str, int]:
+        return {
+            'users': len(self.users),
+            'profiles': len(self.profiles),
+            'favorites': sum(len(favorites) for favorites in self.favorites.values()),
+        }
+
+class Neo4jUserStore(UserStore):
+    """
+    Usuarios en el grafo: Usuario {nombre: email} con el perfil como JSON y
+    FAVORITO hacia el nodo Auto con los datos que envió el frontend. Solo se
+    pueden marcar como favoritos autos que existen en el grafo.
+    """
+
+    def __init__(self, driver=None):
+        self.driver = driver or get_driver()
+
+    def _leer(self, query: str, **params: Any) -> List[Dict[str, Any]]:
+        with self.driver.session() as session:
+            return session.execute_read(lambda tx: tx.run(query, params).data())
+
+    def _escribir(self, query: str, **params: Any) -> List[Dict[str, Any]]:
+        with self.driver.session() as session:
+            return session.execute_write(lambda tx: tx.run(query, params).data())
+
+    def create_user(self, email: str, password_hash: str) -> bool:
+        rows = self._escribir("""
+            OPTIONAL MATCH (existente:Usuario {nombre: $email})
+            WITH existente
+            WHERE existente IS NULL
+            CREATE (u:Usuario {id: $email, nombre: $email, password: $password,
+                               creado_en: $ahora, perfil: '{}', cambios: 0})
+            RETURN count(u) AS creados
+        """, email=email, password=password_hash, ahora=datetime.now().isoformat())
+        return bool(rows) and rows[0]['creados'] == 1
+
+    def get_user(self, email: str) -> Optional[Dict[str, Any]]:
+        rows = self._leer("""
+            MATCH (u:Usuario {nombre: $email})
+            RETURN u.password AS password, u.creado_en AS created_at
+        """, email=email)
+        return rows[0] if rows else None
+
+    def get_profile(self, email: str) -> Dict[str, Any]:
+        rows = self._leer("MATCH (u:Usuario {nombre: $email}) RETURN u.perfil AS perfil", email=email)
+        return json.loads(rows[0]['perfil']) if rows and rows[0]['perfil'] else {}
+
+    def save_profile(self, email: str, profile: Dict[str, Any]):
+        self._escribir("MATCH (u:Usuario {nombre: $email}) SET u.perfil = $perfil",
+                       email=email, perfil=json.dumps(profile))
+
+    def update_profile(self, email: str, **fields: Any):
+        def update(tx):
+            # El bloqueo de escritura sobre u evita perder cambios concurrentes
+            record = tx.run("""
+                MATCH (u:Usuario {nombre: $email})
+                SET u._bloqueo = true
+                REMOVE u._bloqueo
+                RETURN u.perfil AS perfil
+            """, email=email).single()
+            if record is None:
+                return
+            profile = json.loads(record['perfil']) if record['perfil'] else {}
+            profile.update(fields)
+            tx.run("MATCH (u:Usuario {nombre: $email}) SET u.perfil = $perfil",
+                   email=email, perfil=json.dumps(profile)).consume()
+
+        with self.driver.session() as session:
+            session.execute_write(update)
+
+    def list_favorites(self, email: str) -> List[Dict[str, Any]]:
+        rows = self._leer("""
+            MATCH (:Usuario {nombre: $email})-[f:FAVORITO]->(a:Auto)
+            RETURN f.datos AS datos, a.id AS id
+            ORDER BY f.creado_en, f.orden
+        """, email=email)
+        # Favoritos creados por MotorNeo4j no traen los datos del frontend
+        return [json.loads(row['datos']) if row['datos'] else {'id': row['id']} for row in rows]
+
+    def add_favorites(self, email: str, cars: Iterable[Dict[str, Any]]) -> int:
+        # Un car_id repetido en el lote se agrega una sola vez
+        rows = list({favorite_key(car.get('id')): {'car_id': favorite_key(car.get('id')), 'datos': json.dumps(car)}
+                     for car in cars}.values())
+        if not rows:
+            return 0
+
+        def add(tx):
+            # Un id sin nodo Auto no se enlazaría: se informa en vez de contarlo como repetido
+            existing = tx.run("""
+                UNWIND $ids AS id
+                MATCH (a:Auto {id: id})
+                RETURN collect(a.id) AS existentes
+            """, ids=[row['car_id'] for row in rows]).single()['existentes']
+            missing = [row['car_id'] for row in rows if row['car_id'] not in set(existing)]
+            if missing:
+                raise UnknownCarError(missing)
+            return tx.run("""
+                MATCH (u:Usuario {nombre: $email})
+                UNWIND range(0, size($rows) - 1) AS i
+                MATCH (a:Auto {id: $rows[i].car_id})
+                WHERE NOT EXISTS { (u)-[:FAVORITO]->(a) }
+                CREATE (u)-[:FAVORITO {creado_en: $ahora, orden: i, datos: $rows[i].datos}]->(a)
+                WITH u, count(*) AS agregados
+                SET u.cambios = coalesce(u.cambios, 0) + 1
+                RETURN agregados
+            """, email=email, rows=rows, ahora=datetime.now().isoformat()).data()
+
+        with self.driver.session() as session:
+            result = session.execute_write(add)
+        return result[0]['agregados'] if result else 0
+
+    def remove_favorite(self, email: str, car_id: Any) -> bool:
+        return self._remove_favorites(email, favorite_key(car_id)) > 0
+
+    def clear_favorites(self, email: str) -> int:
+        return self._remove_favorites(email, None)
+
+    def _remove_favorites(self, email: str, car_id: Optional[str]) -> int:
+        rows = self._escribir("""
+            MATCH (u:Usuario {nombre: $email})-[f:FAVORITO]->(a:Auto)
+            WHERE $car_id IS NULL OR a.id = $car_id
+            WITH u, collect(f) AS favoritos
+            FOREACH (f IN favoritos | DELETE f)
+            SET u.cambios = coalesce(u.cambios, 0) + 1
+            RETURN size(favoritos) AS eliminados
+        """, email=email, car_id=car_id)
+        return rows[0]['eliminados'] if rows else 0
+
+    def counts(self) -> Dict[str, int]:
+        rows = self._leer("""
+            RETURN COUNT { (:Usuario) } AS users,
+                   COUNT { (u:Usuario) WHERE u.perfil IS NOT NULL } AS profiles,
+                   COUNT { (:Usuario)-[:FAVORITO]->(:Auto) } AS favorites
+        """)
+        return rows[0]
+
+    def close(self):
+        # Driver compartido: lo cierra el registro al terminar el proceso
+        self.driver = None
+
+# Nombre del backend -> constructor sin argumentos
+USER_STORE_BACKENDS: Dict[str, Callable[[], UserStore]] = {
+    'sqlite': SQLiteUserStore,
+    'neo4j': Neo4jUserStore,
+    'memory': MemoryUserStore,
+}
+
+def register_user_store(name: str, factory: Callable[[], UserStore]):
+    USER_STORE_BACKENDS[name] = factory
+
+def create_user_store(backend: Optional[str] = None) -> UserStore:
+    """Backend indicado (o USER_STORE); ValueError si no está registrado"""
+    backend = (backend or os.environ.get("USER_STORE", "sqlite")).lower()
+    factory = USER_STORE_BACKENDS.get(backend)
+    if factory is None:
+        raise ValueError(f"Backend de usuarios desconocido: {backend!r} "
+                         f"(disponibles: {', '.join(sorted(USER_STORE_BACKENDS))})")
+    store = factory()
+    logger.info(f"👥 Usuarios guardados en backend {backend}")
+    return store
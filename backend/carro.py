@@ -1,10 +1,17 @@
-class Carro:
-    def __init__(self, modelo, marca, tipo, transmision, precio):
-        self.modelo = modelo
-        self.marca = marca
-        self.tipo = tipo
-        self.transmision = transmision
-        self.precio = precio
+import sys
+from pathlib import Path
+
+# Registro compacto compartido con la aplicación (app/car_record.py)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+from car_record import CarRecord
+
+class Carro(CarRecord):
+    """Auto inmutable con __slots__; sin id se identifica por su modelo"""
+    __slots__ = ()
+
+    def __init__(self, modelo, marca, tipo, transmision, precio, id=None):
+        super().__init__(id if id is not None else modelo, modelo=modelo, marca=marca,
+                         tipo=tipo, transmision=transmision, precio=precio)
 
     def __str__(self):
         return f"{self.modelo} {self.marca} {self.tipo} {self.transmision} {self.precio}"
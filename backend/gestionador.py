@@ -3,10 +3,16 @@
 Gestionador mejorado para Neo4j con funcionalidades específicas para el sistema de recomendaciones
 """
 
-from neo4j import GraphDatabase
 import logging
+import sys
+from pathlib import Path
 from typing import List, Dict, Any, Optional
 
+# Esquema del grafo y driver compartidos con la aplicación (app/)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+from graph_driver import DriverConfig, get_driver
+from graph_schema import AUTO_FACETS, facet_fields, has_denormalized_properties, sync_auto_properties
+
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -22,20 +28,28 @@ class Gestionador:
             password: Contraseña de Neo4j
         """
         try:
-            self.driver = GraphDatabase.driver(uri, auth=(user, password))
-            # Verificar conexión
+            # Driver compartido del proceso (pool configurado en app/graph_driver.py)
+            self.driver = get_driver(DriverConfig.from_env(uri=uri, user=user, passwords=[password]))
+            logger.info("Neo4j: Conexión exitosa")
             with self.driver.session() as session:
-                result = session.run("RETURN 'Conexión exitosa' as mensaje")
-                logger.info(f"Neo4j: {result.single()['mensaje']}")
+                # Filtrar sobre propiedades del nodo Auto si la base está desnormalizada
+                self.use_node_properties = self._detect_node_properties(session)
         except Exception as e:
             logger.error(f"Error conectando a Neo4j: {e}")
             raise ConnectionError(f"No se pudo conectar a Neo4j: {e}")
     
+    def _detect_node_properties(self, session) -> bool:
+        try:
+            return has_denormalized_properties(session)
+        except Exception as e:
+            logger.warning(f"No se pudo verificar la desnormalización, se usan relaciones: {e}")
+            return False
+    
     def close(self):
-        """Cerrar conexión a Neo4j"""
+        """Soltar el driver; es compartido y lo cierra el registro al terminar el proceso"""
         if hasattr(self, 'driver') and self.driver:
-            self.driver.close()
-            logger.info("Conexión a Neo4j cerrada")
+            self.driver = None
+            logger.info("Conexión a Neo4j liberada")
     
     def test_connection(self) -> bool:
         """Probar si la conexión a Neo4j está funcionando"""
@@ -155,60 +169,59 @@ class Gestionador:
         """
         Crear un nuevo auto en la base de datos
         
+        El nodo, sus relaciones con marca/tipo/combustible/transmisión y las
+        propiedades desnormalizadas de esas facetas se escriben en una sola
+        transacción, así nunca quedan desalineadas.
+        
         Args:
             car_data: Diccionario con datos del auto (id, modelo, año, precio, etc.)
         """
         try:
             with self.driver.session() as session:
-                # Crear el nodo del auto
-                session.run("""
-                    CREATE (a:Auto {
-                        id: $id,
-                        modelo: $modelo,
-                        año: $año,
-                        precio: $precio
-                    })
-                """, **car_data)
-                
-                # Conectar con marca si existe
-                if 'marca' in car_data:
-                    session.run("""
-                        MATCH (a:Auto {id: $id})
-                        MERGE (m:Marca {nombre: $marca})
-                        MERGE (a)-[:ES_MARCA]->(m)
-                    """, id=car_data['id'], marca=car_data['marca'])
-                
-                # Conectar con tipo si existe
-                if 'tipo' in car_data:
-                    session.run("""
-                        MATCH (a:Auto {id: $id})
-                        MERGE (t:Tipo {categoria: $tipo})
-                        MERGE (a)-[:ES_TIPO]->(t)
-                    """, id=car_data['id'], tipo=car_data['tipo'])
-                
-                # Conectar con combustible si existe
-                if 'combustible' in car_data:
-                    session.run("""
-                        MATCH (a:Auto {id: $id})
-                        MERGE (c:Combustible {tipo: $combustible})
-                        MERGE (a)-[:USA_COMBUSTIBLE]->(c)
-                    """, id=car_data['id'], combustible=car_data['combustible'])
-                
-                # Conectar con transmisión si existe
-                if 'transmision' in car_data:
-                    session.run("""
-                        MATCH (a:Auto {id: $id})
-                        MERGE (tr:Transmision {tipo: $transmision})
-                        MERGE (a)-[:TIENE_TRANSMISION]->(tr)
-                    """, id=car_data['id'], transmision=car_data['transmision'])
-                
-                logger.info(f"Auto creado exitosamente: {car_data.get('id', 'ID desconocido')}")
-                return True
+                session.execute_write(self._create_car_tx, car_data)
+            
+            logger.info(f"Auto creado exitosamente: {car_data.get('id', 'ID desconocido')}")
+            return True
                 
         except Exception as e:
             logger.error(f"Error creando auto: {e}")
             return False
     
+    @staticmethod
+    def _create_car_tx(tx, car_data: Dict[str, Any]):
+        # Crear el nodo del auto
+        tx.run("""
+            CREATE (a:Auto {
+                id: $id,
+                modelo: $modelo,
+                año: $año,
+                precio: $precio
+            })
+        """, **car_data)
+        
+        # Conectar con marca, tipo, combustible y transmisión si existen
+        for facet in AUTO_FACETS:
+            if facet in car_data:
+                Gestionador._link_facet(tx, car_data['id'], facet, car_data[facet])
+        
+        sync_auto_properties(tx, car_data['id'])
+    
+    @staticmethod
+    def _link_facet(tx, car_id: str, facet: str, value: Any):
+        """Reemplazar la relación de una faceta del auto por la del nuevo valor"""
+        relationship, label, key = AUTO_FACETS[facet]
+        tx.run(f"""
+            MATCH (a:Auto {{id: $id}})
+            OPTIONAL MATCH (a)-[old:{relationship}]->()
+            DELETE old
+        """, id=car_id)
+        if value is not None:
+            tx.run(f"""
+                MATCH (a:Auto {{id: $id}})
+                MERGE (f:{label} {{{key}: $value}})
+                MERGE (a)-[:{relationship}]->(f)
+            """, id=car_id, value=value)
+    
     def search_cars(self, filters: Dict[str, Any] = None, limit: int = 10) -> List[Dict[str, Any]]:
         """
         Buscar autos con filtros opcionales
@@ -222,18 +235,25 @@ class Gestionador:
             query_parts = ["MATCH (a:Auto)"]
             where_conditions = []
             parameters = {"limit": limit}
+            use_properties = getattr(self, 'use_node_properties', False)
             
             if filters:
                 # Filtro de marca
                 if filters.get('marca'):
-                    query_parts.append("MATCH (a)-[:ES_MARCA]->(m:Marca)")
-                    where_conditions.append("m.nombre = $marca")
+                    if use_properties:
+                        where_conditions.append("a.marca = $marca")
+                    else:
+                        query_parts.append("MATCH (a)-[:ES_MARCA]->(m:Marca)")
+                        where_conditions.append("m.nombre = $marca")
                     parameters['marca'] = filters['marca']
                 
                 # Filtro de tipo
                 if filters.get('tipo'):
-                    query_parts.append("MATCH (a)-[:ES_TIPO]->(t:Tipo)")
-                    where_conditions.append("t.categoria = $tipo")
+                    if use_properties:
+                        where_conditions.append("a.tipo = $tipo")
+                    else:
+                        query_parts.append("MATCH (a)-[:ES_TIPO]->(t:Tipo)")
+                        where_conditions.append("t.categoria = $tipo")
                     parameters['tipo'] = filters['tipo']
                 
                 # Filtro de precio mínimo
@@ -255,15 +275,17 @@ class Gestionador:
             if where_conditions:
                 query_parts.append("WHERE " + " AND ".join(where_conditions))
             
-            # Completar query
-            query_parts.append("""
-                OPTIONAL MATCH (a)-[:ES_MARCA]->(m:Marca)
-                OPTIONAL MATCH (a)-[:ES_TIPO]->(t:Tipo)
-                OPTIONAL MATCH (a)-[:USA_COMBUSTIBLE]->(c:Combustible)
-                OPTIONAL MATCH (a)-[:TIENE_TRANSMISION]->(tr:Transmision)
+            # Completar query (sin expandir relaciones si la base está desnormalizada)
+            if use_properties:
+                fields = facet_fields(True)
+            else:
+                fields = facet_fields(False, optional=True)
+                query_parts.append("WITH a")
+                query_parts.extend(fields['match'].split("\n")[1:])
+            query_parts.append(f"""
                 RETURN a.id as id, a.modelo as modelo, a.año as año, a.precio as precio,
-                       m.nombre as marca, t.categoria as tipo, 
-                       c.tipo as combustible, tr.tipo as transmision
+                       {fields['marca']} as marca, {fields['tipo']} as tipo, 
+                       {fields['combustible']} as combustible, {fields['transmision']} as transmision
                 ORDER BY a.precio ASC
                 LIMIT $limit
             """)
@@ -316,32 +338,47 @@ class Gestionador:
             return False
     
     def update_car(self, car_id: str, updates: Dict[str, Any]) -> bool:
-        """Actualizar un auto existente"""
+        """
+        Actualizar un auto existente
+        
+        Las facetas (marca, tipo, combustible, transmisión) cambian la relación
+        correspondiente y la propiedad desnormalizada en la misma transacción.
+        """
         try:
             with self.driver.session() as session:
-                # Construir query de actualización dinámicamente
-                set_clauses = []
-                parameters = {"car_id": car_id}
-                
-                for key, value in updates.items():
-                    if key not in ['marca', 'tipo', 'combustible', 'transmision']:  # Estas requieren manejo especial
-                        set_clauses.append(f"a.{key} = ${key}")
-                        parameters[key] = value
-                
-                if set_clauses:
-                    query = f"""
-                        MATCH (a:Auto {{id: $car_id}})
-                        SET {', '.join(set_clauses)}
-                        RETURN a
-                    """
-                    session.run(query, parameters)
-                
-                logger.info(f"Auto actualizado: {car_id}")
-                return True
+                session.execute_write(self._update_car_tx, car_id, updates)
+            
+            logger.info(f"Auto actualizado: {car_id}")
+            return True
                 
         except Exception as e:
             logger.error(f"Error actualizando auto: {e}")
             return False
+    
+    @staticmethod
+    def _update_car_tx(tx, car_id: str, updates: Dict[str, Any]):
+        # Construir query de actualización dinámicamente
+        set_clauses = []
+        parameters = {"car_id": car_id}
+        
+        for key, value in updates.items():
+            if key not in AUTO_FACETS:  # Las facetas requieren manejo especial
+                set_clauses.append(f"a.{key} = ${key}")
+                parameters[key] = value
+        
+        if set_clauses:
+            query = f"""
+                MATCH (a:Auto {{id: $car_id}})
+                SET {', '.join(set_clauses)}
+                RETURN a
+            """
+            tx.run(query, parameters).consume()
+        
+        facet_updates = [facet for facet in AUTO_FACETS if facet in updates]
+        for facet in facet_updates:
+            Gestionador._link_facet(tx, car_id, facet, updates[facet])
+        if facet_updates:
+            sync_auto_properties(tx, car_id)
 
 def main():
     """Función principal para probar el gestionador"""
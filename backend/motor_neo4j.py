@@ -0,0 +1,480 @@
+#!/usr/bin/env python3
+"""
+Implementación de MotorDeRecomendaciones sobre el grafo de Neo4j
+Cada usuario es un nodo Usuario {nombre} conectado a los autos con FAVORITO y
+RECOMENDADO, y a los nodos de faceta (Marca, Tipo, Combustible, Transmision)
+con PREFIERE. Las recomendaciones generadas se guardan en el grafo junto con
+la versión de los datos del usuario que las produjo: mientras el usuario no
+cambie favoritos, preferencias ni presupuesto, obtener_o_generar_recomendaciones
+las lee en vez de recalcularlas.
+
+Los autos se pueden indicar por id o por modelo. Los errores de Neo4j se
+propagan al llamador.
+"""
+
+import hashlib
+import logging
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Esquema del grafo y driver compartidos con la aplicación (app/)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+from bulk_loader import load_cars
+from car_record import CarRecord
+from graph_driver import DriverConfig, get_driver
+from graph_schema import AUTO_FACETS
+
+from carro import Carro
+from motor_de_recomendaciones import MotorDeRecomendaciones
+from usuario import Usuario
+
+logger = logging.getLogger(__name__)
+
+# Pesos del puntaje de cada candidato
+PESO_MARCA_PREFERIDA = 3.0
+PESO_MARCA_FAVORITA = 1.5
+PESO_MARCA_SIMILAR = 2.0
+PESO_TIPO = 2.0
+PESO_COMBUSTIBLE = 1.0
+PESO_TRANSMISION = 1.0
+
+# Campos de un auto `a`, leyendo cada faceta de su relación
+CAR_FIELDS = ",\n           ".join(
+    ["a.id AS id", "a.modelo AS modelo", "a.año AS año", "a.precio AS precio"] + [
+        f"head([(a)-[:{rel}]->(f:{label}) | f.{key}]) AS {prop}"
+        for prop, (rel, label, key) in AUTO_FACETS.items()
+    ]
+)
+
+# Un auto por referencia: primero por id, si no por modelo (ambos indexados)
+RESOLVE_AUTO = """
+    CALL {
+        WITH ref
+        OPTIONAL MATCH (por_id:Auto {id: ref})
+        OPTIONAL MATCH (por_modelo:Auto {modelo: ref})
+        RETURN coalesce(por_id, por_modelo) AS a
+        LIMIT 1
+    }
+"""
+
+# Toda escritura que cambia lo que se recomendaría incrementa u.cambios
+BUMP_CAMBIOS = "SET u.cambios = coalesce(u.cambios, 0) + 1"
+
+CREATE_USERS_QUERY = """
+    UNWIND $usuarios AS fila
+    OPTIONAL MATCH (existente:Usuario {nombre: fila.nombre})
+    WITH fila, existente
+    WHERE existente IS NULL
+    CREATE (u:Usuario {
+        id: fila.nombre,
+        nombre: fila.nombre,
+        password: fila.password,
+        presupuesto: fila.presupuesto,
+        creado_en: $ahora,
+        cambios: 0
+    })
+    RETURN count(u) AS creados
+"""
+
+ADD_FAVORITES_QUERY = f"""
+    MATCH (u:Usuario {{nombre: $nombre}})
+    UNWIND $referencias AS ref
+    {RESOLVE_AUTO}
+    WITH u, a
+    WHERE a IS NOT NULL AND NOT EXISTS {{ (u)-[:FAVORITO]->(a) }}
+    MERGE (u)-[f:FAVORITO]->(a)
+    ON CREATE SET f.creado_en = $ahora
+    WITH u, count(DISTINCT a) AS agregados
+    {BUMP_CAMBIOS}
+    RETURN agregados
+"""
+
+REMOVE_FAVORITE_QUERY = f"""
+    MATCH (u:Usuario {{nombre: $nombre}})-[f:FAVORITO]->(a:Auto)
+    WHERE a.id = $ref OR a.modelo = $ref
+    WITH u, collect(f) AS favoritos
+    FOREACH (f IN favoritos | DELETE f)
+    {BUMP_CAMBIOS}
+    RETURN size(favoritos) AS eliminados
+"""
+
+FAVORITES_QUERY = f"""
+    MATCH (:Usuario {{nombre: $nombre}})-[f:FAVORITO]->(a:Auto)
+    RETURN {CAR_FIELDS}
+    ORDER BY f.creado_en
+"""
+
+# Preferencias y favoritos del usuario, más las marcas similares a las preferidas
+CONTEXT_QUERY = """
+    MATCH (u:Usuario {nombre: $nombre})
+    RETURN u.presupuesto AS presupuesto,
+           coalesce(u.cambios, 0) AS cambios,
+           %s,
+           [(u)-[:FAVORITO]->(a:Auto) | a.id] AS favoritos,
+           [(u)-[:FAVORITO]->(:Auto)-[:ES_MARCA]->(m:Marca) | m.nombre] AS marcas_favoritas,
+           [(u)-[:PREFIERE]->(:Marca)-[s:SIMILAR_A]->(m:Marca) | {marca: m.nombre, peso: s.peso}] AS similares
+""" % ",\n           ".join(
+    f"[(u)-[:PREFIERE]->(f:{label}) | f.{key}] AS {prop}"
+    for prop, (rel, label, key) in AUTO_FACETS.items()
+)
+
+CANDIDATES_QUERY = f"""
+    MATCH (a:Auto)
+    WHERE ($presupuesto IS NULL OR a.precio <= $presupuesto)
+      AND NOT a.id IN $excluir
+    WITH a, {", ".join(
+        f"head([(a)-[:{rel}]->(f:{label}) | f.{key}]) AS {prop}"
+        for prop, (rel, label, key) in AUTO_FACETS.items()
+    )}
+    WHERE {" OR ".join(f"{prop} IN $valores.{prop}" for prop in AUTO_FACETS)}
+    RETURN a.id AS id, a.modelo AS modelo, a.año AS año, a.precio AS precio,
+           {", ".join(AUTO_FACETS)}
+"""
+
+STORE_RECOMMENDATIONS_QUERY = f"""
+    MATCH (u:Usuario {{nombre: $nombre}})
+    OPTIONAL MATCH (u)-[previa:RECOMENDADO]->()
+    WITH u, coalesce(max(previa.posicion), -1) + 1 AS inicio
+    UNWIND range(0, size($filas) - 1) AS i
+    WITH u, inicio, i, $filas[i].ref AS ref, $filas[i].puntaje AS puntaje
+    {RESOLVE_AUTO}
+    WITH u, inicio, i, puntaje, a
+    WHERE a IS NOT NULL
+    MERGE (u)-[r:RECOMENDADO]->(a)
+    SET r.posicion = inicio + i,
+        r.puntaje = puntaje,
+        r.generado_en = $ahora
+    WITH u, count(r) AS guardadas
+    SET u.recomendaciones_version = coalesce($version, u.recomendaciones_version)
+    RETURN guardadas
+"""
+
+STORED_RECOMMENDATIONS_QUERY = f"""
+    MATCH (:Usuario {{nombre: $nombre}})-[r:RECOMENDADO]->(a:Auto)
+    RETURN {CAR_FIELDS},
+           r.puntaje AS puntaje
+    ORDER BY r.posicion
+"""
+
+def hash_password(password: str) -> str:
+    """Mismo hash que guarda la aplicación web, así ambos comparten usuarios"""
+    return hashlib.sha256(password.encode()).hexdigest()
+
+def carro_a_dict(carro: Any) -> Dict[str, Any]:
+    """Carro (o diccionario) con la forma que espera bulk_loader; sin id se usa el modelo"""
+    datos = carro.as_dict() if isinstance(carro, CarRecord) else dict(carro)
+    if datos.get('id') is None:
+        datos['id'] = datos.get('modelo')
+    return datos
+
+def faceta(tipo_preferencia: str) -> Tuple[str, str, str, str]:
+    """(propiedad, relación, etiqueta, clave) de un tipo de preferencia; ValueError si no existe"""
+    prop = tipo_preferencia.strip().lower()
+    if prop not in AUTO_FACETS:
+        raise ValueError(f"Tipo de preferencia desconocido: {tipo_preferencia!r} "
+                         f"(válidos: {', '.join(AUTO_FACETS)})")
+    return (prop,) + AUTO_FACETS[prop]
+
+class MotorNeo4j(MotorDeRecomendaciones):
+    def __init__(self, uri: Optional[str] = None, user: Optional[str] = None,
+                 password: Optional[str] = None):
+        """Usa el driver compartido del proceso (app/graph_driver.py)"""
+        self.driver = get_driver(DriverConfig.from_env(
+            uri=uri, user=user, passwords=[password] if password else None
+        ))
+
+    def close(self):
+        """Soltar el driver; es compartido y lo cierra el registro al terminar el proceso"""
+        self.driver = None
+
+    def _leer(self, query: str, **params: Any) -> List[Dict[str, Any]]:
+        with self.driver.session() as session:
+            return session.execute_read(lambda tx: tx.run(query, params).data())
+
+    def _escribir(self, query: str, **params: Any) -> List[Dict[str, Any]]:
+        with self.driver.session() as session:
+            return session.execute_write(lambda tx: tx.run(query, params).data())
+
+    @staticmethod
+    def _valor(filas: List[Dict[str, Any]], campo: str, defecto: Any = 0) -> Any:
+        return filas[0][campo] if filas else defecto
+
+    # ===== USUARIOS =====
+
+    def crear_usuario(self, usuario: Usuario) -> bool:
+        """Crear el nodo Usuario (y sus favoritos); False si el nombre ya existe"""
+        creado = self.crear_usuarios([usuario]) == 1
+        if creado and usuario.carros_favoritos:
+            self.agregar_carros_favoritos(usuario.nombre, [c.modelo for c in usuario.carros_favoritos])
+        return creado
+
+    def crear_usuarios(self, usuarios: Iterable[Usuario]) -> int:
+        """Crear varios usuarios en una transacción; devuelve cuántos eran nuevos"""
+        # Un nombre repetido en el lote se crea una sola vez
+        filas = list({usuario.nombre: {
+            'nombre': usuario.nombre,
+            'password': hash_password(usuario.password),
+            'presupuesto': usuario.presupuesto,
+        } for usuario in usuarios}.values())
+        if not filas:
+            return 0
+        filas = self._escribir(CREATE_USERS_QUERY, usuarios=filas, ahora=datetime.now().isoformat())
+        return self._valor(filas, 'creados')
+
+    def iniciar_sesion(self, nombre: str, password: str) -> bool:
+        filas = self._leer("MATCH (u:Usuario {nombre: $nombre}) RETURN u.password AS password",
+                           nombre=nombre)
+        return bool(filas) and filas[0]['password'] == hash_password(password)
+
+    def obtener_nombre_usuario(self, nombre: str) -> Optional[str]:
+        filas = self._leer("MATCH (u:Usuario {nombre: $nombre}) RETURN u.nombre AS nombre", nombre=nombre)
+        return self._valor(filas, 'nombre', None)
+
+    def eliminar_usuario(self, nombre: str) -> bool:
+        filas = self._escribir("""
+            MATCH (u:Usuario {nombre: $nombre})
+            DETACH DELETE u
+            RETURN count(*) AS eliminados
+        """, nombre=nombre)
+        return self._valor(filas, 'eliminados') > 0
+
+    def actualizar_contrasena(self, nombre: str, nueva_password: str) -> bool:
+        filas = self._escribir("""
+            MATCH (u:Usuario {nombre: $nombre})
+            SET u.password = $password
+            RETURN count(u) AS actualizados
+        """, nombre=nombre, password=hash_password(nueva_password))
+        return self._valor(filas, 'actualizados') > 0
+
+    def cambiar_presupuesto(self, nombre: str, nuevo_presupuesto: float) -> bool:
+        filas = self._escribir(f"""
+            MATCH (u:Usuario {{nombre: $nombre}})
+            SET u.presupuesto = $presupuesto
+            {BUMP_CAMBIOS}
+            RETURN count(u) AS actualizados
+        """, nombre=nombre, presupuesto=nuevo_presupuesto)
+        return self._valor(filas, 'actualizados') > 0
+
+    # ===== AUTOS =====
+
+    def crear_carro(self, carro: Carro) -> bool:
+        return self.crear_carros([carro]) == 1
+
+    def crear_carros(self, carros: Iterable[Carro], batch_size: int = 500) -> int:
+        """Cargar autos con sus facetas por lotes UNWIND (bulk_loader)"""
+        stats = load_cars(self.driver, (carro_a_dict(carro) for carro in carros), batch_size)
+        return stats['rows']
+
+    def filtrar_carros_por_preferencias(self, nombre: str, limite: int = 50) -> List[Dict[str, Any]]:
+        """
+        Autos que cumplen todas las facetas con preferencias (cualquiera de los
+        valores preferidos dentro de una misma faceta). Sin preferencias, vacío.
+        """
+        preferidos = ",\n                   ".join(
+            f"[p IN preferidos WHERE p:{label}] AS pref_{prop}"
+            for prop, (rel, label, key) in AUTO_FACETS.items()
+        )
+        condiciones = "\n              AND ".join(
+            f"(size(pref_{prop}) = 0 OR EXISTS {{ (a)-[:{rel}]->(f) WHERE f IN pref_{prop} }})"
+            for prop, (rel, label, key) in AUTO_FACETS.items()
+        )
+        return self._leer(f"""
+            MATCH (u:Usuario {{nombre: $nombre}})-[:PREFIERE]->(p)
+            WITH collect(p) AS preferidos
+            WHERE size(preferidos) > 0
+            WITH {preferidos}
+            MATCH (a:Auto)
+            WHERE {condiciones}
+            RETURN {CAR_FIELDS}
+            ORDER BY a.precio ASC
+            LIMIT $limite
+        """, nombre=nombre, limite=limite)
+
+    def filtrar_carros_por_presupuesto(self, nombre: str, limite: int = 50) -> List[Dict[str, Any]]:
+        return self._leer(f"""
+            MATCH (u:Usuario {{nombre: $nombre}})
+            MATCH (a:Auto)
+            WHERE a.precio <= u.presupuesto
+            RETURN {CAR_FIELDS}
+            ORDER BY a.precio ASC
+            LIMIT $limite
+        """, nombre=nombre, limite=limite)
+
+    # ===== FAVORITOS =====
+
+    def agregar_carro_favorito(self, nombre: str, modelo: str) -> bool:
+        return self.agregar_carros_favoritos(nombre, [modelo]) == 1
+
+    def agregar_carros_favoritos(self, nombre: str, modelos: Iterable[str]) -> int:
+        """Agregar varios favoritos (ids o modelos) en una transacción; devuelve cuántos eran nuevos"""
+        referencias = list(dict.fromkeys(modelos))
+        if not referencias:
+            return 0
+        filas = self._escribir(ADD_FAVORITES_QUERY, nombre=nombre, referencias=referencias,
+                               ahora=datetime.now().isoformat())
+        return self._valor(filas, 'agregados')
+
+    def eliminar_carro_favorito(self, nombre: str, modelo: str) -> bool:
+        filas = self._escribir(REMOVE_FAVORITE_QUERY, nombre=nombre, ref=modelo)
+        return self._valor(filas, 'eliminados') > 0
+
+    def obtener_carros_favoritos(self, nombre: str) -> List[Dict[str, Any]]:
+        return self._leer(FAVORITES_QUERY, nombre=nombre)
+
+    # ===== PREFERENCIAS =====
+
+    def agregar_preferencia(self, nombre: str, tipo_preferencia: str, valor_preferencia: str) -> bool:
+        """Conectar al usuario con el nodo de faceta (sin distinguir mayúsculas); False si no existe"""
+        prop, rel, label, key = faceta(tipo_preferencia)
+        filas = self._escribir(f"""
+            MATCH (u:Usuario {{nombre: $nombre}})
+            MATCH (f:{label})
+            WHERE toLower(f.{key}) = toLower($valor)
+            MERGE (u)-[:PREFIERE]->(f)
+            WITH DISTINCT u
+            {BUMP_CAMBIOS}
+            RETURN count(u) AS agregadas
+        """, nombre=nombre, valor=valor_preferencia)
+        return self._valor(filas, 'agregadas') > 0
+
+    def eliminar_preferencia(self, nombre: str, tipo_preferencia: str, valor_preferencia: str) -> bool:
+        prop, rel, label, key = faceta(tipo_preferencia)
+        filas = self._escribir(f"""
+            MATCH (u:Usuario {{nombre: $nombre}})-[p:PREFIERE]->(f:{label})
+            WHERE toLower(f.{key}) = toLower($valor)
+            WITH u, collect(p) AS preferencias
+            FOREACH (p IN preferencias | DELETE p)
+            {BUMP_CAMBIOS}
+            RETURN size(preferencias) AS eliminadas
+        """, nombre=nombre, valor=valor_preferencia)
+        return self._valor(filas, 'eliminadas') > 0
+
+    def obtener_preferencias(self, nombre: str, tipo_preferencia: str) -> List[str]:
+        prop, rel, label, key = faceta(tipo_preferencia)
+        filas = self._leer(f"""
+            MATCH (:Usuario {{nombre: $nombre}})-[:PREFIERE]->(f:{label})
+            RETURN f.{key} AS valor
+            ORDER BY valor
+        """, nombre=nombre)
+        return [fila['valor'] for fila in filas]
+
+    # ===== RECOMENDACIONES =====
+
+    @staticmethod
+    def _puntuar(auto: Dict[str, Any], contexto: Dict[str, Any],
+                 similares: Dict[str, float]) -> float:
+        puntaje = 0.0
+        marca = auto.get('marca')
+        if marca in contexto['marca']:
+            puntaje += PESO_MARCA_PREFERIDA
+        elif marca in similares:
+            puntaje += PESO_MARCA_SIMILAR * similares[marca]
+        if marca in contexto['marcas_favoritas']:
+            puntaje += PESO_MARCA_FAVORITA
+        if auto.get('tipo') in contexto['tipo']:
+            puntaje += PESO_TIPO
+        if auto.get('combustible') in contexto['combustible']:
+            puntaje += PESO_COMBUSTIBLE
+        if auto.get('transmision') in contexto['transmision']:
+            puntaje += PESO_TRANSMISION
+        return round(puntaje, 3)
+
+    def generar_recomendaciones(self, nombre: str, limite: int = 10) -> List[Dict[str, Any]]:
+        """
+        Calcular recomendaciones por preferencias, marcas similares y marcas de
+        los favoritos dentro del presupuesto, y guardarlas (reemplazando las
+        anteriores) en una sola transacción
+        """
+        filas = self._leer(CONTEXT_QUERY, nombre=nombre)
+        if not filas:
+            return []
+        contexto = filas[0]
+
+        similares: Dict[str, float] = {}
+        for similar in contexto['similares']:
+            peso = similar['peso'] if similar['peso'] is not None else 0.5
+            similares[similar['marca']] = max(similares.get(similar['marca'], 0.0), peso)
+
+        valores = {prop: list(contexto[prop]) for prop in AUTO_FACETS}
+        valores['marca'] = list(set(valores['marca']) | set(contexto['marcas_favoritas']) | set(similares))
+
+        candidatos = self._leer(CANDIDATES_QUERY, presupuesto=contexto['presupuesto'],
+                                excluir=contexto['favoritos'], valores=valores)
+        for auto in candidatos:
+            auto['puntaje'] = self._puntuar(auto, contexto, similares)
+        candidatos.sort(key=lambda auto: (-auto['puntaje'], auto.get('precio') is None, auto.get('precio') or 0))
+        recomendaciones = candidatos[:limite]
+
+        self.guardar_recomendaciones(nombre, recomendaciones, reemplazar=True, version=contexto['cambios'])
+        logger.info(f"🎯 {len(recomendaciones)} recomendaciones generadas para {nombre} "
+                    f"({len(candidatos)} candidatos)")
+        return recomendaciones
+
+    def agregar_recomendacion(self, nombre: str, modelo: str) -> bool:
+        return self.guardar_recomendaciones(nombre, [modelo]) == 1
+
+    def guardar_recomendaciones(self, nombre: str, recomendaciones: Iterable[Any],
+                                reemplazar: bool = False, version: Optional[int] = None) -> int:
+        """
+        Guardar un lote de recomendaciones (ids, modelos o diccionarios con
+        'id' y 'puntaje') en una transacción, a continuación de las existentes
+        o reemplazándolas. Con version, quedan vigentes hasta el próximo cambio
+        del usuario.
+        """
+        filas = []
+        for recomendacion in recomendaciones:
+            if isinstance(recomendacion, dict):
+                filas.append({'ref': recomendacion.get('id') or recomendacion.get('modelo'),
+                              'puntaje': recomendacion.get('puntaje')})
+            else:
+                filas.append({'ref': recomendacion, 'puntaje': None})
+
+        def guardar(tx) -> int:
+            if reemplazar:
+                tx.run("""
+                    MATCH (u:Usuario {nombre: $nombre})
+                    OPTIONAL MATCH (u)-[r:RECOMENDADO]->()
+                    DELETE r
+                    SET u.recomendaciones_version = $version
+                """, nombre=nombre, version=version).consume()
+            if not filas:
+                return 0
+            record = tx.run(STORE_RECOMMENDATIONS_QUERY, nombre=nombre, filas=filas, version=version,
+                            ahora=datetime.now().isoformat()).single()
+            return record['guardadas'] if record else 0
+
+        with self.driver.session() as session:
+            return session.execute_write(guardar)
+
+    def obtener_recomendaciones_guardadas(self, nombre: str) -> List[Dict[str, Any]]:
+        return self._leer(STORED_RECOMMENDATIONS_QUERY, nombre=nombre)
+
+    def recomendaciones_vigentes(self, nombre: str) -> bool:
+        """True si las recomendaciones guardadas corresponden a los datos actuales del usuario"""
+        filas = self._leer("""
+            MATCH (u:Usuario {nombre: $nombre})
+            RETURN u.recomendaciones_version IS NOT NULL
+                   AND u.recomendaciones_version = coalesce(u.cambios, 0) AS vigentes
+        """, nombre=nombre)
+        return bool(self._valor(filas, 'vigentes', False))
+
+    def obtener_o_generar_recomendaciones(self, nombre: str, limite: int = 10) -> List[Dict[str, Any]]:
+        """Leer las recomendaciones guardadas si siguen vigentes; si no, generarlas y guardarlas"""
+        if self.recomendaciones_vigentes(nombre):
+            guardadas = self.obtener_recomendaciones_guardadas(nombre)
+            if guardadas:
+                return guardadas[:limite]
+        return self.generar_recomendaciones(nombre, limite)
+
+    def limpiar_recomendaciones_de_usuario(self, nombre: str) -> int:
+        filas = self._escribir("""
+            MATCH (u:Usuario {nombre: $nombre})
+            OPTIONAL MATCH (u)-[r:RECOMENDADO]->()
+            WITH u, collect(r) AS recomendaciones
+            FOREACH (r IN recomendaciones | DELETE r)
+            REMOVE u.recomendaciones_version
+            RETURN size(recomendaciones) AS eliminadas
+        """, nombre=nombre)
+        return self._valor(filas, 'eliminadas')
@@ -6,6 +6,16 @@ Incluye información contextual, similitudes entre marcas, perfiles demográfico
 
 from neo4j import GraphDatabase
 import logging
+import sys
+from pathlib import Path
+
+# Módulos compartidos con la aplicación (app/)
+sys.path.insert(0, str(Path(__file__).parent / "app"))
+from graph_schema import apply_schema, setup_denormalized_properties
+from bulk_loader import load_cars
+from catalog_generator import (BRAND_DATA, BRAND_SIMILARITIES, DEMOGRAPHIC_PROFILES,
+                               comprehensive_cars, generate_features,
+                               select_fuel_by_probability, similarity_weight)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -20,118 +30,11 @@ class EnhancedDatabaseSetup:
         self.driver = None
         self.connect()
         
-        # Datos expandidos para recomendaciones inteligentes
-        self.brand_data = {
-            # Marcas japonesas - Confiabilidad, eficiencia
-            "Toyota": {"origen": "Japón", "caracteristicas": ["Confiable", "Eficiente", "Familiar"], "target_age": "25-55", "price_range": "medio", "reliability": 9},
-            "Honda": {"origen": "Japón", "caracteristicas": ["Confiable", "Deportivo", "Eficiente"], "target_age": "20-50", "price_range": "medio", "reliability": 9},
-            "Nissan": {"origen": "Japón", "caracteristicas": ["Innovador", "Confiable", "Tecnológico"], "target_age": "25-50", "price_range": "medio", "reliability": 8},
-            "Mazda": {"origen": "Japón", "caracteristicas": ["Deportivo", "Elegante", "Eficiente"], "target_age": "22-45", "price_range": "medio", "reliability": 8},
-            "Subaru": {"origen": "Japón", "caracteristicas": ["Aventurero", "Seguro", "AWD"], "target_age": "25-50", "price_range": "medio-alto", "reliability": 8},
-            "Mitsubishi": {"origen": "Japón", "caracteristicas": ["Aventurero", "Robusto", "Accesible"], "target_age": "22-45", "price_range": "medio-bajo", "reliability": 7},
-            "Lexus": {"origen": "Japón", "caracteristicas": ["Lujo", "Confiable", "Refinado"], "target_age": "35-65", "price_range": "alto", "reliability": 9},
-            
-            # Marcas alemanas - Ingeniería, performance, lujo
-            "BMW": {"origen": "Alemania", "caracteristicas": ["Deportivo", "Lujo", "Performance"], "target_age": "25-55", "price_range": "alto", "reliability": 7},
-            "Mercedes-Benz": {"origen": "Alemania", "caracteristicas": ["Lujo", "Elegante", "Tecnológico"], "target_age": "30-65", "price_range": "alto", "reliability": 7},
-            "Audi": {"origen": "Alemania", "caracteristicas": ["Deportivo", "Tecnológico", "Lujo"], "target_age": "25-55", "price_range": "alto", "reliability": 7},
-            "Volkswagen": {"origen": "Alemania", "caracteristicas": ["Familiar", "Confiable", "Europeo"], "target_age": "25-55", "price_range": "medio", "reliability": 7},
-            "Porsche": {"origen": "Alemania", "caracteristicas": ["Deportivo", "Lujo", "Performance"], "target_age": "30-60", "price_range": "muy-alto", "reliability": 8},
-            
-            # Marcas americanas - Potencia, espacio, tradición
-            "Ford": {"origen": "Estados Unidos", "caracteristicas": ["Potente", "Robusto", "Americano"], "target_age": "25-65", "price_range": "medio", "reliability": 6},
-            "Chevrolet": {"origen": "Estados Unidos", "caracteristicas": ["Potente", "Deportivo", "Americano"], "target_age": "20-60", "price_range": "medio", "reliability": 6},
-            "Tesla": {"origen": "Estados Unidos", "caracteristicas": ["Innovador", "Ecológico", "Tecnológico"], "target_age": "25-50", "price_range": "alto", "reliability": 7},
-            "Jeep": {"origen": "Estados Unidos", "caracteristicas": ["Aventurero", "Robusto", "Off-road"], "target_age": "25-55", "price_range": "medio-alto", "reliability": 6},
-            
-            # Marcas coreanas - Valor, garantía, modernas
-            "Hyundai": {"origen": "Corea del Sur", "caracteristicas": ["Accesible", "Moderno", "Garantía"], "target_age": "20-50", "price_range": "medio-bajo", "reliability": 8},
-            "Kia": {"origen": "Corea del Sur", "caracteristicas": ["Accesible", "Estiloso", "Garantía"], "target_age": "18-45", "price_range": "medio-bajo", "reliability": 8},
-            "Genesis": {"origen": "Corea del Sur", "caracteristicas": ["Lujo", "Moderno", "Valor"], "target_age": "30-60", "price_range": "alto", "reliability": 8},
-            
-            # Marcas europeas - Elegancia, diseño
-            "Volvo": {"origen": "Suecia", "caracteristicas": ["Seguro", "Familiar", "Elegante"], "target_age": "30-60", "price_range": "alto", "reliability": 8},
-            "Peugeot": {"origen": "Francia", "caracteristicas": ["Elegante", "Europeo", "Eficiente"], "target_age": "25-55", "price_range": "medio", "reliability": 7},
-            "Renault": {"origen": "Francia", "caracteristicas": ["Compacto", "Urbano", "Europeo"], "target_age": "20-50", "price_range": "medio-bajo", "reliability": 6},
-        }
-        
-        # Perfiles demográficos detallados
-        self.demographic_profiles = {
-            "hombre_18_25": {
-                "preferencias": ["Deportivo", "Performance", "Estiloso", "Accesible"],
-                "tipos_vehiculo": ["Coupé", "Hatchback", "Sedán"],
-                "marcas_recomendadas": ["Honda", "Mazda", "Hyundai", "Kia", "Chevrolet"],
-                "caracteristicas_importantes": ["Potencia", "Diseño", "Precio"]
-            },
-            "hombre_26_35": {
-                "preferencias": ["Versátil", "Confiable", "Tecnológico", "Deportivo"],
-                "tipos_vehiculo": ["Sedán", "SUV", "Crossover"],
-                "marcas_recomendadas": ["Toyota", "Honda", "BMW", "Audi", "Tesla"],
-                "caracteristicas_importantes": ["Confiabilidad", "Tecnología", "Performance"]
-            },
-            "hombre_36_50": {
-                "preferencias": ["Familiar", "Confiable", "Espacioso", "Lujo"],
-                "tipos_vehiculo": ["SUV", "Sedán", "Pickup"],
-                "marcas_recomendadas": ["Toyota", "Honda", "BMW", "Mercedes-Benz", "Volvo"],
-                "caracteristicas_importantes": ["Espacio", "Seguridad", "Confort"]
-            },
-            "hombre_51_plus": {
-                "preferencias": ["Lujo", "Confort", "Confiable", "Prestigio"],
-                "tipos_vehiculo": ["Sedán", "SUV"],
-                "marcas_recomendadas": ["Mercedes-Benz", "BMW", "Lexus", "Volvo", "Genesis"],
-                "caracteristicas_importantes": ["Lujo", "Confort", "Prestigio"]
-            },
-            "mujer_18_25": {
-                "preferencias": ["Estiloso", "Compacto", "Eficiente", "Accesible"],
-                "tipos_vehiculo": ["Hatchback", "Sedán", "Crossover"],
-                "marcas_recomendadas": ["Honda", "Toyota", "Mazda", "Hyundai", "Kia"],
-                "caracteristicas_importantes": ["Diseño", "Eficiencia", "Facilidad de manejo"]
-            },
-            "mujer_26_35": {
-                "preferencias": ["Seguro", "Confiable", "Familiar", "Eficiente"],
-                "tipos_vehiculo": ["SUV", "Crossover", "Sedán"],
-                "marcas_recomendadas": ["Toyota", "Honda", "Subaru", "Volvo", "Mazda"],
-                "caracteristicas_importantes": ["Seguridad", "Confiabilidad", "Espacio"]
-            },
-            "mujer_36_50": {
-                "preferencias": ["Familiar", "Seguro", "Espacioso", "Confiable"],
-                "tipos_vehiculo": ["SUV", "Minivan", "Crossover"],
-                "marcas_recomendadas": ["Toyota", "Honda", "Subaru", "Volvo", "Lexus"],
-                "caracteristicas_importantes": ["Seguridad", "Espacio familiar", "Confiabilidad"]
-            },
-            "mujer_51_plus": {
-                "preferencias": ["Confort", "Lujo", "Fácil manejo", "Confiable"],
-                "tipos_vehiculo": ["Sedán", "SUV"],
-                "marcas_recomendadas": ["Lexus", "Mercedes-Benz", "Volvo", "BMW", "Genesis"],
-                "caracteristicas_importantes": ["Confort", "Facilidad de uso", "Lujo"]
-            }
-        }
-        
-        # Similitudes entre marcas para recomendaciones
-        self.brand_similarities = {
-            "Toyota": ["Honda", "Nissan", "Mazda", "Subaru", "Lexus"],
-            "Honda": ["Toyota", "Mazda", "Nissan", "Subaru", "Hyundai"],
-            "BMW": ["Audi", "Mercedes-Benz", "Lexus", "Genesis", "Volvo"],
-            "Mercedes-Benz": ["BMW", "Audi", "Lexus", "Genesis", "Volvo"],
-            "Audi": ["BMW", "Mercedes-Benz", "Lexus", "Volvo", "Genesis"],
-            "Tesla": ["BMW", "Audi", "Mercedes-Benz", "Genesis", "Volvo"],
-            "Ford": ["Chevrolet", "Jeep", "Toyota", "Honda", "Nissan"],
-            "Chevrolet": ["Ford", "Jeep", "Hyundai", "Kia", "Nissan"],
-            "Hyundai": ["Kia", "Honda", "Toyota", "Nissan", "Chevrolet"],
-            "Kia": ["Hyundai", "Honda", "Mazda", "Toyota", "Nissan"],
-            "Nissan": ["Toyota", "Honda", "Mazda", "Hyundai", "Subaru"],
-            "Mazda": ["Honda", "Toyota", "Nissan", "Subaru", "Kia"],
-            "Subaru": ["Toyota", "Honda", "Mazda", "Volvo", "Nissan"],
-            "Volvo": ["BMW", "Mercedes-Benz", "Audi", "Subaru", "Lexus"],
-            "Lexus": ["Mercedes-Benz", "BMW", "Audi", "Genesis", "Volvo"],
-            "Genesis": ["BMW", "Mercedes-Benz", "Audi", "Lexus", "Volvo"],
-            "Porsche": ["BMW", "Audi", "Mercedes-Benz", "Lexus", "Tesla"],
-            "Jeep": ["Ford", "Chevrolet", "Subaru", "Toyota", "Nissan"],
-            "Mitsubishi": ["Nissan", "Subaru", "Honda", "Hyundai", "Kia"],
-            "Peugeot": ["Renault", "Volkswagen", "Honda", "Toyota", "Hyundai"],
-            "Renault": ["Peugeot", "Volkswagen", "Hyundai", "Kia", "Honda"],
-            "Volkswagen": ["Audi", "BMW", "Honda", "Toyota", "Peugeot"],
-        }
+        # Datos expandidos para recomendaciones inteligentes (compartidos con el
+        # generador de catálogos sintéticos)
+        self.brand_data = BRAND_DATA
+        self.demographic_profiles = DEMOGRAPHIC_PROFILES
+        self.brand_similarities = BRAND_SIMILARITIES
     
     def connect(self):
         """Establecer conexión con Neo4j"""
@@ -156,6 +59,11 @@ class EnhancedDatabaseSetup:
             session.run("MATCH (n) DETACH DELETE n")
             logger.info("Base de datos limpiada")
     
+    def create_constraints(self):
+        """Crear y verificar restricciones e índices antes de cargar datos"""
+        apply_schema(self.driver)
+        logger.info("Restricciones e índices creados y verificados")
+    
     def create_enhanced_schema(self):
         """Crear esquema mejorado con nodos para recomendaciones"""
         with self.driver.session() as session:
@@ -235,239 +143,26 @@ class EnhancedDatabaseSetup:
     
     def calculate_similarity_weight(self, brand1, brand2):
         """Calcular peso de similitud entre dos marcas"""
-        if brand1 not in self.brand_data or brand2 not in self.brand_data:
-            return 0.5
-        
-        data1 = self.brand_data[brand1]
-        data2 = self.brand_data[brand2]
-        
-        weight = 0.0
-        
-        # Mismo origen (+0.3)
-        if data1["origen"] == data2["origen"]:
-            weight += 0.3
-        
-        # Características similares (+0.1 por cada coincidencia)
-        common_characteristics = set(data1["caracteristicas"]) & set(data2["caracteristicas"])
-        weight += len(common_characteristics) * 0.1
-        
-        # Rango de precio similar (+0.2)
-        if data1["price_range"] == data2["price_range"]:
-            weight += 0.2
-        
-        # Confiabilidad similar (+0.1)
-        reliability_diff = abs(data1["reliability"] - data2["reliability"])
-        if reliability_diff <= 1:
-            weight += 0.1
-        
-        return min(weight, 1.0)  # Máximo 1.0
+        return similarity_weight(brand1, brand2)
     
     def create_comprehensive_cars(self):
         """Crear una base de datos completa de autos"""
-        cars_data = []
-        car_id = 1
+        # Cada modelo en 2022-2024 y sus tres trim levels (ver catalog_generator)
+        cars_data = comprehensive_cars()
         
-        # Modelos por marca expandidos
-        models_by_brand = {
-            "Toyota": [
-                {"modelo": "Corolla", "tipo": "Sedán", "precio_base": 25000, "segmento": "compacto"},
-                {"modelo": "Camry", "tipo": "Sedán", "precio_base": 30000, "segmento": "medio"},
-                {"modelo": "RAV4", "tipo": "SUV", "precio_base": 35000, "segmento": "compacto"},
-                {"modelo": "Highlander", "tipo": "SUV", "precio_base": 40000, "segmento": "grande"},
-                {"modelo": "Prius", "tipo": "Hatchback", "precio_base": 28000, "segmento": "híbrido"},
-                {"modelo": "Sienna", "tipo": "Minivan", "precio_base": 35000, "segmento": "familiar"},
-                {"modelo": "Yaris", "tipo": "Hatchback", "precio_base": 18000, "segmento": "económico"},
-                {"modelo": "Avalon", "tipo": "Sedán", "precio_base": 38000, "segmento": "lujo"},
-            ],
-            "Honda": [
-                {"modelo": "Civic", "tipo": "Sedán", "precio_base": 27000, "segmento": "compacto"},
-                {"modelo": "Accord", "tipo": "Sedán", "precio_base": 31000, "segmento": "medio"},
-                {"modelo": "CR-V", "tipo": "SUV", "precio_base": 36000, "segmento": "compacto"},
-                {"modelo": "Pilot", "tipo": "SUV", "precio_base": 42000, "segmento": "grande"},
-                {"modelo": "Fit", "tipo": "Hatchback", "precio_base": 20000, "segmento": "económico"},
-                {"modelo": "Odyssey", "tipo": "Minivan", "precio_base": 38000, "segmento": "familiar"},
-                {"modelo": "HR-V", "tipo": "Crossover", "precio_base": 24000, "segmento": "compacto"},
-                {"modelo": "Ridgeline", "tipo": "Pickup", "precio_base": 40000, "segmento": "medio"},
-            ],
-            "BMW": [
-                {"modelo": "3 Series", "tipo": "Sedán", "precio_base": 45000, "segmento": "lujo"},
-                {"modelo": "5 Series", "tipo": "Sedán", "precio_base": 55000, "segmento": "lujo"},
-                {"modelo": "X3", "tipo": "SUV", "precio_base": 50000, "segmento": "lujo"},
-                {"modelo": "X5", "tipo": "SUV", "precio_base": 65000, "segmento": "lujo"},
-                {"modelo": "2 Series", "tipo": "Coupé", "precio_base": 40000, "segmento": "deportivo"},
-                {"modelo": "Z4", "tipo": "Convertible", "precio_base": 55000, "segmento": "deportivo"},
-                {"modelo": "X1", "tipo": "Crossover", "precio_base": 38000, "segmento": "lujo"},
-                {"modelo": "i3", "tipo": "Hatchback", "precio_base": 48000, "segmento": "eléctrico"},
-            ],
-            "Tesla": [
-                {"modelo": "Model 3", "tipo": "Sedán", "precio_base": 42000, "segmento": "eléctrico"},
-                {"modelo": "Model S", "tipo": "Sedán", "precio_base": 75000, "segmento": "lujo_eléctrico"},
-                {"modelo": "Model Y", "tipo": "SUV", "precio_base": 48000, "segmento": "eléctrico"},
-                {"modelo": "Model X", "tipo": "SUV", "precio_base": 85000, "segmento": "lujo_eléctrico"},
-                {"modelo": "Cybertruck", "tipo": "Pickup", "precio_base": 60000, "segmento": "eléctrico"},
-            ],
-            "Ford": [
-                {"modelo": "Focus", "tipo": "Hatchback", "precio_base": 22000, "segmento": "compacto"},
-                {"modelo": "Fusion", "tipo": "Sedán", "precio_base": 28000, "segmento": "medio"},
-                {"modelo": "Mustang", "tipo": "Coupé", "precio_base": 38000, "segmento": "deportivo"},
-                {"modelo": "Explorer", "tipo": "SUV", "precio_base": 40000, "segmento": "grande"},
-                {"modelo": "F-150", "tipo": "Pickup", "precio_base": 45000, "segmento": "trabajo"},
-                {"modelo": "Escape", "tipo": "Crossover", "precio_base": 28000, "segmento": "compacto"},
-                {"modelo": "Bronco", "tipo": "SUV", "precio_base": 35000, "segmento": "aventura"},
-                {"modelo": "Edge", "tipo": "SUV", "precio_base": 38000, "segmento": "medio"},
-            ],
-        }
+        # Crear autos y relaciones en lotes (UNWIND)
+        stats = load_cars(self.driver, cars_data)
         
-        # Generar autos para cada marca
-        for brand, models in models_by_brand.items():
-            for model_info in models:
-                # Crear variaciones del modelo (diferentes años, trim levels)
-                for year in [2022, 2023, 2024]:
-                    for trim_level in ["Base", "Premium", "Sport"]:
-                        price_modifier = {"Base": 0, "Premium": 5000, "Sport": 8000}
-                        final_price = model_info["precio_base"] + price_modifier[trim_level]
-                        
-                        # Determinar combustible basado en marca y modelo
-                        if brand == "Tesla":
-                            fuel = "Eléctrico"
-                        elif "Prius" in model_info["modelo"] or "Ioniq" in model_info["modelo"]:
-                            fuel = "Híbrido"
-                        elif "Sport" in trim_level and model_info["tipo"] in ["Coupé", "Convertible"]:
-                            fuel = "Gasolina"
-                        else:
-                            fuel = self.select_fuel_by_probability(model_info["tipo"])
-                        
-                        # Determinar transmisión
-                        if fuel == "Eléctrico":
-                            transmission = "Automática"
-                        elif trim_level == "Sport" and model_info["tipo"] in ["Coupé", "Sedán"]:
-                            transmission = "Manual" if car_id % 3 == 0 else "Automática"
-                        else:
-                            transmission = "Automática"
-                        
-                        # Generar características basadas en trim level y marca
-                        features = self.generate_features(brand, model_info, trim_level)
-                        
-                        car = {
-                            "id": f"car_{car_id}",
-                            "modelo": f"{model_info['modelo']} {trim_level}",
-                            "año": year,
-                            "precio": final_price,
-                            "marca": brand,
-                            "tipo": model_info["tipo"],
-                            "combustible": fuel,
-                            "transmision": transmission,
-                            "caracteristicas": features,
-                            "segmento": model_info["segmento"],
-                            "trim_level": trim_level
-                        }
-                        
-                        cars_data.append(car)
-                        car_id += 1
-        
-        # Crear autos en la base de datos
-        with self.driver.session() as session:
-            for i, car in enumerate(cars_data, 1):
-                if i % 20 == 0:
-                    logger.info(f"Creando auto {i}/{len(cars_data)}")
-                
-                # Crear auto
-                session.run("""
-                    CREATE (a:Auto {
-                        id: $id,
-                        modelo: $modelo,
-                        año: $año,
-                        precio: $precio,
-                        caracteristicas: $caracteristicas,
-                        segmento: $segmento,
-                        trim_level: $trim_level
-                    })
-                """, **car)
-                
-                # Crear relaciones
-                session.run("""
-                    MATCH (a:Auto {id: $id})
-                    MATCH (m:Marca {nombre: $marca})
-                    MERGE (a)-[:ES_MARCA]->(m)
-                """, id=car["id"], marca=car["marca"])
-                
-                session.run("""
-                    MATCH (a:Auto {id: $id})
-                    MATCH (t:Tipo {categoria: $tipo})
-                    MERGE (a)-[:ES_TIPO]->(t)
-                """, id=car["id"], tipo=car["tipo"])
-                
-                session.run("""
-                    MATCH (a:Auto {id: $id})
-                    MATCH (c:Combustible {tipo: $combustible})
-                    MERGE (a)-[:USA_COMBUSTIBLE]->(c)
-                """, id=car["id"], combustible=car["combustible"])
-                
-                session.run("""
-                    MATCH (a:Auto {id: $id})
-                    MATCH (tr:Transmision {tipo: $transmision})
-                    MERGE (a)-[:TIENE_TRANSMISION]->(tr)
-                """, id=car["id"], transmision=car["transmision"])
-        
-        logger.info(f"Creados {len(cars_data)} autos con relaciones completas")
+        logger.info(f"Creados {len(cars_data)} autos con relaciones completas "
+                    f"({stats['rows_per_second']} autos/s)")
     
     def select_fuel_by_probability(self, vehicle_type):
         """Seleccionar combustible basado en probabilidades por tipo"""
-        import random
-        
-        fuel_probabilities = {
-            "Sedán": {"Gasolina": 0.6, "Híbrido": 0.3, "Eléctrico": 0.1},
-            "SUV": {"Gasolina": 0.7, "Híbrido": 0.2, "Eléctrico": 0.1},
-            "Hatchback": {"Gasolina": 0.5, "Híbrido": 0.3, "Eléctrico": 0.2},
-            "Pickup": {"Gasolina": 0.8, "Diésel": 0.2},
-            "Coupé": {"Gasolina": 0.9, "Eléctrico": 0.1},
-            "Convertible": {"Gasolina": 0.95, "Eléctrico": 0.05},
-            "Crossover": {"Gasolina": 0.6, "Híbrido": 0.3, "Eléctrico": 0.1},
-            "Minivan": {"Gasolina": 0.8, "Híbrido": 0.2}
-        }
-        
-        probs = fuel_probabilities.get(vehicle_type, {"Gasolina": 0.7, "Híbrido": 0.2, "Eléctrico": 0.1})
-        choices = list(probs.keys())
-        weights = list(probs.values())
-        
-        return random.choices(choices, weights=weights)[0]
+        return select_fuel_by_probability(vehicle_type)
     
     def generate_features(self, brand, model_info, trim_level):
         """Generar características realistas basadas en marca, modelo y trim"""
-        base_features = ["Aire acondicionado", "Radio AM/FM", "Bluetooth"]
-        
-        premium_features = {
-            "Base": [],
-            "Premium": ["Pantalla táctil", "Cámara trasera", "Control crucero", "Asientos de tela premium"],
-            "Sport": ["Asientos deportivos", "Volante deportivo", "Suspensión deportiva", "Llantas de aleación"]
-        }
-        
-        luxury_brand_features = {
-            "BMW": ["iDrive", "Asientos de cuero", "Faros LED", "Sistema de sonido premium"],
-            "Mercedes-Benz": ["MBUX", "Asientos de cuero Artico", "Faros LED Inteligentes", "Sonido Burmester"],
-            "Audi": ["MMI", "Asientos de cuero", "Faros Matrix LED", "Sistema Bang & Olufsen"],
-            "Tesla": ["Piloto automático", "Pantalla táctil 15\"", "Actualizaciones OTA", "Supercargador"],
-            "Lexus": ["Lexus Safety System", "Asientos de cuero", "Sistema Mark Levinson", "Faros LED"]
-        }
-        
-        type_specific_features = {
-            "SUV": ["Tracción integral", "Control de descenso", "Barras de techo"],
-            "Pickup": ["Caja de carga", "Gancho de remolque", "Tracción 4x4"],
-            "Coupé": ["Suspensión deportiva", "Frenos de alto rendimiento", "Escape deportivo"],
-            "Convertible": ["Techo convertible", "Barra antivuelco", "Asientos con calefacción"],
-            "Hatchback": ["Asientos traseros abatibles", "Portón trasero", "Diseño compacto"],
-            "Minivan": ["Puertas corredizas", "Asientos capitán", "8 asientos", "Entretenimiento trasero"]
-        }
-        
-        features = base_features.copy()
-        features.extend(premium_features.get(trim_level, []))
-        features.extend(luxury_brand_features.get(brand, []))
-        features.extend(type_specific_features.get(model_info["tipo"], []))
-        
-        # Eliminar duplicados y limitar características
-        features = list(set(features))[:8]
-        
-        return features
+        return generate_features(brand, model_info, trim_level)
     
     def create_demographic_relationships(self):
         """Crear relaciones entre perfiles demográficos y marcas/tipos"""
@@ -491,15 +186,22 @@ class EnhancedDatabaseSetup:
         
         logger.info("Relaciones demográficas creadas")
     
+    def denormalize_car_facets(self):
+        """Copiar marca, tipo, combustible y transmisión a cada Auto y crear sus índices"""
+        setup_denormalized_properties(self.driver)
+        logger.info("Propiedades de faceta desnormalizadas en los autos")
+    
     def setup_complete_enhanced_database(self):
         """Configurar completamente la base de datos mejorada"""
         logger.info("Iniciando configuración de base de datos mejorada...")
         
         self.clear_database()
+        self.create_constraints()
         self.create_enhanced_schema()
         self.create_brand_similarities()
         self.create_comprehensive_cars()
         self.create_demographic_relationships()
+        self.denormalize_car_facets()
         
         logger.info("¡Base de datos mejorada configurada completamente!")
         self.show_enhanced_stats()
@@ -1,7 +1,9 @@
-from neo4j import GraphDatabase
+import sys
+from pathlib import Path
 
-# Conecta a tu base
-driver = GraphDatabase.driver("bolt://localhost:7687", auth=("neo4j", "estructura"))
+# Driver compartido del proceso (app/graph_driver.py), creado al primer uso
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+from graph_driver import get_driver
 
 def get_recommendations(brand, budget, transmission, types):
     query = """
@@ -11,6 +13,6 @@ def get_recommendations(brand, budget, transmission, types):
     RETURN c.modelo AS modelo, c.precio AS precio, c.transmision AS transmision
     LIMIT 10
     """
-    with driver.session() as session:
+    with get_driver().session() as session:
         result = session.run(query, brand=brand, budget=budget, transmision=transmission, tipos=types)
         return [record.data() for record in result]
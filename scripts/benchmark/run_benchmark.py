@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Benchmark reproducible de los recomendadores sin Neo4j
+Genera catálogos sintéticos (1k, 10k y 100k autos por defecto) con la misma
+lógica que enhanced_database_setup.py, los sirve con MemoryGraphRepository (el
+backend del grafo sin Neo4j) y reproduce una mezcla realista de preferencias
+contra CarRecommendationSystem (recommender_minimal) e
+IntelligentCarRecommender. Para cada recomendador y tamaño escribe en JSON las
+solicitudes por segundo, los percentiles de latencia y la memoria asignada por
+solicitud, para comparar antes y después de un cambio.
+
+Uso: python scripts/benchmark/run_benchmark.py [--sizes 1000 10000 100000]
+         [--requests 300] [--seed 42] [--output resultados.json]
+Con la misma semilla el catálogo y la secuencia de preferencias son idénticos.
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from statistics import mean
+
+# Sin hilo de conexión a Neo4j: los recomendadores sirven desde el repositorio en memoria
+os.environ.setdefault('RECOMMENDER_OFFLINE', '1')
+
+# Módulos compartidos con la aplicación (app/)
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "app"))
+from catalog_generator import MODELS_BY_BRAND
+from catalog_columns import NUMPY_AVAILABLE
+from catalog_index import get_index
+from graph_repository import MemoryGraphRepository
+from metrics import percentile
+import recommender_minimal
+from recommender import IntelligentCarRecommender
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+DEFAULT_OUTPUT_DIR = Path(__file__).resolve().parent / "results"
+
+# Opciones de los pasos del asistente (templates/*.html)
+BUDGETS = ["15000-30000", "30000-50000", "50000-100000"]
+FUELS = ["Gasolina", "Híbrido", "Eléctrico", "Diésel"]
+TYPES = sorted({model["tipo"] for models in MODELS_BY_BRAND.values() for model in models})
+TRANSMISSIONS = ["Automática", "Manual"]
+GENDERS = ["masculino", "femenino"]
+AGE_RANGES = ["18-25", "26-35", "36-45", "46-55", "56+"]
+
+# Mezcla de preferencias: (peso, cuántas marcas, probabilidad de cada paso del asistente)
+PREFERENCE_MIX = [
+    # Asistente completo con perfil demográfico
+    (0.40, (1, 3), {'budget': 1.0, 'fuel': 0.8, 'types': 0.9, 'transmission': 0.7, 'profile': 1.0}),
+    # Solo marcas y presupuesto
+    (0.25, (1, 2), {'budget': 1.0, 'fuel': 0.0, 'types': 0.3, 'transmission': 0.0, 'profile': 0.5}),
+    # Explorando por tipo, sin marcas
+    (0.20, (0, 0), {'budget': 0.6, 'fuel': 0.5, 'types': 1.0, 'transmission': 0.3, 'profile': 0.5}),
+    # Combinaciones muy restrictivas (suelen terminar en el respaldo)
+    (0.10, (2, 4), {'budget': 1.0, 'fuel': 1.0, 'types': 1.0, 'transmission': 1.0, 'profile': 1.0}),
+    # Sin preferencias
+    (0.05, (0, 0), {'budget': 0.0, 'fuel': 0.0, 'types': 0.0, 'transmission': 0.0, 'profile': 0.0}),
+]
+
+def preference_workload(count, seed):
+    """Secuencia de preferencias con la mezcla de PREFERENCE_MIX (la misma para una semilla)"""
+    rng = random.Random(seed)
+    brands = list(MODELS_BY_BRAND)
+    weights = [weight for weight, _, _ in PREFERENCE_MIX]
+    workload = []
+    for _ in range(count):
+        _, (min_brands, max_brands), steps = rng.choices(PREFERENCE_MIX, weights=weights)[0]
+        profile = rng.random() < steps['profile']
+        workload.append({
+            'brands': rng.sample(brands, rng.randint(min_brands, max_brands)),
+            'budget': rng.choice(BUDGETS) if rng.random() < steps['budget'] else None,
+            'fuel': rng.choice(FUELS) if rng.random() < steps['fuel'] else None,
+            'types': rng.sample(TYPES, rng.randint(1, 2)) if rng.random() < steps['types'] else [],
+            'transmission': rng.choice(TRANSMISSIONS) if rng.random() < steps['transmission'] else None,
+            'gender': rng.choice(GENDERS) if profile else None,
+            'age_range': rng.choice(AGE_RANGES) if profile else None,
+        })
+    return workload
+
+def recommenders(repository):
+    """Nombre y función de cada recomendador sobre el repositorio, con la firma de preferencias del endpoint"""
+    recommender_minimal.recommendation_system.offline = True
+    recommender_minimal.recommendation_system.repository = repository
+    intelligent = IntelligentCarRecommender.in_memory(repository)
+    return [
+        ('CarRecommendationSystem', lambda prefs: recommender_minimal.get_recommendations(**prefs)),
+        ('IntelligentCarRecommender', lambda prefs: intelligent.get_intelligent_recommendations(**prefs)),
+    ]
+
+def latency_summary(latencies):
+    ordered = sorted(latencies)
+    return {
+        'mean_ms': round(mean(ordered) * 1000, 3),
+        **{f"p{int(q * 100)}_ms": round(percentile(ordered, q) * 1000, 3) for q in (0.5, 0.95, 0.99)},
+        'max_ms': round(ordered[-1] * 1000, 3),
+    }
+
+def measure_latency(call, workload, warmup_workload):
+    """
+    Solicitudes por segundo y percentiles de latencia, después de calentar con
+    otras preferencias (si se repitieran las medidas, sus cachés ya estarían llenas)
+    """
+    for prefs in warmup_workload:
+        call(prefs)
+
+    latencies = []
+    results = 0
+    started = time.perf_counter()
+    for prefs in workload:
+        start = time.perf_counter()
+        results += len(call(prefs))
+        latencies.append(time.perf_counter() - start)
+    elapsed = time.perf_counter() - started
+
+    return {
+        'requests': len(workload),
+        'requests_per_second': round(len(workload) / elapsed, 2),
+        'latency': latency_summary(latencies),
+        'avg_results': round(results / len(workload), 2),
+    }
+
+def measure_allocations(call, workload):
+    """
+    Memoria por solicitud con tracemalloc (en una pasada aparte, porque rastrear
+    asignaciones hace más lenta cada llamada): el pico sobre lo ya asignado y lo
+    que queda asignado al terminar
+    """
+    peaks = []
+    retained = []
+    tracemalloc.start()
+    try:
+        for prefs in workload:
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            call(prefs)
+            current, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - before)
+            retained.append(current - before)
+    finally:
+        tracemalloc.stop()
+
+    ordered = sorted(peaks)
+    return {
+        'requests': len(workload),
+        'peak_kib_mean': round(mean(ordered) / 1024, 1),
+        'peak_kib_p50': round(percentile(ordered, 0.5) / 1024, 1),
+        'peak_kib_p95': round(percentile(ordered, 0.95) / 1024, 1),
+        'peak_kib_max': round(ordered[-1] / 1024, 1),
+        'retained_kib_total': round(sum(retained) / 1024, 1),
+    }
+
+def install_catalog(size, seed):
+    """
+    Repositorio en memoria con el catálogo generado; tiempo y memoria de la
+    instantánea y su índice
+    """
+    tracemalloc.start()
+    started = time.perf_counter()
+    repository = MemoryGraphRepository.from_generator(size, seed)
+    snapshot = repository.snapshot()
+    get_index(snapshot)
+    elapsed = time.perf_counter() - started
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return repository, {
+        'cars': len(snapshot.cars),
+        'build_seconds': round(elapsed, 3),
+        'memory_mib': round(current / (1024 * 1024), 2),
+    }
+
+def run(sizes, requests, seed, warmup, allocation_requests):
+    workload = preference_workload(requests, seed)
+    # Calentamiento con su propia semilla: no se miden solicitudes ya vistas
+    warmup_workload = preference_workload(warmup, seed + 1)
+    report = {
+        'generated_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'numpy': NUMPY_AVAILABLE,
+        'seed': seed,
+        'requests': requests,
+        'warmup': warmup,
+        'allocation_requests': allocation_requests,
+        'results': [],
+    }
+
+    for size in sizes:
+        print(f"📦 Catálogo de {size} autos")
+        repository, catalog = install_catalog(size, seed)
+        for name, call in recommenders(repository):
+            print(f"   ⏱️  {name}")
+            latency = measure_latency(call, workload, warmup_workload)
+            allocations = measure_allocations(call, workload[:allocation_requests])
+            report['results'].append({
+                'recommender': name,
+                'catalog_size': size,
+                'catalog': catalog,
+                **latency,
+                'allocations': allocations,
+            })
+            print(f"      {latency['requests_per_second']} req/s, "
+                  f"p50 {latency['latency']['p50_ms']} ms, p99 {latency['latency']['p99_ms']} ms, "
+                  f"pico {allocations['peak_kib_p50']} KiB")
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de los recomendadores con catálogos sintéticos")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help="tamaños de catálogo (autos)")
+    parser.add_argument('--requests', type=int, default=300, help="solicitudes medidas por recomendador")
+    parser.add_argument('--warmup', type=int, default=20, help="solicitudes de calentamiento (no se miden)")
+    parser.add_argument('--allocation-requests', type=int, default=50,
+                        help="solicitudes de la pasada de memoria con tracemalloc")
+    parser.add_argument('--seed', type=int, default=42, help="semilla del catálogo y de las preferencias")
+    parser.add_argument('--output', type=Path, default=None, help="archivo JSON de resultados")
+    args = parser.parse_args()
+
+    if args.requests < 1:
+        parser.error("--requests debe ser mayor que cero")
+
+    # Los mensajes por solicitud distorsionan las mediciones
+    logging.disable(logging.CRITICAL)
+
+    report = run(args.sizes, args.requests, args.seed, args.warmup,
+                 max(1, min(args.allocation_requests, args.requests)))
+
+    output = args.output or DEFAULT_OUTPUT_DIR / f"benchmark_{time.strftime('%Y%m%d-%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+    print(f"✅ Resultados en {output}")
+
+if __name__ == "__main__":
+    main()
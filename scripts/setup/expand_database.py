@@ -6,6 +6,13 @@ Asegura que TODAS las combinaciones de preferencias tengan resultados
 
 from neo4j import GraphDatabase
 import random
+import sys
+from pathlib import Path
+
+# Módulos compartidos con la aplicación (app/)
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "app"))
+from graph_schema import apply_schema, setup_denormalized_properties
+from bulk_loader import load_cars
 
 class DatabaseExpander:
     def __init__(self):
@@ -58,6 +65,11 @@ class DatabaseExpander:
             session.run("MATCH (n) DETACH DELETE n")
             print("✅ Base de datos limpiada")
     
+    def create_constraints(self):
+        """Crear y verificar restricciones e índices antes de cargar datos"""
+        apply_schema(self.driver)
+        print("✅ Restricciones e índices creados y verificados")
+    
     def create_base_nodes(self):
         """Crear nodos base (marcas, tipos, combustibles, transmisiones)"""
         with self.driver.session() as session:
@@ -184,50 +196,15 @@ class DatabaseExpander:
     
     def create_cars_and_relationships(self, cars):
         """Crear todos los autos y sus relaciones"""
-        with self.driver.session() as session:
-            print(f"🚗 Creando {len(cars)} autos con sus relaciones...")
-            
-            for i, car in enumerate(cars, 1):
-                if i % 10 == 0:
-                    print(f"  Progreso: {i}/{len(cars)} autos creados...")
-                
-                # Crear el auto
-                session.run("""
-                    CREATE (a:Auto {
-                        id: $id,
-                        modelo: $modelo,
-                        año: $año,
-                        precio: $precio,
-                        caracteristicas: $caracteristicas
-                    })
-                """, **car)
-                
-                # Crear relaciones
-                session.run("""
-                    MATCH (a:Auto {id: $id})
-                    MATCH (m:Marca {nombre: $marca})
-                    MERGE (a)-[:ES_MARCA]->(m)
-                """, id=car["id"], marca=car["marca"])
-                
-                session.run("""
-                    MATCH (a:Auto {id: $id})
-                    MATCH (t:Tipo {categoria: $tipo})
-                    MERGE (a)-[:ES_TIPO]->(t)
-                """, id=car["id"], tipo=car["tipo"])
-                
-                session.run("""
-                    MATCH (a:Auto {id: $id})
-                    MATCH (c:Combustible {tipo: $combustible})
-                    MERGE (a)-[:USA_COMBUSTIBLE]->(c)
-                """, id=car["id"], combustible=car["combustible"])
-                
-                session.run("""
-                    MATCH (a:Auto {id: $id})
-                    MATCH (tr:Transmision {tipo: $transmision})
-                    MERGE (a)-[:TIENE_TRANSMISION]->(tr)
-                """, id=car["id"], transmision=car["transmision"])
-            
-            print(f"✅ {len(cars)} autos creados con todas sus relaciones")
+        print(f"🚗 Creando {len(cars)} autos con sus relaciones...")
+        stats = load_cars(self.driver, cars)
+        print(f"✅ {len(cars)} autos creados con todas sus relaciones "
+              f"({stats['batches']} lotes, {stats['rows_per_second']} autos/s)")
+    
+    def denormalize_car_facets(self):
+        """Copiar marca, tipo, combustible y transmisión a cada Auto y crear sus índices"""
+        properties_set = setup_denormalized_properties(self.driver)
+        print(f"✅ Facetas desnormalizadas en los autos ({properties_set} propiedades)")
     
     def verify_coverage(self):
         """Verificar que todas las combinaciones tengan al menos algunos resultados"""
@@ -349,8 +326,9 @@ def main():
         print("1️⃣ Limpiando base de datos...")
         expander.clear_database()
         
-        # Paso 2: Crear nodos base
-        print("\n2️⃣ Creando nodos base...")
+        # Paso 2: Crear esquema y nodos base
+        print("\n2️⃣ Creando esquema y nodos base...")
+        expander.create_constraints()
         expander.create_base_nodes()
         
         # Paso 3: Generar combinaciones de autos
@@ -362,12 +340,16 @@ def main():
         print("\n4️⃣ Creando autos en la base de datos...")
         expander.create_cars_and_relationships(cars)
         
-        # Paso 5: Verificar cobertura
-        print("\n5️⃣ Verificando cobertura...")
+        # Paso 5: Desnormalizar facetas en los autos
+        print("\n5️⃣ Desnormalizando facetas...")
+        expander.denormalize_car_facets()
+        
+        # Paso 6: Verificar cobertura
+        print("\n6️⃣ Verificando cobertura...")
         expander.verify_coverage()
         
-        # Paso 6: Probar consultas
-        print("\n6️⃣ Probando consultas de ejemplo...")
+        # Paso 7: Probar consultas
+        print("\n7️⃣ Probando consultas de ejemplo...")
         expander.test_sample_queries()
         
         print("\n🎉 ¡BASE DE DATOS EXPANDIDA EXITOSAMENTE!")
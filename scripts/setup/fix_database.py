@@ -5,6 +5,12 @@ Borra todo y recrea con relaciones correctas
 """
 
 from neo4j import GraphDatabase
+import sys
+from pathlib import Path
+
+# Módulos compartidos con la aplicación (app/)
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "app"))
+from graph_schema import apply_schema
 
 class DatabaseFixer:
     def __init__(self):
@@ -323,8 +329,9 @@ def main():
         print("1️⃣ Limpiando base de datos...")
         fixer.clear_everything()
         
-        # Paso 2: Crear todo de nuevo
-        print("\n2️⃣ Creando datos y relaciones...")
+        # Paso 2: Crear esquema y todo de nuevo
+        print("\n2️⃣ Creando esquema, datos y relaciones...")
+        apply_schema(fixer.driver)
         fixer.create_all_data()
         
         # Paso 3: Verificar
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Recargar una base Neo4j local desde el volcado export.csv de Neo4j Browser
+Uso: python scripts/setup/load_export.py [ruta/al/export.csv]
+La conexión usa las variables NEO4J_* de la aplicación (ver graph_driver.py)
+"""
+
+import sys
+from pathlib import Path
+
+# Módulos compartidos con la aplicación (app/)
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "app"))
+from cypher_dump import iter_dump, load_dump
+from graph_driver import DriverConfig, get_driver
+
+DEFAULT_EXPORT = Path(__file__).resolve().parents[2] / "export.csv"
+
+def connect():
+    """Driver compartido con la configuración del entorno, o None si Neo4j no responde"""
+    config = DriverConfig.from_env()
+    try:
+        driver = get_driver(config)
+    except ConnectionError as e:
+        print(f"❌ {e}")
+        return None
+    print(f"✅ Conectado a {config.uri} como {config.user}")
+    return driver
+
+def main():
+    export_path = Path(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_EXPORT
+    print(f"📥 Cargando volcado {export_path}")
+
+    driver = connect()
+    if driver is None:
+        print("❌ No se pudo conectar a Neo4j")
+        return
+
+    # El registro de graph_driver cierra el driver al salir
+    stats = load_dump(driver, iter_dump(str(export_path)))
+    print(f"✅ {stats['nodes']} nodos y {stats['relationships']} relaciones cargados "
+          f"({stats['skipped']} sin clave omitidos)")
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,12 @@ Configuración simplificada para Neo4j (compatible con Python 3.13)
 """
 
 from neo4j import GraphDatabase
+import sys
+from pathlib import Path
+
+# Módulos compartidos con la aplicación (app/)
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "app"))
+from graph_schema import apply_schema
 
 class Neo4jSetup:
     def __init__(self, uri, user, password):
@@ -107,6 +113,7 @@ class Neo4jSetup:
         """Configurar base de datos completa"""
         print("Configurando base de datos...")
         self.clear_database()
+        apply_schema(self.driver)
         self.create_sample_data()
         self.create_cars()
         print("¡Configuración completada!")
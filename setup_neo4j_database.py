@@ -6,6 +6,12 @@ y poblarla con datos de ejemplo para el sistema de recomendaciones de autos
 
 from neo4j import GraphDatabase
 import logging
+import sys
+from pathlib import Path
+
+# Módulos compartidos con la aplicación (app/)
+sys.path.insert(0, str(Path(__file__).parent / "app"))
+from graph_schema import apply_schema
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -25,24 +31,9 @@ class Neo4jSetup:
             logger.info("Base de datos limpiada")
     
     def create_constraints(self):
-        """Crear índices y restricciones para mejor rendimiento"""
-        constraints = [
-            "CREATE CONSTRAINT auto_id IF NOT EXISTS FOR (a:Auto) REQUIRE a.id IS UNIQUE",
-            "CREATE CONSTRAINT marca_nombre IF NOT EXISTS FOR (m:Marca) REQUIRE m.nombre IS UNIQUE",
-            "CREATE CONSTRAINT tipo_categoria IF NOT EXISTS FOR (t:Tipo) REQUIRE t.categoria IS UNIQUE",
-            "CREATE CONSTRAINT combustible_tipo IF NOT EXISTS FOR (c:Combustible) REQUIRE c.tipo IS UNIQUE",
-            "CREATE CONSTRAINT transmision_tipo IF NOT EXISTS FOR (tr:Transmision) REQUIRE tr.tipo IS UNIQUE",
-            "CREATE INDEX auto_precio IF NOT EXISTS FOR (a:Auto) ON (a.precio)",
-            "CREATE INDEX auto_año IF NOT EXISTS FOR (a:Auto) ON (a.año)"
-        ]
-        
-        with self.driver.session() as session:
-            for constraint in constraints:
-                try:
-                    session.run(constraint)
-                    logger.info(f"Creada restricción: {constraint.split()[1]}")
-                except Exception as e:
-                    logger.warning(f"Restricción ya existe o error: {e}")
+        """Crear y verificar índices y restricciones (esquema compartido en app/graph_schema.py)"""
+        apply_schema(self.driver)
+        logger.info("Restricciones e índices creados y verificados")
     
     def create_brands(self):
         """Crear nodos de marcas"""
@@ -0,0 +1,44 @@
+"""
+Configuración común de las pruebas: los módulos de app/ se importan planos,
+como los importa la aplicación, y todo corre sin Neo4j con el backend del
+grafo en memoria (catálogo base generado) y usuarios en memoria.
+Las pruebas que escriben en Neo4j usan el fixture neo4j_test_driver y se
+omiten si NEO4J_TEST_URI no apunta a una instancia de prueba.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+os.environ.setdefault('GRAPH_BACKEND', 'memory')
+os.environ.setdefault('GRAPH_MEMORY_SOURCE', 'generator')
+os.environ.setdefault('USER_STORE', 'memory')
+os.environ.setdefault('LOG_LEVEL', 'ERROR')
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "app"))
+
+# Autos que crean las pruebas contra Neo4j; se borran al terminar cada una
+NEO4J_TEST_PREFIX = 'test_upsert_'
+
+@pytest.fixture
+def neo4j_test_driver(tmp_path, monkeypatch):
+    """Driver a la instancia de NEO4J_TEST_URI (nunca la del entorno: las pruebas escriben)"""
+    from graph_driver import DriverConfig, get_driver
+
+    uri = os.environ.get('NEO4J_TEST_URI')
+    if not uri:
+        pytest.skip("NEO4J_TEST_URI no definido")
+    # Cargar el catálogo desde Neo4j guarda una copia local: que no pise la de la aplicación
+    monkeypatch.setenv('CATALOG_FILE', str(tmp_path / "catalog.bin"))
+    try:
+        driver = get_driver(DriverConfig.from_env(uri=uri))
+    except ConnectionError as e:
+        pytest.skip(f"Neo4j de prueba no disponible: {e}")
+    try:
+        yield driver
+    finally:
+        with driver.session() as session:
+            session.run("MATCH (a:Auto) WHERE a.id STARTS WITH $prefix DETACH DELETE a",
+                        prefix=NEO4J_TEST_PREFIX).consume()
@@ -0,0 +1,43 @@
+"""Carga masiva con UNWIND: filas, lotes y reemplazo de facetas en Neo4j"""
+
+from bulk_loader import batched, car_row, load_cars
+from conftest import NEO4J_TEST_PREFIX
+
+CAR = {
+    'id': f'{NEO4J_TEST_PREFIX}bulk', 'modelo': 'Prueba', 'año': 2024, 'precio': 20000, 'segmento': None,
+    'marca': 'Toyota', 'tipo': 'Sedán', 'combustible': 'Gasolina', 'transmision': 'Manual',
+}
+
+def test_car_row_separates_facets_and_drops_null_properties():
+    row = car_row(CAR)
+
+    assert row['id'] == CAR['id']
+    assert (row['marca'], row['tipo'], row['combustible'], row['transmision']) == \
+        ('Toyota', 'Sedán', 'Gasolina', 'Manual')
+    assert row['properties'] == {'modelo': 'Prueba', 'año': 2024, 'precio': 20000}
+
+def test_batched_without_materializing():
+    assert list(batched(iter(range(7)), 3)) == [[0, 1, 2], [3, 4, 5], [6]]
+    assert list(batched([], 3)) == []
+
+def facet_targets(driver, car_id):
+    with driver.session() as session:
+        rows = session.run("""
+            MATCH (a:Auto {id: $id})-[r]->(f)
+            RETURN type(r) AS tipo, collect(coalesce(f.nombre, f.categoria, f.tipo)) AS valores
+        """, id=car_id).data()
+    return {row['tipo']: row['valores'] for row in rows}
+
+def test_reload_with_changed_facets_replaces_relationships(neo4j_test_driver):
+    load_cars(neo4j_test_driver, [CAR])
+    load_cars(neo4j_test_driver, [{**CAR, 'marca': 'Honda', 'tipo': 'SUV', 'transmision': None}])
+
+    assert facet_targets(neo4j_test_driver, CAR['id']) == {
+        'ES_MARCA': ['Honda'], 'ES_TIPO': ['SUV'], 'USA_COMBUSTIBLE': ['Gasolina'],
+    }
+    with neo4j_test_driver.session() as session:
+        record = session.run("""
+            MATCH (a:Auto {id: $id})
+            RETURN a.marca AS marca, a.tipo AS tipo, a.transmision AS transmision
+        """, id=CAR['id']).single()
+    assert (record['marca'], record['tipo'], record['transmision']) == ('Honda', 'SUV', None)
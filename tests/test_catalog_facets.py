@@ -0,0 +1,43 @@
+"""Conteos por faceta de /api/catalog/facets con la selección guardada por el frontend"""
+
+import pytest
+
+from catalog_index import facet_counts_for_selection, get_index
+from graph_repository import MemoryGraphRepository
+
+@pytest.fixture(scope='module')
+def snapshot():
+    return MemoryGraphRepository.from_generator(seed=0).snapshot()
+
+def expected_total(snapshot):
+    return sum(
+        1 for car in snapshot.cars
+        if car.marca == 'Toyota' and 15000 <= car.precio <= 30000
+        and car.combustible == 'Gasolina' and car.tipo == 'Sedán' and car.transmision == 'Automática'
+    )
+
+def test_aliases_count_like_catalog_values(snapshot):
+    index = get_index(snapshot)
+    aliased = facet_counts_for_selection(index, ['Toyota'], '15000-30000', ['gasolina'], ['sedan'], ['automatic'])
+    canonical = facet_counts_for_selection(index, ['Toyota'], '15000-30000', ['Gasolina'], ['Sedán'], ['Automática'])
+
+    assert aliased == canonical
+    assert aliased['total'] == expected_total(snapshot) > 0
+
+def test_route_normalizes_session_aliases(snapshot):
+    import app as flask_app
+
+    client = flask_app.app.test_client()
+    with client.session_transaction() as session:
+        session.update(selected_brands=['Toyota'], selected_budget='15000-30000',
+                       selected_fuel=['gasolina'], selected_types=['sedan'],
+                       selected_transmission=['automatic'])
+
+    response = client.get('/api/catalog/facets')
+    counts = response.get_json()
+    response.close()
+
+    assert response.status_code == 200
+    assert counts['total'] == expected_total(snapshot) > 0
+    assert counts['facets']['combustible'].get('Gasolina', 0) > 0
+    assert counts['facets']['transmision'].get('Automática', 0) > 0
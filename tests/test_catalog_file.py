@@ -0,0 +1,75 @@
+"""Ida y vuelta del archivo binario del catálogo"""
+
+import pytest
+
+from catalog_file import CatalogColumns, CatalogFileError, read_catalog_file, write_catalog_file
+from catalog_snapshot import CatalogSnapshot
+from graph_repository import MemoryGraphRepository
+
+def assert_same_catalog(loaded, original):
+    assert [car.as_dict() for car in loaded.cars] == [car.as_dict() for car in original.cars]
+    assert loaded.brand_similarities == original.brand_similarities
+    assert loaded.demographic_profiles == original.demographic_profiles
+
+def test_generated_catalog_round_trip(tmp_path):
+    snapshot = MemoryGraphRepository.from_generator(500, seed=3).snapshot()
+    path = str(tmp_path / "catalog.bin")
+
+    size = write_catalog_file(snapshot, path)
+    assert size == (tmp_path / "catalog.bin").stat().st_size
+
+    assert_same_catalog(CatalogSnapshot(*read_catalog_file(path)), snapshot)
+
+def test_nulls_price_types_and_text_round_trip(tmp_path):
+    cars = [
+        {'id': 'a1', 'modelo': 'Corolla', 'marca': 'Toyota', 'año': 2023, 'precio': 25000,
+         'tipo': 'Sedán', 'combustible': 'Híbrido', 'transmision': 'Automática',
+         'caracteristicas': ['Cámara de reversa', 'Bluetooth']},
+        {'id': 'a2', 'modelo': 'Civic', 'marca': 'Honda', 'año': None, 'precio': 27999.5,
+         'tipo': None, 'combustible': 'Gasolina', 'transmision': None, 'caracteristicas': []},
+        {'id': 'a3', 'modelo': 'Sin precio', 'marca': 'Ñandú', 'año': 2020, 'precio': None,
+         'caracteristicas': []},
+    ]
+    similarities = [{'origen': 'Toyota', 'destino': 'Honda', 'peso': 0.8},
+                    {'origen': 'Toyota', 'destino': 'Ñandú', 'peso': None}]
+    profiles = [{'id': 'femenino_26-35', 'marcas': ['Toyota', 'Honda'], 'tipos': ['SUV']},
+                {'id': 'masculino_56+', 'marcas': [], 'tipos': []}]
+    snapshot = CatalogSnapshot(cars, similarities, profiles)
+    path = str(tmp_path / "catalog.bin")
+    write_catalog_file(snapshot, path)
+
+    components = read_catalog_file(path)
+    assert_same_catalog(CatalogSnapshot(*components), snapshot)
+
+    by_id = {car['id']: car for car in components[0]}
+    # Neo4j distingue enteros de flotantes: el tipo del precio se conserva
+    assert isinstance(by_id['a1']['precio'], int)
+    assert by_id['a2']['precio'] == 27999.5
+    assert by_id['a3']['precio'] is None
+    assert by_id['a2']['año'] is None
+    assert by_id['a2']['tipo'] is None
+
+def test_columns_are_views_over_the_file_bytes(tmp_path):
+    path = str(tmp_path / "catalog.bin")
+    snapshot = MemoryGraphRepository.from_generator(50, seed=1).snapshot()
+    write_catalog_file(snapshot, path)
+
+    columns = CatalogColumns.read(path)
+    assert len(columns) == 50
+    assert isinstance(columns.columns['car.precio'], memoryview)
+    assert columns.columns['car.precio'].obj is columns.data
+    assert list(columns.columns['car.precio']) == [float(car.precio) for car in snapshot.cars]
+    assert len(set(columns.strings())) == len(columns.strings())
+
+def test_rejects_files_that_are_not_catalogs(tmp_path):
+    empty = tmp_path / "empty.bin"
+    empty.write_bytes(b"")
+    other = tmp_path / "other.bin"
+    other.write_bytes(b"NOPE" + bytes(32))
+    truncated = tmp_path / "truncated.bin"
+    write_catalog_file(MemoryGraphRepository.from_generator(50, seed=1).snapshot(), str(truncated))
+    truncated.write_bytes(truncated.read_bytes()[:200])
+
+    for path in (empty, other, truncated):
+        with pytest.raises(CatalogFileError):
+            read_catalog_file(str(path))
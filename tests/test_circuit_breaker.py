@@ -0,0 +1,104 @@
+"""Transiciones del circuit breaker: cerrado, abierto, semiabierto y de vuelta a cerrado"""
+
+import pytest
+
+import circuit_breaker
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+class FakeTime:
+    """Reloj manual en lugar de time.monotonic"""
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeTime()
+    monkeypatch.setattr(circuit_breaker, 'time', fake)
+    return fake
+
+@pytest.fixture
+def breaker(clock):
+    return CircuitBreaker("test", failure_rate_threshold=0.5, minimum_calls=4,
+                          window_size=10, open_seconds=30.0)
+
+def test_stays_closed_below_minimum_calls(breaker):
+    for _ in range(3):
+        breaker.record_failure("boom")
+    assert breaker.state == CLOSED
+    assert breaker.allow_request()
+
+def test_stays_closed_below_failure_rate(breaker):
+    for _ in range(3):
+        breaker.record_success()
+    breaker.record_failure("boom")
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.failure_rate() == pytest.approx(0.2)
+
+def test_opens_at_failure_rate_and_rejects(breaker):
+    breaker.record_success()
+    breaker.record_success()
+    breaker.record_failure("boom")
+    assert breaker.state == CLOSED
+    breaker.record_failure("timeout")
+
+    assert breaker.state == OPEN
+    assert breaker.times_opened == 1
+    assert not breaker.allow_request()
+    assert breaker.rejected == 1
+    status = breaker.status()
+    assert status['state'] == OPEN
+    assert status['last_error'] == 'timeout'
+    assert status['retry_in'] == 30.0
+
+def open_breaker(breaker):
+    for _ in range(4):
+        breaker.record_failure("boom")
+    assert breaker.state == OPEN
+
+def test_half_open_after_open_seconds_allows_one_probe(breaker, clock):
+    open_breaker(breaker)
+    clock.now += 29.9
+    assert not breaker.allow_request()
+
+    clock.now += 0.1
+    assert breaker.allow_request()
+    assert breaker.state == HALF_OPEN
+    # Un solo lugar de prueba mientras esté semiabierto
+    assert not breaker.allow_request()
+
+def test_successful_probe_closes_and_clears_window(breaker, clock):
+    open_breaker(breaker)
+    clock.now += 30.0
+    assert breaker.allow_request()
+
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.failure_rate() == 0.0
+    assert breaker.allow_request()
+
+def test_failed_probe_reopens(breaker, clock):
+    open_breaker(breaker)
+    clock.now += 30.0
+    assert breaker.allow_request()
+
+    breaker.record_failure("still down")
+    assert breaker.state == OPEN
+    assert breaker.times_opened == 2
+    assert not breaker.allow_request()
+
+def test_call_records_failures_and_raises_while_open(breaker):
+    def failing():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        breaker.call(failing)
+    assert breaker.last_error == 'boom'
+    assert breaker.call(lambda: 'ok') == 'ok'
+    open_breaker(breaker)
+
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: 'never')
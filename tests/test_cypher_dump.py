@@ -0,0 +1,89 @@
+"""Lector del volcado export.csv: filas de nodos y caminos, y el catálogo que se arma con ellas"""
+
+import pytest
+
+from cypher_dump import (DumpParseError, NodeRecord, RelationshipRecord, catalog_components,
+                         iter_dump, parse_line)
+
+def test_header_and_blank_lines_are_skipped():
+    assert parse_line('n') is None
+    assert parse_line('"n"') is None
+    assert parse_line('   \n') is None
+
+def test_node_with_typed_values():
+    record = parse_line('"(:Auto {id: car_1,modelo: Corolla,año: 2023,precio: 25000.5,'
+                        'disponible: true,segmento: null,caracteristicas: [GPS, Bluetooth]})"')
+
+    assert record == NodeRecord(('Auto',), {
+        'id': 'car_1', 'modelo': 'Corolla', 'año': 2023, 'precio': 25000.5,
+        'disponible': True, 'segmento': None, 'caracteristicas': ['GPS', 'Bluetooth'],
+    })
+    assert record.label == 'Auto'
+    assert record.key == 'car_1'
+
+def test_comma_inside_value_stays_in_the_value():
+    record = parse_line('"(:Concesionario {id: dealer_1,direccion: Calle 123, Ciudad A,telefono: 555})"')
+
+    assert record.properties == {'id': 'dealer_1', 'direccion': 'Calle 123, Ciudad A', 'telefono': 555}
+
+def test_quoted_values_and_escaped_quotes():
+    record = parse_line('"(:Marca {nombre: ""Mercedes-Benz"",pais: \'Alemania\'})"')
+
+    assert record.properties == {'nombre': 'Mercedes-Benz', 'pais': 'Alemania'}
+    assert record.key == 'Mercedes-Benz'
+
+def test_node_without_properties_and_multiple_labels():
+    assert parse_line('(:Auto:Usado)') == NodeRecord(('Auto', 'Usado'), {})
+
+def test_outgoing_relationship():
+    record = parse_line('"(:Auto {id: car_1})-[:ES_MARCA {peso: 0.8}]->(:Marca {nombre: Toyota})"')
+
+    assert isinstance(record, RelationshipRecord)
+    assert record.type == 'ES_MARCA'
+    assert record.properties == {'peso': 0.8}
+    assert record.start.key == 'car_1'
+    assert record.end == NodeRecord(('Marca',), {'nombre': 'Toyota'})
+
+def test_incoming_relationship_is_turned_around():
+    record = parse_line('"(:Marca {nombre: Toyota})<-[:ES_MARCA]-(:Auto {id: car_1})"')
+
+    assert record.start.label == 'Auto'
+    assert record.end.label == 'Marca'
+    assert record.properties == {}
+
+@pytest.mark.parametrize('line', [
+    'Marca {nombre: Toyota}',
+    '(:Marca {nombre Toyota})',
+    '(:Auto {id: car_1})-[]->(:Marca {nombre: Toyota})',
+])
+def test_malformed_rows_raise(line):
+    with pytest.raises(DumpParseError):
+        parse_line(line)
+
+def test_iter_dump_skips_bad_rows_unless_strict(tmp_path):
+    path = tmp_path / "export.csv"
+    path.write_text('﻿n\n"(:Marca {nombre: Toyota})"\nbasura\n"(:Marca {nombre: Honda})"\n',
+                    encoding='utf-8')
+
+    assert [record.key for record in iter_dump(str(path))] == ['Toyota', 'Honda']
+    with pytest.raises(DumpParseError, match=r':3:'):
+        list(iter_dump(str(path), strict=True))
+
+def test_catalog_components_from_dump_rows():
+    lines = [
+        '"(:Auto {id: car_1,modelo: Corolla,precio: 25000})"',
+        '"(:Auto {id: car_1})-[:ES_MARCA]->(:Marca {nombre: Toyota})"',
+        '"(:Auto {id: car_1})-[:ES_TIPO]->(:Tipo {categoria: Sedán})"',
+        '"(:Auto {id: car_1})-[:USA_COMBUSTIBLE]->(:Combustible {tipo: Híbrido})"',
+        '"(:Auto {id: car_1})-[:TIENE_TRANSMISION]->(:Transmision {tipo: Automática})"',
+        '"(:Marca {nombre: Toyota})-[:SIMILAR_A {peso: 0.7}]->(:Marca {nombre: Honda})"',
+        '"(:PerfilDemografico {id: femenino_26-35})"',
+        '"(:PerfilDemografico {id: femenino_26-35})-[:RECOMIENDA_MARCA]->(:Marca {nombre: Toyota})"',
+        '"(:PerfilDemografico {id: femenino_26-35})-[:RECOMIENDA_TIPO]->(:Tipo {categoria: SUV})"',
+    ]
+    cars, similarities, profiles = catalog_components(parse_line(line) for line in lines)
+
+    assert cars == [{'id': 'car_1', 'modelo': 'Corolla', 'precio': 25000, 'marca': 'Toyota',
+                     'tipo': 'Sedán', 'combustible': 'Híbrido', 'transmision': 'Automática'}]
+    assert similarities == [{'origen': 'Toyota', 'destino': 'Honda', 'peso': 0.7}]
+    assert profiles == [{'id': 'femenino_26-35', 'marcas': ['Toyota'], 'tipos': ['SUV']}]
@@ -0,0 +1,67 @@
+"""diversify con heap y contadores frente a la versión cuadrática original"""
+
+import random
+
+import pytest
+
+from diversification import diversify, diversify_by_keys, seeded_jitter, top_k
+
+def quadratic_diversify(scored_cars, limit):
+    """diversify_recommendations antes del heap: ordena todo y recuenta la selección por candidato"""
+    if not scored_cars:
+        return []
+    scored_cars = sorted(scored_cars, key=lambda x: x['similarity_score'], reverse=True)
+
+    selected = []
+    used_brands = set()
+    for car in scored_cars:
+        if len(selected) >= limit:
+            break
+        brand_penalty = len([c for c in selected if c['marca'] == car['marca']]) * 10
+        type_penalty = len([c for c in selected if c['tipo'] == car['tipo']]) * 5
+        diversity_score = car['similarity_score'] - brand_penalty - type_penalty
+        if (diversity_score >= 40 or
+                (car['marca'] not in used_brands and len(selected) < limit * 0.7) or
+                len(selected) < 3):
+            selected.append(car)
+            used_brands.add(car['marca'])
+
+    remaining_slots = limit - len(selected)
+    if remaining_slots > 0:
+        remaining_cars = [car for car in scored_cars if car not in selected]
+        selected.extend(remaining_cars[:remaining_slots])
+    return selected[:limit]
+
+def random_cars(rng, count):
+    brands = ['Toyota', 'Honda', 'BMW', 'Tesla', 'Ford']
+    types = ['Sedán', 'SUV', 'Hatchback', 'Pickup']
+    return [{
+        'id': f"car_{i}",
+        'marca': rng.choice(brands),
+        'tipo': rng.choice(types),
+        # Puntuaciones redondeadas para que haya empates
+        'similarity_score': float(rng.randint(20, 100)),
+    } for i in range(count)]
+
+@pytest.mark.parametrize('seed', range(50))
+def test_matches_quadratic_version(seed):
+    rng = random.Random(seed)
+    cars = random_cars(rng, rng.randint(0, 80))
+    limit = rng.randint(1, 25)
+
+    expected = [car['id'] for car in quadratic_diversify(cars, limit)]
+    assert [car['id'] for car in diversify_by_keys(cars, limit)] == expected
+
+def test_empty_and_zero_limit():
+    assert diversify([], 5, score_key=lambda x: x, brand_key=str, type_key=str) == []
+    assert diversify_by_keys([{'similarity_score': 90, 'marca': 'A', 'tipo': 'B'}], 0) == []
+
+def test_top_k_matches_sorted_with_ties():
+    rng = random.Random(7)
+    items = [(rng.randint(0, 10), i) for i in range(200)]
+    key = lambda item: item[0]
+    assert top_k(items, 15, key) == sorted(items, key=key, reverse=True)[:15]
+
+def test_seeded_jitter_is_stable_and_bounded():
+    assert seeded_jitter('semilla', 'car_1') == seeded_jitter('semilla', 'car_1')
+    assert all(0 <= seeded_jitter('s', i, 5.0) < 5.0 for i in range(100))
@@ -0,0 +1,53 @@
+"""upsert_cars con el mismo resultado en los dos backends del grafo"""
+
+import pytest
+
+from catalog_snapshot import CatalogStore
+from conftest import NEO4J_TEST_PREFIX
+from graph_repository import MemoryGraphRepository, Neo4jGraphRepository
+
+CAR = {
+    'id': f'{NEO4J_TEST_PREFIX}1', 'modelo': 'Prueba', 'año': 2024, 'precio': 20000,
+    'marca': 'Toyota', 'tipo': 'Sedán', 'combustible': 'Gasolina', 'transmision': 'Manual',
+}
+
+def facet_edges(driver, car_id):
+    with driver.session() as session:
+        rows = session.run("""
+            MATCH (a:Auto {id: $id})-[r]->(f)
+            RETURN type(r) AS tipo, count(*) AS cantidad
+        """, id=car_id).data()
+    return {row['tipo']: row['cantidad'] for row in rows}
+
+@pytest.fixture(params=['memory', 'neo4j'])
+def repository(request):
+    store = CatalogStore()
+    if request.param == 'memory':
+        return MemoryGraphRepository.from_generator(50, seed=0, store=store)
+    driver = request.getfixturevalue('neo4j_test_driver')
+    return Neo4jGraphRepository(driver, use_node_properties=False, store=store)
+
+def test_upsert_replaces_changed_facets(repository):
+    repository.snapshot()
+    repository.upsert_cars([CAR])
+    repository.upsert_cars([{**CAR, 'marca': 'Honda', 'tipo': 'SUV', 'transmision': None, 'precio': 21000}])
+
+    updated = repository.snapshot().cars_by_id[CAR['id']]
+    assert (updated['marca'], updated['tipo'], updated['combustible'], updated['transmision'],
+            updated['precio']) == ('Honda', 'SUV', 'Gasolina', None, 21000)
+    assert updated['modelo'] == 'Prueba'
+
+    if isinstance(repository, Neo4jGraphRepository):
+        # Una relación por faceta con valor y ninguna del valor anterior
+        assert facet_edges(repository.driver, CAR['id']) == {
+            'ES_MARCA': 1, 'ES_TIPO': 1, 'USA_COMBUSTIBLE': 1,
+        }
+
+def test_upsert_is_idempotent(repository):
+    repository.snapshot()
+    repository.upsert_cars([CAR])
+    size = len(repository.snapshot())
+    repository.upsert_cars([CAR])
+
+    assert len(repository.snapshot()) == size
+    assert repository.snapshot().cars_by_id[CAR['id']]['marca'] == 'Toyota'
@@ -0,0 +1,95 @@
+"""Cursores de /api/recommendations: ida y vuelta, cursores vencidos y parámetros inválidos"""
+
+import base64
+import json
+
+import pytest
+
+from pagination import (DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, PageRequest, PaginationError,
+                        StaleCursorError, decode_cursor, encode_cursor, page, paginate,
+                        parse_limit, split_sections)
+
+KEY = (('Toyota',), '15000-30000', ('Gasolina',), (), (), None, None)
+OTHER_KEY = (('Honda',), '15000-30000', ('Gasolina',), (), (), None, None)
+
+def raw_cursor(payload):
+    return base64.urlsafe_b64encode(json.dumps(payload).encode('utf-8')).rstrip(b'=').decode('ascii')
+
+def test_cursor_round_trip():
+    token = encode_cursor('recommended', 24, KEY, 3)
+
+    assert '=' not in token
+    assert decode_cursor(token, KEY, 3) == ('recommended', 24)
+
+def test_cursor_of_another_selection_is_stale():
+    token = encode_cursor('filtered', 12, KEY, 3)
+
+    with pytest.raises(StaleCursorError):
+        decode_cursor(token, OTHER_KEY, 3)
+
+def test_cursor_of_a_reloaded_catalog_is_stale():
+    token = encode_cursor('filtered', 12, KEY, 3)
+
+    with pytest.raises(StaleCursorError):
+        decode_cursor(token, KEY, 4)
+
+@pytest.mark.parametrize('token', [
+    'no es base64!',
+    raw_cursor(['filtered', 12]),
+    raw_cursor({'s': 'filtered', 'o': 12}),
+    raw_cursor({'s': 'otra', 'o': 12, 'k': 'x', 'v': 3}),
+    raw_cursor({'s': 'filtered', 'o': -1, 'k': 'x', 'v': 3}),
+    raw_cursor({'s': 'filtered', 'o': '12', 'k': 'x', 'v': 3}),
+])
+def test_unreadable_cursor_is_invalid_not_stale(token):
+    with pytest.raises(PaginationError) as error:
+        decode_cursor(token, KEY, 3)
+    assert not isinstance(error.value, StaleCursorError)
+
+def test_pages_follow_their_cursors_to_the_end():
+    cars = [{'id': f"car_{i}"} for i in range(25)]
+    seen = []
+    offset = 0
+    while True:
+        current = page(cars, 'recommended', offset, 10, KEY, 3)
+        seen += current['items']
+        assert current['total'] == 25
+        if current['next_cursor'] is None:
+            break
+        _, offset = decode_cursor(current['next_cursor'], KEY, 3)
+
+    assert seen == cars
+
+def test_paginate_only_the_requested_sections():
+    sections = split_sections([{'id': 'a', 'similarity_score': 95}, {'id': 'b', 'similarity_score': 60}])
+    response = paginate(sections, PageRequest(limit=5, sections=('filtered',)), KEY, 7)
+
+    assert set(response) == {'filtered', 'catalog_version'}
+    assert [car['id'] for car in response['filtered']['items']] == ['a']
+    assert response['catalog_version'] == 7
+
+@pytest.mark.parametrize('value, expected', [
+    (None, DEFAULT_PAGE_SIZE), ('', DEFAULT_PAGE_SIZE), ('5', 5), ('1000', MAX_PAGE_SIZE),
+])
+def test_parse_limit(value, expected):
+    assert parse_limit(value) == expected
+
+@pytest.mark.parametrize('value', ['0', '-3', 'diez'])
+def test_parse_limit_rejects(value):
+    with pytest.raises(PaginationError):
+        parse_limit(value)
+
+def test_page_request_from_args():
+    assert PageRequest.from_args({}, KEY, 3) is None
+
+    request = PageRequest.from_args({'limit': '20', 'section': 'filtered'}, KEY, 3)
+    assert (request.limit, request.sections, request.offset) == (20, ('filtered',), 0)
+
+    token = encode_cursor('recommended', 40, KEY, 3)
+    request = PageRequest.from_args({'cursor': token}, KEY, 3)
+    assert (request.limit, request.sections, request.offset) == (DEFAULT_PAGE_SIZE, ('recommended',), 40)
+
+    with pytest.raises(StaleCursorError):
+        PageRequest.from_args({'cursor': token}, KEY, 4)
+    with pytest.raises(PaginationError):
+        PageRequest.from_args({'section': 'todas'}, KEY, 3)
@@ -0,0 +1,60 @@
+"""Un presupuesto mal formado en la sesión no rompe las recomendaciones"""
+
+import pytest
+
+import recommender_minimal
+from preferences import parse_budget
+
+MALFORMED_BUDGETS = ['abc-def', '10-20-30', '-5000']
+
+@pytest.mark.parametrize('budget, expected', [
+    ('15000-30000', (15000, 30000)),
+    (' 15000-30000 ', (15000, 30000)),
+    ('100000+', None),
+    ('', None),
+    (None, None),
+    (30000, None),
+] + [(budget, None) for budget in MALFORMED_BUDGETS])
+def test_parse_budget(budget, expected):
+    assert parse_budget(budget) == expected
+
+@pytest.mark.parametrize('budget', MALFORMED_BUDGETS)
+def test_malformed_budget_is_ignored(budget):
+    results = recommender_minimal.get_recommendations(
+        brands=['Toyota'], budget=budget, fuel=['Gasolina'], types=['Sedán'], transmission=['Automática']
+    )
+    without_budget = recommender_minimal.get_recommendations(
+        brands=['Toyota'], fuel=['Gasolina'], types=['Sedán'], transmission=['Automática']
+    )
+
+    # Los filtrados exactos son los de la misma selección sin presupuesto (las
+    # recomendaciones cambian con la semilla, que incluye el texto del presupuesto)
+    filtered = lambda cars: [car['id'] for car in cars if car['match_type'] == 'filtered']
+    assert filtered(results)
+    assert filtered(results) == filtered(without_budget)
+
+@pytest.mark.parametrize('budget', MALFORMED_BUDGETS)
+def test_route_answers_malformed_session_budget(budget):
+    import app as flask_app
+
+    client = flask_app.app.test_client()
+    with client.session_transaction() as session:
+        session.update(selected_brands=['Toyota'], selected_budget=budget,
+                       selected_fuel=['Gasolina'], selected_types=['Sedán'],
+                       selected_transmission=['Automática'])
+
+    response = client.get('/api/recommendations')
+    payload = response.get_json()
+    response.close()
+
+    assert response.status_code == 200
+    assert payload
+
+def test_snapshot_failure_falls_back_without_recomputing(monkeypatch):
+    def failing(*args, **kwargs):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(recommender_minimal, 'iter_snapshot_sections', failing)
+    results = recommender_minimal.get_recommendations(brands=['Toyota'], budget='15000-30000')
+
+    assert results
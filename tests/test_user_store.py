@@ -0,0 +1,117 @@
+"""Backends de usuarios: mismas respuestas en SQLite y en memoria, y el pool de SQLite acotado"""
+
+import threading
+
+import pytest
+
+from user_store import MemoryUserStore, SQLiteUserStore, UnknownCarError
+
+@pytest.fixture(params=['sqlite', 'memory'])
+def store(request, tmp_path):
+    store = SQLiteUserStore(str(tmp_path / "users.db")) if request.param == 'sqlite' else MemoryUserStore()
+    yield store
+    store.close()
+
+def test_users_profiles_and_favorites(store):
+    assert store.create_user('ana@example.com', 'hash')
+    assert not store.create_user('ana@example.com', 'otro')
+    assert store.get_user('ana@example.com')['password'] == 'hash'
+    assert store.get_user('nadie@example.com') is None
+
+    store.save_profile('ana@example.com', {'gender': 'femenino'})
+    store.update_profile('ana@example.com', theme='dark')
+    assert store.get_profile('ana@example.com') == {'gender': 'femenino', 'theme': 'dark'}
+
+    assert store.add_favorite('ana@example.com', {'id': 'car_1', 'modelo': 'Corolla'})
+    assert not store.add_favorite('ana@example.com', {'id': 'car_1'})
+    assert store.add_favorites('ana@example.com', [{'id': 2}, {'id': 'car_3'}]) == 2
+    assert [car['id'] for car in store.list_favorites('ana@example.com')] == ['car_1', 2, 'car_3']
+
+    assert store.remove_favorite('ana@example.com', '2')
+    assert not store.remove_favorite('ana@example.com', '2')
+    assert store.counts() == {'users': 1, 'profiles': 1, 'favorites': 2}
+    assert store.clear_favorites('ana@example.com') == 2
+
+def test_sqlite_connections_are_bounded_across_threads(tmp_path, monkeypatch):
+    store = SQLiteUserStore(str(tmp_path / "users.db"), pool_size=4)
+    store.create_user('ana@example.com', 'hash')
+    opened = []
+    original_open = store._open
+    monkeypatch.setattr(store, '_open', lambda: opened.append(1) or original_open())
+
+    start = threading.Barrier(50)
+    errors = []
+
+    def request():
+        try:
+            start.wait()
+            store.get_profile('ana@example.com')
+            store.update_profile('ana@example.com', visits=1)
+        except Exception as e:
+            errors.append(e)
+
+    # Un hilo nuevo por solicitud, como app.run(debug=True)
+    for _ in range(4):
+        threads = [threading.Thread(target=request) for _ in range(50)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert not errors
+    assert len(opened) <= store.pool_size
+    assert store._idle.qsize() <= store.pool_size
+    store.close()
+    assert store._idle.qsize() == 0
+
+def test_sqlite_in_memory_shares_one_database():
+    store = SQLiteUserStore(":memory:")
+    store.create_user('ana@example.com', 'hash')
+
+    seen = []
+    thread = threading.Thread(target=lambda: seen.append(store.get_user('ana@example.com')))
+    thread.start()
+    thread.join()
+
+    assert seen[0]['password'] == 'hash'
+    store.close()
+
+class CatalogOnlyStore(MemoryUserStore):
+    """Como Neo4jUserStore: solo enlaza autos que existen en el catálogo"""
+    catalog = {'car_1'}
+
+    def add_favorites(self, email, cars):
+        cars = list(cars)
+        missing = [str(car.get('id')) for car in cars if str(car.get('id')) not in self.catalog]
+        if missing:
+            raise UnknownCarError(missing)
+        return super().add_favorites(email, cars)
+
+@pytest.fixture
+def client(monkeypatch):
+    import app as flask_app
+
+    monkeypatch.setattr(flask_app, 'USER_STORE', CatalogOnlyStore())
+    flask_app.USER_STORE.create_user('ana@example.com', 'hash')
+    client = flask_app.app.test_client()
+    with client.session_transaction() as session:
+        session.update(logged_in=True, user_email='ana@example.com')
+    return client
+
+def post_favorite(client, car):
+    response = client.post('/api/add-favorite', json={'car': car})
+    payload = response.get_json()
+    response.close()
+    return response.status_code, payload
+
+def test_add_favorite_route_distinguishes_unknown_cars(client):
+    assert post_favorite(client, {'id': 'car_1'}) == (200, {'success': True})
+    status, payload = post_favorite(client, {'id': 'car_1'})
+    assert (status, payload['message']) == (200, 'Ya está en favoritos')
+
+    status, payload = post_favorite(client, {'id': 'sample_1'})
+    assert status == 404
+    assert payload['success'] is False
+
+    status, _ = post_favorite(client, {'modelo': 'Sin id'})
+    assert status == 400